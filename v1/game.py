@@ -3,6 +3,12 @@
 from piece import Piece
 from pieces import *
 
+# Directions as (file, row) steps, rows go down the board (row 0 is rank 8)
+STRAIGHT_DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+DIAGONAL_DIRECTIONS = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+KNIGHT_OFFSETS = [(1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2)]
+KING_OFFSETS = STRAIGHT_DIRECTIONS + DIAGONAL_DIRECTIONS
+
 class Game:
     
     def __init__(self, game=None):
@@ -28,12 +34,20 @@ class Game:
                             self.pieces[i][j] = King(piece.color, piece.pos, self)
                             
             self.result = game.result
+            self.check_info_cache = {}
+            self.status_cache = None
             return
         
         self.turn = "white"
         self.pieces = [[None for i in range(8)] for j in range(8)]
         self.result = None
         
+        # Checkers, pins and evasion squares per color for the current position
+        self.check_info_cache = {}
+        
+        # Check and legal move count of the player to move for the current position (see status)
+        self.status_cache = None
+        
         # Initialize the board
         self.pieces[0][0] = Rook("black", (0, 0), self)
         self.pieces[1][0] = Knight("black", (1, 0), self)
@@ -61,13 +75,37 @@ class Game:
         (i,j) = pos
         return self.pieces[i][j]
     
+    def status(self) -> dict:
+        # Works out once per position whether the player to move is in check and how many legal moves they have
+        # is_checkmate, is_stalemate, has_legal_moves and is_in_check all read it instead of generating moves again
+        # Returns a dict with:
+        #   "checkers": positions of the enemy pieces giving check
+        #   "legal_moves": number of legal moves
+        if self.status_cache is not None:
+            return self.status_cache
+        
+        legal_moves = 0
+        for i in range(8):
+            for j in range(8):
+                piece = self.pieces[i][j]
+                if piece is not None and piece.color == self.turn:
+                    legal_moves += len(piece.get_legal_moves())
+                    
+        self.status_cache = {
+            "checkers": self.check_info(self.turn)["checkers"],
+            "legal_moves": legal_moves,
+        }
+        return self.status_cache
+    
     def is_checkmate(self) -> bool:
         # If the current player has no legal moves and the king is in check, it is checkmate
-        return not self.has_legal_moves() and self.is_in_check(self.turn)
+        status = self.status()
+        return status["legal_moves"] == 0 and len(status["checkers"]) > 0
     
     def is_stalemate(self) -> bool:
         # If the current player has no legal moves and the king is not in check, it is stalemate
-        return not self.has_legal_moves() and not self.is_in_check(self.turn)
+        status = self.status()
+        return status["legal_moves"] == 0 and len(status["checkers"]) == 0
     
     def move_piece(self, pos1, pos2, ignore_check=False):
         # Get the piece
@@ -85,53 +123,148 @@ class Game:
         piece.pos = pos2
         self.pieces[pos1[0]][pos1[1]] = None
         self.pieces[pos2[0]][pos2[1]] = piece
+        self.check_info_cache = {}
+        self.status_cache = None
         
         # TODO: Check for promotion
         
-        # Check for checkmate
-        if not ignore_check and self.is_checkmate():
-            self.result = "1-0" if self.turn == "white" else "0-1"
-            
-        # Check for stalemate
-        if not ignore_check and self.is_stalemate():
-            self.result = "1/2-1/2"
-        
         # Change the turn
         self.turn = "black" if self.turn == "white" else "white"
         
+        # The game is over if the player to move now can't move
+        if not ignore_check and self.is_checkmate():
+            self.result = "0-1" if self.turn == "white" else "1-0"
+        elif not ignore_check and self.is_stalemate():
+            self.result = "1/2-1/2"
+        
     def has_legal_moves(self) -> bool:
-        for i in range(8):
-            for j in range(8):
-                piece = self.get_piece((i,j))
-                if piece is not None and piece.color == self.turn:
-                    if len(piece.get_legal_moves()) > 0:
-                        return True
+        return self.status()["legal_moves"] > 0
                     
     def is_in_check(self, color) -> bool:
-        # In check if the king is in the list of legal moves of any of the opponent's pieces
+        # In check if any enemy piece attacks the king (see check_info)
+        return len(self.check_info(color)["checkers"]) > 0
+    
+    def is_attacked(self, pos, color, ignore=None) -> bool:
+        # Whether any piece of the given color attacks pos
+        # The square in ignore is treated as empty (used for the king so it can't step back along a checking line)
+        (i,j) = pos
+        
+        # Knights
+        for (di,dj) in KNIGHT_OFFSETS:
+            piece = self.piece_on(i + di, j + dj)
+            if piece is not None and piece.color == color and piece.name == "knight":
+                return True
+            
+        # Kings
+        for (di,dj) in KING_OFFSETS:
+            piece = self.piece_on(i + di, j + dj)
+            if piece is not None and piece.color == color and piece.name == "king":
+                return True
+            
+        # Pawns (white pawns attack up the board, so they sit one row below the square)
+        pawn_row = j + 1 if color == "white" else j - 1
+        for di in (-1, 1):
+            piece = self.piece_on(i + di, pawn_row)
+            if piece is not None and piece.color == color and piece.name == "pawn":
+                return True
+            
+        # Sliding pieces
+        for directions, sliders in ((STRAIGHT_DIRECTIONS, ("rook", "queen")), (DIAGONAL_DIRECTIONS, ("bishop", "queen"))):
+            for (di,dj) in directions:
+                temp_i = i + di
+                temp_j = j + dj
+                while 0 <= temp_i <= 7 and 0 <= temp_j <= 7:
+                    piece = self.pieces[temp_i][temp_j]
+                    if piece is not None and (temp_i, temp_j) != ignore:
+                        if piece.color == color and piece.name in sliders:
+                            return True
+                        break
+                    temp_i += di
+                    temp_j += dj
+                    
+        return False
+    
+    def piece_on(self, i, j) -> Piece:
+        # Like get_piece but returns None for squares off the board
+        if 0 <= i <= 7 and 0 <= j <= 7:
+            return self.pieces[i][j]
+        return None
+    
+    def check_info(self, color) -> dict:
+        # Computes the checkers, pins and evasion squares for the given color's king once per position
+        # Returns a dict with:
+        #   "king": position of the king
+        #   "checkers": positions of the enemy pieces giving check
+        #   "evasions": squares a non-king move must land on (None if not in check)
+        #   "pins": pinned piece position -> squares it can move to without leaving the pin line
+        if color in self.check_info_cache:
+            return self.check_info_cache[color]
         
         # Find the king
-        king = None
+        king_pos = None
         for i in range(8):
             for j in range(8):
-                piece = self.get_piece((i,j))
+                piece = self.pieces[i][j]
                 if piece is not None and piece.color == color and piece.name == "king":
-                    king = piece
-                    break
-                
-        # Check if the king is in the list of legal moves of any of the opponent's pieces
-        for i in range(8):
-            for j in range(8):
-                piece = self.get_piece((i,j))
-                if piece is not None and color != self.turn and king.pos in piece.get_legal_moves(ignore_check=True):
-                    return True
+                    king_pos = (i, j)
                     
-        return False
-    
-    def would_be_check(self, piece, moving_to):
-        game_copy = Game(self)
-        game_copy.move_piece(piece.pos, moving_to, ignore_check=True)
-        return game_copy.is_in_check(self.turn)
+        checkers = []
+        evasions = set()
+        pins = {}
+        
+        if king_pos is not None:
+            (i,j) = king_pos
+            enemy = "black" if color == "white" else "white"
+            
+            # Knights and pawns can only give check, they can't pin
+            for (di,dj) in KNIGHT_OFFSETS:
+                piece = self.piece_on(i + di, j + dj)
+                if piece is not None and piece.color == enemy and piece.name == "knight":
+                    checkers.append(piece.pos)
+                    evasions.add(piece.pos)
+            pawn_row = j - 1 if color == "white" else j + 1
+            for di in (-1, 1):
+                piece = self.piece_on(i + di, pawn_row)
+                if piece is not None and piece.color == enemy and piece.name == "pawn":
+                    checkers.append(piece.pos)
+                    evasions.add(piece.pos)
+                    
+            # Walk each line out from the king
+            # The first enemy slider on the line is a checker if nothing is in between,
+            # or a pinner if exactly one of our pieces is in between
+            for directions, sliders in ((STRAIGHT_DIRECTIONS, ("rook", "queen")), (DIAGONAL_DIRECTIONS, ("bishop", "queen"))):
+                for (di,dj) in directions:
+                    ray = []
+                    blocker = None
+                    temp_i = i + di
+                    temp_j = j + dj
+                    while 0 <= temp_i <= 7 and 0 <= temp_j <= 7:
+                        piece = self.pieces[temp_i][temp_j]
+                        ray.append((temp_i, temp_j))
+                        if piece is not None:
+                            if piece.color == color:
+                                # Second piece of ours on the line means nothing is pinned
+                                if blocker is not None:
+                                    break
+                                blocker = piece
+                            else:
+                                if piece.name in sliders:
+                                    if blocker is None:
+                                        checkers.append(piece.pos)
+                                        evasions.update(ray)
+                                    else:
+                                        pins[blocker.pos] = set(ray)
+                                break
+                        temp_i += di
+                        temp_j += dj
+                        
+        info = {
+            "king": king_pos,
+            "checkers": checkers,
+            "evasions": evasions if len(checkers) > 0 else None,
+            "pins": pins,
+        }
+        self.check_info_cache[color] = info
+        return info
         
         
-    
\ No newline at end of file
@@ -13,7 +13,24 @@ class Piece:
     
     def remove_check_moves(self, moves) -> list:
         # Remove moves that would put the king in check
-        for move in moves:
-            if self.game.would_be_check(self, move):
-                moves.remove(move)
+        # Uses the checkers and pins of the position instead of trying each move on a copy of the board
+        info = self.game.check_info(self.color)
+        enemy = "black" if self.color == "white" else "white"
+        
+        # The king can go anywhere that isn't attacked once it has left its square
+        if self.name == "king":
+            return [move for move in moves if not self.game.is_attacked(move, enemy, ignore=self.pos)]
+        
+        # Only the king can move out of double check
+        if len(info["checkers"]) > 1:
+            return []
+        
+        # Pinned pieces have to stay on the line between the king and the pinner
+        if self.pos in info["pins"]:
+            moves = [move for move in moves if move in info["pins"][self.pos]]
+            
+        # In check, the move has to capture the checker or block the check
+        if info["evasions"] is not None:
+            moves = [move for move in moves if move in info["evasions"]]
+            
         return moves
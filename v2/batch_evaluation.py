@@ -0,0 +1,229 @@
+# Evaluates many positions at once with NumPy
+#
+# Positions are packed into an (N, 12) uint64 array of bitboards (the same order as Game.bitboards),
+# and material, piece-square and mobility scores are computed for all of them with array operations
+# instead of looping over Game objects in Python.
+#   - Piece counts use a SWAR popcount on the uint64 bitboards (or np.bitwise_count when NumPy has it).
+#   - Piece-square scores look up each byte of each bitboard in a table of the summed scores of
+#     every combination of 8 squares, so a bitboard is scored with 8 lookups.
+#   - Mobility floods the sliding pieces' rays with shifts (dumb7fill), for every position at once.
+# The material and piece-square scores use the tables of evaluation.py, so with mobility_weights set to
+# all zeros evaluate_batch gives the same scores as evaluate.
+
+import numpy as np
+from bitboards import FILE_A, FILE_H
+from evaluation import EG_TABLE, MAX_PHASE, MG_TABLE, PHASE_WEIGHTS
+
+# Centipawns per square a piece can move to (pawn, knight, bishop, rook, queen, king)
+MOBILITY_WEIGHTS = [0, 4, 5, 2, 1, 0]
+
+# Positions scored per chunk, to bound the size of the temporary arrays
+CHUNK_SIZE = 1 << 16
+
+_M1 = np.uint64(0x5555_5555_5555_5555)
+_M2 = np.uint64(0x3333_3333_3333_3333)
+_M4 = np.uint64(0x0F0F_0F0F_0F0F_0F0F)
+_H01 = np.uint64(0x0101_0101_0101_0101)
+_NOT_A = np.uint64(~FILE_A & 0xFFFF_FFFF_FFFF_FFFF)
+_NOT_H = np.uint64(~FILE_H & 0xFFFF_FFFF_FFFF_FFFF)
+_FULL = np.uint64(0xFFFF_FFFF_FFFF_FFFF)
+
+
+def _build_byte_tables(table: list) -> np.ndarray:
+    """Builds BYTE_TABLE[piece, byte index, byte value]: the summed scores of the squares set in that byte."""
+    byte_tables = np.zeros((12, 8, 256), dtype=np.int64)
+    for piece in range(12):
+        for byte_index in range(8):
+            for value in range(256):
+                byte_tables[piece, byte_index, value] = sum(
+                    table[piece][byte_index * 8 + bit] for bit in range(8) if value >> bit & 1
+                )
+    return byte_tables
+
+
+# Material + piece-square score of every byte of every bitboard, from white's point of view
+_MG_BYTE_TABLE = _build_byte_tables(MG_TABLE)
+_EG_BYTE_TABLE = _build_byte_tables(EG_TABLE)
+
+_PIECE_INDEX = np.arange(12)[None, :, None]
+_BYTE_INDEX = np.arange(8)[None, None, :]
+_PHASE_WEIGHTS = np.array(PHASE_WEIGHTS * 2, dtype=np.int64)
+
+
+def pack_positions(games) -> tuple:
+    """Packs games into arrays for the batch functions.
+
+    Args:
+        games (iterable): Game objects
+
+    Returns:
+        tuple: ((N, 12) uint64 array of bitboards, (N,) bool array of whether it is white's turn)
+    """
+    bitboards = []
+    white_to_move = []
+    for game in games:
+        bitboards.append(game.bitboards)
+        white_to_move.append(game.isWhiteTurn)
+    return (
+        np.array(bitboards, dtype=np.uint64).reshape(-1, 12),
+        np.array(white_to_move, dtype=bool),
+    )
+
+
+def popcount(bitboards: np.ndarray) -> np.ndarray:
+    """Counts the set bits of every uint64 in an array.
+
+    Args:
+        bitboards (np.ndarray): uint64 array of any shape
+
+    Returns:
+        np.ndarray: int64 array of the same shape
+    """
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(bitboards).astype(np.int64)
+
+    x = bitboards - ((bitboards >> np.uint64(1)) & _M1)
+    x = (x & _M2) + ((x >> np.uint64(2)) & _M2)
+    x = (x + (x >> np.uint64(4))) & _M4
+    return ((x * _H01) >> np.uint64(56)).astype(np.int64)
+
+
+def material_batch(bitboards: np.ndarray) -> tuple:
+    """Counts the pieces of every position.
+
+    Args:
+        bitboards (np.ndarray): (N, 12) uint64 array of bitboards
+
+    Returns:
+        tuple: ((N, 12) int64 array of piece counts, (N,) int64 array of game phases)
+    """
+    counts = popcount(bitboards)
+    phase = counts @ _PHASE_WEIGHTS
+    return counts, phase
+
+
+def pst_batch(bitboards: np.ndarray) -> tuple:
+    """Scores material and piece placement of every position from white's point of view.
+
+    Args:
+        bitboards (np.ndarray): (N, 12) uint64 array of bitboards
+
+    Returns:
+        tuple: ((N,) middlegame scores, (N,) endgame scores), both int64
+    """
+    # View each bitboard as its 8 bytes, a1-h1 first (independent of the machine's byte order)
+    octets = np.ascontiguousarray(bitboards, dtype="<u8").view(np.uint8).reshape(-1, 12, 8)
+    mg = _MG_BYTE_TABLE[_PIECE_INDEX, _BYTE_INDEX, octets].sum(axis=(1, 2))
+    eg = _EG_BYTE_TABLE[_PIECE_INDEX, _BYTE_INDEX, octets].sum(axis=(1, 2))
+    return mg, eg
+
+
+def _slide(sliders: np.ndarray, empty: np.ndarray, shift: int, wrap_mask) -> np.ndarray:
+    """Floods sliders along one direction until they hit a piece (dumb7fill), including the blocker."""
+    amount = np.uint64(abs(shift))
+
+    def step(bb):
+        moved = bb << amount if shift > 0 else bb >> amount
+        return moved & wrap_mask
+
+    flood = sliders
+    ray = sliders
+    for _ in range(6):
+        ray = step(ray) & empty
+        flood = flood | ray
+    return step(flood)
+
+
+# Shift and mask that stops a piece wrapping around the board, for each direction
+_ROOK_STEPS = [(8, _FULL), (-8, _FULL), (1, _NOT_A), (-1, _NOT_H)]
+_BISHOP_STEPS = [(9, _NOT_A), (7, _NOT_H), (-7, _NOT_A), (-9, _NOT_H)]
+_KNIGHT_STEPS = [
+    (17, _NOT_A),
+    (15, _NOT_H),
+    (10, np.uint64(~(FILE_A | FILE_A << 1) & 0xFFFF_FFFF_FFFF_FFFF)),
+    (6, np.uint64(~(FILE_H | FILE_H >> 1) & 0xFFFF_FFFF_FFFF_FFFF)),
+    (-6, np.uint64(~(FILE_A | FILE_A << 1) & 0xFFFF_FFFF_FFFF_FFFF)),
+    (-10, np.uint64(~(FILE_H | FILE_H >> 1) & 0xFFFF_FFFF_FFFF_FFFF)),
+    (-15, _NOT_A),
+    (-17, _NOT_H),
+]
+
+
+def mobility_batch(bitboards: np.ndarray, weights: list = MOBILITY_WEIGHTS) -> np.ndarray:
+    """Scores the mobility of every position from white's point of view.
+    Mobility is counted per piece type as the squares attacked by any piece of that type that
+    aren't occupied by its own side (so two knights attacking the same square count it once).
+
+    Args:
+        bitboards (np.ndarray): (N, 12) uint64 array of bitboards
+        weights (list, optional): Centipawns per square for each piece type. Defaults to MOBILITY_WEIGHTS.
+
+    Returns:
+        np.ndarray: (N,) int64 scores
+    """
+
+    white = np.bitwise_or.reduce(bitboards[:, 0:6], axis=1)
+    black = np.bitwise_or.reduce(bitboards[:, 6:12], axis=1)
+    empty = ~(white | black)
+
+    score = np.zeros(len(bitboards), dtype=np.int64)
+    for color, own, sign in ((0, white, 1), (1, black, -1)):
+        offset = color * 6
+        for piece_type, steps in ((1, None), (2, _BISHOP_STEPS), (3, _ROOK_STEPS), (4, None)):
+            weight = weights[piece_type]
+            if weight == 0:
+                continue
+
+            pieces = bitboards[:, offset + piece_type]
+            attacks = np.zeros_like(pieces)
+            if piece_type == 1:
+                for shift, mask in _KNIGHT_STEPS:
+                    amount = np.uint64(abs(shift))
+                    attacks |= ((pieces << amount) if shift > 0 else (pieces >> amount)) & mask
+            else:
+                for shift, mask in steps if steps is not None else _BISHOP_STEPS + _ROOK_STEPS:
+                    attacks |= _slide(pieces, empty, shift, mask)
+
+            score += sign * weight * popcount(attacks & ~own)
+
+    return score
+
+
+def evaluate_batch(
+    bitboards: np.ndarray,
+    white_to_move: np.ndarray = None,
+    mobility_weights: list = MOBILITY_WEIGHTS,
+) -> np.ndarray:
+    """Evaluates many positions at once.
+
+    Args:
+        bitboards (np.ndarray): (N, 12) uint64 array of bitboards (see pack_positions)
+        white_to_move (np.ndarray, optional): (N,) bool array. If given, scores are for the side to move
+            like evaluate, otherwise they are from white's point of view. Defaults to None.
+        mobility_weights (list, optional): Centipawns per square of mobility for each piece type.
+            Defaults to MOBILITY_WEIGHTS.
+
+    Returns:
+        np.ndarray: (N,) int64 scores in centipawns
+    """
+
+    bitboards = np.asarray(bitboards, dtype=np.uint64).reshape(-1, 12)
+    scores = np.empty(len(bitboards), dtype=np.int64)
+    use_mobility = any(mobility_weights)
+
+    for start in range(0, len(bitboards), CHUNK_SIZE):
+        chunk = bitboards[start : start + CHUNK_SIZE]
+
+        _, phase = material_batch(chunk)
+        phase = np.minimum(phase, MAX_PHASE)
+        mg, eg = pst_batch(chunk)
+        score = (mg * phase + eg * (MAX_PHASE - phase)) // MAX_PHASE
+        if use_mobility:
+            score += mobility_batch(chunk, mobility_weights)
+
+        scores[start : start + CHUNK_SIZE] = score
+
+    if white_to_move is not None:
+        scores = np.where(white_to_move, scores, -scores)
+
+    return scores
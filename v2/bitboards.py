@@ -0,0 +1,250 @@
+# Bitboard helpers and precomputed attack tables.
+#
+# Squares are numbered the same way as the Game bitboards: LSB is a1 (0), MSB is h8 (63),
+# row/rank-major order. All of the tables below are built once when this module is imported
+# so move generation only has to do table lookups and a few bitwise operations.
+# Also see https://www.chessprogramming.org/Main_Page for more information.
+
+FULL_BOARD = 0xFFFF_FFFF_FFFF_FFFF
+
+FILES = ["a", "b", "c", "d", "e", "f", "g", "h"]
+RANKS = ["1", "2", "3", "4", "5", "6", "7", "8"]
+SQUARE_NAMES = [file + rank for rank in RANKS for file in FILES]
+SQUARE_INDEX = {name: square for square, name in enumerate(SQUARE_NAMES)}
+
+FILE_A = 0x01010101_01010101
+FILE_H = FILE_A << 7
+RANK_1 = 0xFF
+RANK_2 = RANK_1 << 8
+RANK_4 = RANK_1 << 24
+RANK_5 = RANK_1 << 32
+RANK_7 = RANK_1 << 48
+RANK_8 = RANK_1 << 56
+
+# Square colors (a1 is dark)
+LIGHT_SQUARES = 0x55AA_55AA_55AA_55AA
+DARK_SQUARES = FULL_BOARD ^ LIGHT_SQUARES
+
+# Colors
+WHITE = 0
+BLACK = 1
+
+# Piece types
+PAWN = 0
+KNIGHT = 1
+BISHOP = 2
+ROOK = 3
+QUEEN = 4
+KING = 5
+
+# Pieces (index into Game.bitboards), the color is piece // 6 and the type is piece % 6
+WHITE_PAWN, WHITE_KNIGHT, WHITE_BISHOP, WHITE_ROOK, WHITE_QUEEN, WHITE_KING = range(6)
+BLACK_PAWN, BLACK_KNIGHT, BLACK_BISHOP, BLACK_ROOK, BLACK_QUEEN, BLACK_KING = range(6, 12)
+
+# FEN letter for each piece index
+PIECE_SYMBOLS = "PNBRQKpnbrqk"
+
+
+def lsb(bb: int) -> int:
+    """Gets the index of the least significant set bit.
+
+    Args:
+        bb (int): Non-empty bitboard
+
+    Returns:
+        int: Square index of the lowest set bit
+    """
+    return (bb & -bb).bit_length() - 1
+
+
+def iter_squares(bb: int):
+    """Iterates over the squares set in a bitboard, from a1 to h8.
+
+    Args:
+        bb (int): Bitboard to iterate over
+
+    Yields:
+        int: Square index of each set bit
+    """
+    while bb:
+        bit = bb & -bb
+        yield bit.bit_length() - 1
+        bb ^= bit
+
+
+def popcount(bb: int) -> int:
+    """Counts the set bits in a bitboard.
+
+    Args:
+        bb (int): Bitboard to count
+
+    Returns:
+        int: Number of set bits
+    """
+    return bb.bit_count()
+
+
+def _on_board(file: int, rank: int) -> bool:
+    return 0 <= file < 8 and 0 <= rank < 8
+
+
+def _leaper_attacks(square: int, offsets: list) -> int:
+    """Builds the attack bitboard of a leaping piece (knight, king, pawn) on an empty board."""
+    file, rank = square % 8, square // 8
+    attacks = 0
+    for df, dr in offsets:
+        if _on_board(file + df, rank + dr):
+            attacks |= 1 << (file + df + (rank + dr) * 8)
+    return attacks
+
+
+def _ray_attacks(square: int, occupied: int, directions: list) -> int:
+    """Builds the attack bitboard of a sliding piece by walking each ray until it hits a blocker.
+
+    This is slow and only used to build the lookup tables below.
+    """
+    file, rank = square % 8, square // 8
+    attacks = 0
+    for df, dr in directions:
+        f, r = file + df, rank + dr
+        while _on_board(f, r):
+            bit = 1 << (f + r * 8)
+            attacks |= bit
+            if occupied & bit:
+                break
+            f += df
+            r += dr
+    return attacks
+
+
+def _relevant_mask(square: int, directions: list) -> int:
+    """Builds the mask of squares whose occupancy can change a slider's attacks.
+
+    The last square of every ray is left out since a piece there can't block anything behind it.
+    """
+    file, rank = square % 8, square // 8
+    mask = 0
+    for df, dr in directions:
+        f, r = file + df, rank + dr
+        while _on_board(f + df, r + dr):
+            mask |= 1 << (f + r * 8)
+            f += df
+            r += dr
+    return mask
+
+
+def _sliding_table(directions: list) -> tuple:
+    """Builds the relevant occupancy masks and attack lookups of a sliding piece for every square.
+
+    Each square's lookup is a perfect hash from the occupancy of its relevant squares
+    (occupied & mask) to the attack bitboard, which is the same idea as PEXT/magic bitboards.
+    Every subset of the mask is enumerated with the Carry-Rippler trick.
+    """
+    masks = []
+    tables = []
+    for square in range(64):
+        mask = _relevant_mask(square, directions)
+        table = {}
+        subset = 0
+        while True:
+            table[subset] = _ray_attacks(square, subset, directions)
+            subset = (subset - mask) & mask
+            if subset == 0:
+                break
+        masks.append(mask)
+        tables.append(table)
+    return masks, tables
+
+
+_KNIGHT_OFFSETS = [(1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2)]
+_KING_OFFSETS = [(1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)]
+_ROOK_DIRECTIONS = [(1, 0), (0, 1), (-1, 0), (0, -1)]
+_BISHOP_DIRECTIONS = [(1, 1), (-1, 1), (-1, -1), (1, -1)]
+
+KNIGHT_ATTACKS = [_leaper_attacks(square, _KNIGHT_OFFSETS) for square in range(64)]
+KING_ATTACKS = [_leaper_attacks(square, _KING_OFFSETS) for square in range(64)]
+
+# PAWN_ATTACKS[color][square] is the squares a pawn of that color on that square attacks
+PAWN_ATTACKS = [
+    [_leaper_attacks(square, [(-1, 1), (1, 1)]) for square in range(64)],
+    [_leaper_attacks(square, [(-1, -1), (1, -1)]) for square in range(64)],
+]
+
+ROOK_MASKS, ROOK_TABLES = _sliding_table(_ROOK_DIRECTIONS)
+BISHOP_MASKS, BISHOP_TABLES = _sliding_table(_BISHOP_DIRECTIONS)
+
+
+def _between(a: int, b: int) -> int:
+    """Builds the bitboard of the squares strictly between two aligned squares (0 if not aligned)."""
+    df = (b % 8) - (a % 8)
+    dr = (b // 8) - (a // 8)
+    if a == b or (df != 0 and dr != 0 and abs(df) != abs(dr)):
+        return 0
+    step_f = (df > 0) - (df < 0)
+    step_r = (dr > 0) - (dr < 0)
+    between = 0
+    f, r = a % 8 + step_f, a // 8 + step_r
+    while f + r * 8 != b:
+        between |= 1 << (f + r * 8)
+        f += step_f
+        r += step_r
+    return between
+
+
+def _line(a: int, b: int) -> int:
+    """Builds the bitboard of the whole line (edge to edge) through two aligned squares (0 if not aligned)."""
+    if a == b:
+        return 0
+    for table in (ROOK_TABLES, BISHOP_TABLES):
+        if table[a][0] & (1 << b):
+            return (table[a][0] & table[b][0]) | (1 << a) | (1 << b)
+    return 0
+
+
+# BETWEEN[a][b] is the squares strictly between a and b if they share a rank, file or diagonal
+BETWEEN = [[_between(a, b) for b in range(64)] for a in range(64)]
+
+# LINE[a][b] is the full line through a and b if they share a rank, file or diagonal
+LINE = [[_line(a, b) for b in range(64)] for a in range(64)]
+
+
+def rook_attacks(square: int, occupied: int) -> int:
+    """Gets the squares a rook on the given square attacks.
+
+    Args:
+        square (int): Square index of the rook
+        occupied (int): Bitboard of all occupied squares
+
+    Returns:
+        int: Attack bitboard (includes the first blocker in each direction)
+    """
+    return ROOK_TABLES[square][occupied & ROOK_MASKS[square]]
+
+
+def bishop_attacks(square: int, occupied: int) -> int:
+    """Gets the squares a bishop on the given square attacks.
+
+    Args:
+        square (int): Square index of the bishop
+        occupied (int): Bitboard of all occupied squares
+
+    Returns:
+        int: Attack bitboard (includes the first blocker in each direction)
+    """
+    return BISHOP_TABLES[square][occupied & BISHOP_MASKS[square]]
+
+
+def queen_attacks(square: int, occupied: int) -> int:
+    """Gets the squares a queen on the given square attacks.
+
+    Args:
+        square (int): Square index of the queen
+        occupied (int): Bitboard of all occupied squares
+
+    Returns:
+        int: Attack bitboard (includes the first blocker in each direction)
+    """
+    return (
+        ROOK_TABLES[square][occupied & ROOK_MASKS[square]]
+        | BISHOP_TABLES[square][occupied & BISHOP_MASKS[square]]
+    )
@@ -0,0 +1,173 @@
+# Static evaluation of a position
+# Scores are in centipawns from the point of view of the side to move (positive is good for them)
+#
+# The evaluation is material plus piece-square tables (a bonus or penalty for each piece on each square).
+# There is one set of tables for the middlegame and one for the endgame, and the score is blended
+# between them by the game phase (how much non-pawn material is left), which is called a tapered evaluation.
+# Also see https://www.chessprogramming.org/Tapered_Eval
+#
+# Both scores only change for the pieces that move, so Game keeps them up to date in make_move
+# (see Game.mg_score, Game.eg_score and Game.phase) and evaluate doesn't have to look at the board.
+
+# Value of each piece type (pawn, knight, bishop, rook, queen, king)
+MG_VALUES = [82, 337, 365, 477, 1025, 0]
+EG_VALUES = [94, 281, 297, 512, 936, 0]
+
+# How much each piece type counts towards the game phase, it is MAX_PHASE with all pieces on the board
+PHASE_WEIGHTS = [0, 1, 1, 2, 4, 0]
+MAX_PHASE = 24
+
+# Piece-square tables from white's point of view, laid out like a board seen by white (a8 is first, h1 is last)
+# fmt: off
+_PAWN_MG = [
+      0,   0,   0,   0,   0,   0,   0,   0,
+     50,  50,  50,  50,  50,  50,  50,  50,
+     10,  10,  20,  30,  30,  20,  10,  10,
+      5,   5,  10,  25,  25,  10,   5,   5,
+      0,   0,   0,  20,  20,   0,   0,   0,
+      5,  -5, -10,   0,   0, -10,  -5,   5,
+      5,  10,  10, -20, -20,  10,  10,   5,
+      0,   0,   0,   0,   0,   0,   0,   0,
+]
+_PAWN_EG = [
+      0,   0,   0,   0,   0,   0,   0,   0,
+     80,  80,  80,  80,  80,  80,  80,  80,
+     50,  50,  50,  50,  50,  50,  50,  50,
+     30,  30,  30,  30,  30,  30,  30,  30,
+     15,  15,  15,  15,  15,  15,  15,  15,
+      5,   5,   5,   5,   5,   5,   5,   5,
+      0,   0,   0,   0,   0,   0,   0,   0,
+      0,   0,   0,   0,   0,   0,   0,   0,
+]
+_KNIGHT = [
+    -50, -40, -30, -30, -30, -30, -40, -50,
+    -40, -20,   0,   0,   0,   0, -20, -40,
+    -30,   0,  10,  15,  15,  10,   0, -30,
+    -30,   5,  15,  20,  20,  15,   5, -30,
+    -30,   0,  15,  20,  20,  15,   0, -30,
+    -30,   5,  10,  15,  15,  10,   5, -30,
+    -40, -20,   0,   5,   5,   0, -20, -40,
+    -50, -40, -30, -30, -30, -30, -40, -50,
+]
+_BISHOP = [
+    -20, -10, -10, -10, -10, -10, -10, -20,
+    -10,   0,   0,   0,   0,   0,   0, -10,
+    -10,   0,   5,  10,  10,   5,   0, -10,
+    -10,   5,   5,  10,  10,   5,   5, -10,
+    -10,   0,  10,  10,  10,  10,   0, -10,
+    -10,  10,  10,  10,  10,  10,  10, -10,
+    -10,   5,   0,   0,   0,   0,   5, -10,
+    -20, -10, -10, -10, -10, -10, -10, -20,
+]
+_ROOK = [
+      0,   0,   0,   0,   0,   0,   0,   0,
+      5,  10,  10,  10,  10,  10,  10,   5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+      0,   0,   0,   5,   5,   0,   0,   0,
+]
+_QUEEN = [
+    -20, -10, -10,  -5,  -5, -10, -10, -20,
+    -10,   0,   0,   0,   0,   0,   0, -10,
+    -10,   0,   5,   5,   5,   5,   0, -10,
+     -5,   0,   5,   5,   5,   5,   0,  -5,
+      0,   0,   5,   5,   5,   5,   0,  -5,
+    -10,   5,   5,   5,   5,   5,   0, -10,
+    -10,   0,   5,   0,   0,   0,   0, -10,
+    -20, -10, -10,  -5,  -5, -10, -10, -20,
+]
+_KING_MG = [
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -20, -30, -30, -40, -40, -30, -30, -20,
+    -10, -20, -20, -20, -20, -20, -20, -10,
+     20,  20,   0,   0,   0,   0,  20,  20,
+     20,  30,  10,   0,   0,  10,  30,  20,
+]
+_KING_EG = [
+    -50, -40, -30, -20, -20, -30, -40, -50,
+    -30, -20, -10,   0,   0, -10, -20, -30,
+    -30, -10,  20,  30,  30,  20, -10, -30,
+    -30, -10,  30,  40,  40,  30, -10, -30,
+    -30, -10,  30,  40,  40,  30, -10, -30,
+    -30, -10,  20,  30,  30,  20, -10, -30,
+    -30, -30,   0,   0,   0,   0, -30, -30,
+    -50, -30, -30, -30, -30, -30, -30, -50,
+]
+# fmt: on
+
+_MG_TABLES = [_PAWN_MG, _KNIGHT, _BISHOP, _ROOK, _QUEEN, _KING_MG]
+_EG_TABLES = [_PAWN_EG, _KNIGHT, _BISHOP, _ROOK, _QUEEN, _KING_EG]
+
+
+def _build_tables(values: list, tables: list) -> list:
+    """Combines material and piece-square tables into one table per piece (see bitboards.py),
+    indexed by square (a1 is 0) and scored from white's point of view (black pieces are negative).
+    """
+    combined = []
+    for color in range(2):
+        for piece_type in range(6):
+            table = tables[piece_type]
+            if color == 0:
+                # The tables are laid out with a8 first, so flip the rank
+                combined.append([values[piece_type] + table[square ^ 56] for square in range(64)])
+            else:
+                # Black's view is white's view mirrored, which is the table as laid out
+                combined.append([-(values[piece_type] + table[square]) for square in range(64)])
+    return combined
+
+
+# MG_TABLE[piece][square] and EG_TABLE[piece][square]: material + position score of a piece on a square
+MG_TABLE = _build_tables(MG_VALUES, _MG_TABLES)
+EG_TABLE = _build_tables(EG_VALUES, _EG_TABLES)
+
+# PHASE_TABLE[piece]: how much the piece counts towards the game phase
+PHASE_TABLE = PHASE_WEIGHTS * 2
+
+
+def score_pieces(bitboards: list) -> tuple:
+    """Scores the pieces on the board from scratch. Game does this when a position is set up and then
+    keeps the scores up to date as moves are made.
+
+    Args:
+        bitboards (list): The 12 piece bitboards (see Game.bitboards)
+
+    Returns:
+        tuple: (middlegame score, endgame score, phase), scores from white's point of view
+    """
+
+    mg = 0
+    eg = 0
+    phase = 0
+    for piece, bitboard in enumerate(bitboards):
+        while bitboard:
+            bit = bitboard & -bitboard
+            square = bit.bit_length() - 1
+            mg += MG_TABLE[piece][square]
+            eg += EG_TABLE[piece][square]
+            phase += PHASE_TABLE[piece]
+            bitboard ^= bit
+
+    return mg, eg, phase
+
+
+def evaluate(game) -> int:
+    """Evaluates the position by material and piece placement.
+
+    Args:
+        game (Game): Game to evaluate
+
+    Returns:
+        int: Score in centipawns for the side to move
+    """
+
+    # Promotions can push the phase above the maximum
+    phase = min(game.phase, MAX_PHASE)
+    score = (game.mg_score * phase + game.eg_score * (MAX_PHASE - phase)) // MAX_PHASE
+
+    return score if game.isWhiteTurn else -score
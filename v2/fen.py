@@ -0,0 +1,283 @@
+# Reading and writing FEN (Forsyth-Edwards Notation)
+#
+# parse_fen turns a FEN into a Position (see position.py) without setting up a Game, so large
+# sets of FENs can be read quickly with load_fens. Game.load_fen and Game.to_fen use the same functions.
+# Most of the work is table lookups: each rank of the piece placement is parsed once into the bits of
+# the pieces on it and cached (the same ranks come up over and over), and the castling and en passant
+# fields are looked up in tables of every valid value.
+# Also see https://www.chessprogramming.org/Forsyth-Edwards_Notation
+
+from functools import lru_cache
+from bitboards import (
+    BISHOP,
+    BLACK,
+    BLACK_KING,
+    BLACK_PAWN,
+    BLACK_ROOK,
+    KING,
+    KING_ATTACKS,
+    KNIGHT,
+    KNIGHT_ATTACKS,
+    PAWN,
+    PAWN_ATTACKS,
+    PIECE_SYMBOLS,
+    QUEEN,
+    RANK_1,
+    RANK_8,
+    ROOK,
+    SQUARE_INDEX,
+    SQUARE_NAMES,
+    WHITE,
+    WHITE_KING,
+    WHITE_PAWN,
+    WHITE_ROOK,
+    bishop_attacks,
+    iter_squares,
+    lsb,
+    rook_attacks,
+)
+from position import MAX_FULLMOVE_NUMBER, MAX_HALFMOVE_CLOCK, Position
+
+# Piece index of each FEN letter
+PIECE_INDEX = {symbol: piece for piece, symbol in enumerate(PIECE_SYMBOLS)}
+
+# Castling letters in FEN order, letter i is bit i of the castling rights (same bits as Game.castling_rights)
+CASTLING_LETTERS = "KQkq"
+
+# Castling rights of each valid castling field
+CASTLING_FIELDS = {"-": 0}
+for _rights in range(1, 16):
+    CASTLING_FIELDS["".join(l for i, l in enumerate(CASTLING_LETTERS) if _rights >> i & 1)] = _rights
+
+# Castling field for each castling rights mask
+CASTLING_STRINGS = {rights: field for field, rights in CASTLING_FIELDS.items()}
+
+# (king piece, king square, rook piece, rook square) that have to be in place for each castling right
+CASTLING_PIECES = [
+    (WHITE_KING, SQUARE_INDEX["e1"], WHITE_ROOK, SQUARE_INDEX["h1"]),
+    (WHITE_KING, SQUARE_INDEX["e1"], WHITE_ROOK, SQUARE_INDEX["a1"]),
+    (BLACK_KING, SQUARE_INDEX["e8"], BLACK_ROOK, SQUARE_INDEX["h8"]),
+    (BLACK_KING, SQUARE_INDEX["e8"], BLACK_ROOK, SQUARE_INDEX["a8"]),
+]
+
+# En passant target squares (only the 3rd and 6th ranks can have one)
+EN_PASSANT_SQUARES = {name: SQUARE_INDEX[name] for name in SQUARE_NAMES[16:24] + SQUARE_NAMES[40:48]}
+
+
+@lru_cache(maxsize=1 << 16)
+def _parse_rank(text: str) -> tuple:
+    """Parses one rank of the piece placement.
+
+    Args:
+        text (str): Rank from the FEN (e.g. "rnbqkbnr" or "3p4")
+
+    Raises:
+        ValueError: If the rank has an invalid character or isn't 8 squares long
+
+    Returns:
+        tuple: (piece, bits) pairs for the pieces on the rank, with the bits on the first rank
+    """
+
+    pieces = []
+    file = 0
+    previous_digit = False
+    for char in text:
+        if char in "12345678":
+            if previous_digit:
+                raise ValueError(f"Invalid FEN rank: {text}")
+            file += ord(char) - 48
+            previous_digit = True
+        elif char in PIECE_INDEX:
+            if file >= 8:
+                raise ValueError(f"Invalid FEN rank: {text}")
+            pieces.append((PIECE_INDEX[char], 1 << file))
+            file += 1
+            previous_digit = False
+        else:
+            raise ValueError(f"Invalid character in FEN: {char}")
+
+    if file != 8:
+        raise ValueError(f"Invalid FEN rank: {text}")
+
+    return tuple(pieces)
+
+
+def _attacked_by(bitboards: list, square: int, color: int, occupied: int) -> bool:
+    """Checks if a square is attacked by any piece of a color."""
+    offset = color * 6
+    return bool(
+        (PAWN_ATTACKS[color ^ 1][square] & bitboards[offset + PAWN])
+        or (KNIGHT_ATTACKS[square] & bitboards[offset + KNIGHT])
+        or (KING_ATTACKS[square] & bitboards[offset + KING])
+        or (bishop_attacks(square, occupied) & (bitboards[offset + BISHOP] | bitboards[offset + QUEEN]))
+        or (rook_attacks(square, occupied) & (bitboards[offset + ROOK] | bitboards[offset + QUEEN]))
+    )
+
+
+def parse_fen(fen: str) -> Position:
+    """Parses and validates a FEN. The clocks can be left out (they default to 0 and 1).
+
+    Args:
+        fen (str): FEN to parse
+
+    Raises:
+        ValueError: If the FEN is malformed or the position is impossible (a side doesn't have exactly one king,
+                    pawns on the first or last rank, castling rights without the king and rook in place,
+                    an en passant square without the pawn that just moved, the side not to move in check,
+                    or clocks too large for a Position)
+
+    Returns:
+        Position: Parsed position
+    """
+
+    fields = fen.split()
+    if len(fields) == 6:
+        placement, side, castling, en_passant, halfmove, fullmove = fields
+    elif len(fields) == 4:
+        placement, side, castling, en_passant = fields
+        halfmove, fullmove = "0", "1"
+    else:
+        raise ValueError(f"FEN has {len(fields)} fields, expected 6: {fen}")
+
+    # Piece placement, from the 8th rank down
+    ranks = placement.split("/")
+    if len(ranks) != 8:
+        raise ValueError(f"FEN has {len(ranks)} ranks, expected 8: {fen}")
+
+    bitboards = [0] * 12
+    shift = 56
+    for rank in ranks:
+        for piece, bits in _parse_rank(rank):
+            bitboards[piece] |= bits << shift
+        shift -= 8
+
+    white_king = bitboards[WHITE_KING]
+    black_king = bitboards[BLACK_KING]
+    if white_king & (white_king - 1) or not white_king or black_king & (black_king - 1) or not black_king:
+        raise ValueError(f"FEN must have exactly one king per side: {fen}")
+    if (bitboards[WHITE_PAWN] | bitboards[BLACK_PAWN]) & (RANK_1 | RANK_8):
+        raise ValueError(f"FEN has pawns on the first or last rank: {fen}")
+
+    # Side to move
+    if side == "w":
+        is_white_turn = True
+    elif side == "b":
+        is_white_turn = False
+    else:
+        raise ValueError(f"Invalid side to move in FEN: {side}")
+
+    # Castling rights
+    castling_rights = CASTLING_FIELDS.get(castling)
+    if castling_rights is None:
+        raise ValueError(f"Invalid castling rights in FEN: {castling}")
+    for i, (king, king_square, rook, rook_square) in enumerate(CASTLING_PIECES):
+        if castling_rights >> i & 1 and not (
+            bitboards[king] >> king_square & 1 and bitboards[rook] >> rook_square & 1
+        ):
+            raise ValueError(f"Castling right {CASTLING_LETTERS[i]} without the king and rook in place: {fen}")
+
+    # En passant target square (behind a pawn that just moved two squares)
+    if en_passant == "-":
+        en_passant_target = None
+    else:
+        en_passant_target = EN_PASSANT_SQUARES.get(en_passant)
+        if en_passant_target is None:
+            raise ValueError(f"Invalid en passant square in FEN: {en_passant}")
+        if is_white_turn:
+            valid = en_passant_target >= 40 and bitboards[BLACK_PAWN] >> (en_passant_target - 8) & 1
+        else:
+            valid = en_passant_target < 24 and bitboards[WHITE_PAWN] >> (en_passant_target + 8) & 1
+        if not valid:
+            raise ValueError(f"En passant square {en_passant} without a pawn that just moved: {fen}")
+
+    # Clocks
+    if (
+        not halfmove.isdigit()
+        or not fullmove.isdigit()
+        or int(halfmove) > MAX_HALFMOVE_CLOCK
+        or not 1 <= int(fullmove) <= MAX_FULLMOVE_NUMBER
+    ):
+        raise ValueError(f"Invalid move clocks in FEN: {halfmove} {fullmove}")
+
+    # The side that just moved can't have left its king in check
+    occupied = 0
+    for bitboard in bitboards:
+        occupied |= bitboard
+    their_king = lsb(black_king if is_white_turn else white_king)
+    if _attacked_by(bitboards, their_king, WHITE if is_white_turn else BLACK, occupied):
+        raise ValueError(f"FEN has the side not to move in check: {fen}")
+
+    return Position(
+        bitboards,
+        Position.pack_state(
+            is_white_turn, castling_rights, en_passant_target, int(halfmove), int(fullmove)
+        ),
+    )
+
+
+def position_to_fen(position: Position) -> str:
+    """Writes a position as a FEN.
+
+    Args:
+        position (Position): Position to write
+
+    Returns:
+        str: FEN of the position
+    """
+
+    board = [None] * 64
+    for piece, bitboard in enumerate(position.bitboards):
+        for square in iter_squares(bitboard):
+            board[square] = PIECE_SYMBOLS[piece]
+
+    ranks = []
+    for start in range(56, -1, -8):
+        rank = ""
+        empty = 0
+        for symbol in board[start : start + 8]:
+            if symbol is None:
+                empty += 1
+            else:
+                if empty:
+                    rank += str(empty)
+                    empty = 0
+                rank += symbol
+        if empty:
+            rank += str(empty)
+        ranks.append(rank)
+
+    en_passant = position.en_passant_target
+    return " ".join(
+        (
+            "/".join(ranks),
+            "w" if position.is_white_turn else "b",
+            CASTLING_STRINGS[position.castling_rights],
+            "-" if en_passant is None else SQUARE_NAMES[en_passant],
+            str(position.halfmove_clock),
+            str(position.fullmove_number),
+        )
+    )
+
+
+def load_fens(fens, skip_invalid: bool = False):
+    """Parses many FENs, e.g. one per line of a file.
+
+    Args:
+        fens (iterable): FENs to parse (blank lines are skipped)
+        skip_invalid (bool, optional): Whether to skip invalid FENs instead of raising. Defaults to False.
+
+    Raises:
+        ValueError: If a FEN is invalid and skip_invalid is False
+
+    Yields:
+        Position: Parsed positions, in order
+    """
+
+    for fen in fens:
+        if not fen or fen.isspace():
+            continue
+        try:
+            yield parse_fen(fen)
+        except ValueError:
+            if not skip_invalid:
+                raise
@@ -1,9 +1,87 @@
 from colorama import Fore, Back, Style
+from bitboards import (
+    BLACK,
+    BISHOP,
+    DARK_SQUARES,
+    KING,
+    KNIGHT,
+    PAWN,
+    PIECE_SYMBOLS,
+    QUEEN,
+    ROOK,
+    SQUARE_INDEX,
+    SQUARE_NAMES,
+    WHITE,
+    BETWEEN,
+    FILE_A,
+    FILE_H,
+    FULL_BOARD,
+    KING_ATTACKS,
+    KNIGHT_ATTACKS,
+    LIGHT_SQUARES,
+    LINE,
+    PAWN_ATTACKS,
+    RANK_1,
+    RANK_2,
+    RANK_7,
+    RANK_8,
+    bishop_attacks,
+    iter_squares,
+    lsb,
+    queen_attacks,
+    rook_attacks,
+)
+from move import (
+    CAPTURE,
+    CAPTURE_FLAG,
+    DOUBLE_PAWN_PUSH,
+    EN_PASSANT,
+    KING_CASTLE,
+    PROMOTION_FLAG,
+    PROMOTION_PIECES,
+    QUEEN_CASTLE,
+    QUIET,
+    SAN_PATTERN,
+    move_from,
+    move_to,
+    move_to_uci,
+    parse_san_token,
+    parse_uci_squares,
+    promotion_piece,
+)
+from zobrist import CASTLING_KEYS, EN_PASSANT_KEYS, PIECE_KEYS, SIDE_KEY
+from evaluation import EG_TABLE, MG_TABLE, PHASE_TABLE, score_pieces
+from fen import parse_fen, position_to_fen
+from position import Position
 
 BLACK_TEXT = ["♟", "♞", "♝", "♜", "♛", "♚"]
 WHITE_TEXT = ["♙", "♘", "♗", "♖", "♕", "♔"]
 STARTING_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
 
+# Castling rights are stored as a 4 bit mask
+WHITE_KINGSIDE = 1
+WHITE_QUEENSIDE = 2
+BLACK_KINGSIDE = 4
+BLACK_QUEENSIDE = 8
+ALL_CASTLING = 15
+
+# Castling rights that survive a move from or to each square (moving a king or rook, or capturing a rook)
+CASTLING_RIGHTS_MASK = [ALL_CASTLING] * 64
+CASTLING_RIGHTS_MASK[SQUARE_INDEX["a1"]] &= ~WHITE_QUEENSIDE
+CASTLING_RIGHTS_MASK[SQUARE_INDEX["e1"]] &= ~(WHITE_KINGSIDE | WHITE_QUEENSIDE)
+CASTLING_RIGHTS_MASK[SQUARE_INDEX["h1"]] &= ~WHITE_KINGSIDE
+CASTLING_RIGHTS_MASK[SQUARE_INDEX["a8"]] &= ~BLACK_QUEENSIDE
+CASTLING_RIGHTS_MASK[SQUARE_INDEX["e8"]] &= ~(BLACK_KINGSIDE | BLACK_QUEENSIDE)
+CASTLING_RIGHTS_MASK[SQUARE_INDEX["h8"]] &= ~BLACK_KINGSIDE
+
+# Rook (from, to) squares for a castling move, keyed by the king's destination square
+CASTLING_ROOK_SQUARES = {
+    SQUARE_INDEX["g1"]: (SQUARE_INDEX["h1"], SQUARE_INDEX["f1"]),
+    SQUARE_INDEX["c1"]: (SQUARE_INDEX["a1"], SQUARE_INDEX["d1"]),
+    SQUARE_INDEX["g8"]: (SQUARE_INDEX["h8"], SQUARE_INDEX["f8"]),
+    SQUARE_INDEX["c8"]: (SQUARE_INDEX["a8"], SQUARE_INDEX["d8"]),
+}
+
 
 class Game:
     """Represents a game of chess. This includes the board, the pieces, the moves, and the PGN tags."""
@@ -23,7 +101,22 @@ class Game:
     # Essentially a 1 in the move bitboard will either add or remove a piece from the board depending on if it is a 1 or 0 in the pieces bitboard.
     
     # Other bitboard operations can be used to get available squares for a piece.
-    # TODO: implement
+    # The attacks of every piece are precomputed in bitboards.py when it is imported, so the squares
+    # a piece attacks are a table lookup (sliding pieces index their table with the occupancy of the
+    # squares that can block them). For example, the squares a knight on g1 can move to are
+    # KNIGHT_ATTACKS[6] & ~own_pieces.
+
+    # The bitboards are stored in a list indexed by piece (see bitboards.py):
+    # 0-5 are the white pawns, knights, bishops, rooks, queens and king, 6-11 are the black ones.
+    # Next to them the game keeps a mailbox (the piece on each square) and the occupancy of each color,
+    # which are updated with the bitboards so make_move never has to search for a piece.
+
+    # Moves are ints (see move.py). make_move pushes an undo record onto self.history
+    # and unmake_move pops it, so a search can walk the game tree without copying the Game.
+
+    # The position is identified by its Zobrist hash (see zobrist.py) in self.hash.
+    # make_move updates it with a few XORs and unmake_move restores it from the undo record.
+    # The material and piece-square scores of the evaluation (see evaluation.py) are kept up to date the same way.
 
     def __init__(self, *args):
         """Initializes the game. This can be done in 3 ways:
@@ -45,6 +138,7 @@ class Game:
 
         # Load FEN or PGN based on arg 0
         elif len(args) == 2:
+            self.viewAsWhite = True
             if args[0].lower() == "fen":
                 self.load_fen(args[1])
             elif args[0].lower() == "pgn":
@@ -59,51 +153,27 @@ class Game:
         self.viewAsWhite = True
 
         # Bitboards (64 bits each) (LSB is a1, MSB is h8, row/rank-major order)
-        self.black_pawns = (
-            0b00000000_11111111_00000000_00000000_00000000_00000000_00000000_00000000
-        )
-        self.black_knights = (
-            0b01000010_00000000_00000000_00000000_00000000_00000000_00000000_00000000
-        )
-        self.black_bishops = (
-            0b00100100_00000000_00000000_00000000_00000000_00000000_00000000_00000000
-        )
-        self.black_rooks = (
-            0b10000001_00000000_00000000_00000000_00000000_00000000_00000000_00000000
-        )
-        self.black_queens = (
-            0b00001000_00000000_00000000_00000000_00000000_00000000_00000000_00000000
-        )
-        self.black_king = (
-            0b00010000_00000000_00000000_00000000_00000000_00000000_00000000_00000000
-        )
-
-        self.white_pawns = (
-            0b_00000000_00000000_00000000_00000000_00000000_00000000_11111111_00000000
-        )
-        self.white_knights = (
-            0b_00000000_00000000_00000000_00000000_00000000_00000000_00000000_01000010
-        )
-        self.white_bishops = (
-            0b_00000000_00000000_00000000_00000000_00000000_00000000_00000000_00100100
-        )
-        self.white_rooks = (
-            0b_00000000_00000000_00000000_00000000_00000000_00000000_00000000_10000001
-        )
-        self.white_queens = (
-            0b_00000000_00000000_00000000_00000000_00000000_00000000_00000000_00001000
-        )
-        self.white_king = (
-            0b_00000000_00000000_00000000_00000000_00000000_00000000_00000000_00010000
-        )
+        self.bitboards = [
+            # White pawns, knights, bishops, rooks, queens, king
+            0b00000000_00000000_00000000_00000000_00000000_00000000_11111111_00000000,
+            0b00000000_00000000_00000000_00000000_00000000_00000000_00000000_01000010,
+            0b00000000_00000000_00000000_00000000_00000000_00000000_00000000_00100100,
+            0b00000000_00000000_00000000_00000000_00000000_00000000_00000000_10000001,
+            0b00000000_00000000_00000000_00000000_00000000_00000000_00000000_00001000,
+            0b00000000_00000000_00000000_00000000_00000000_00000000_00000000_00010000,
+            # Black pawns, knights, bishops, rooks, queens, king
+            0b00000000_11111111_00000000_00000000_00000000_00000000_00000000_00000000,
+            0b01000010_00000000_00000000_00000000_00000000_00000000_00000000_00000000,
+            0b00100100_00000000_00000000_00000000_00000000_00000000_00000000_00000000,
+            0b10000001_00000000_00000000_00000000_00000000_00000000_00000000_00000000,
+            0b00001000_00000000_00000000_00000000_00000000_00000000_00000000_00000000,
+            0b00010000_00000000_00000000_00000000_00000000_00000000_00000000_00000000,
+        ]
 
         # Castling rights
-        self.white_kingside_castle = True
-        self.white_queenside_castle = True
-        self.black_kingside_castle = True
-        self.black_queenside_castle = True
+        self.castling_rights = ALL_CASTLING
 
-        # En passant target square
+        # En passant target square (square index)
         self.en_passant_target = None
 
         # Halfmove clock
@@ -115,9 +185,14 @@ class Game:
         # Move list
         self.moves = []
 
+        # Undo records of the moves made with make_move
+        self.history = []
+
         # PGN tags
         self.tags = {}
 
+        self.sync_board()
+
     def copy(self, other: "Game"):
         """Copies the given Game into this Game.
 
@@ -140,35 +215,137 @@ class Game:
         self.isWhiteTurn = other.isWhiteTurn
         self.viewAsWhite = other.viewAsWhite
 
-        self.black_pawns = other.black_pawns
-        self.black_knights = other.black_knights
-        self.black_bishops = other.black_bishops
-        self.black_rooks = other.black_rooks
-        self.black_queens = other.black_queens
-        self.black_king = other.black_king
-
-        self.white_pawns = other.white_pawns
-        self.white_knights = other.white_knights
-        self.white_bishops = other.white_bishops
-        self.white_rooks = other.white_rooks
-        self.white_queens = other.white_queens
-        self.white_king = other.white_king
-
-        self.white_kingside_castle = other.white_kingside_castle
-        self.white_queenside_castle = other.white_queenside_castle
-        self.black_kingside_castle = other.black_kingside_castle
-        self.black_queenside_castle = other.black_queenside_castle
+        self.bitboards = other.bitboards.copy()
+        self.mailbox = other.mailbox.copy()
+        self.occupancies = other.occupancies.copy()
+
+        self.castling_rights = other.castling_rights
 
         self.en_passant_target = other.en_passant_target
 
         self.halfmove_clock = other.halfmove_clock
         self.fullmove_number = other.fullmove_number
 
+        self.hash = other.hash
+        self.status_cache = other.status_cache
+        self.mg_score = other.mg_score
+        self.eg_score = other.eg_score
+        self.phase = other.phase
+
         self.moves = other.moves.copy()
+        self.history = other.history.copy()
         self.tags = other.tags.copy()
 
+    def sync_board(self):
+        """Rebuilds the mailbox and the color occupancies from the bitboards.
+        This has to be called after the bitboards are set directly (e.g. when loading a FEN).
+        """
+
+        self.mailbox = [None] * 64
+        for piece, bitboard in enumerate(self.bitboards):
+            for square in iter_squares(bitboard):
+                self.mailbox[square] = piece
+
+        self.occupancies = [self.occupancy(WHITE), self.occupancy(BLACK)]
+        self.hash = self.compute_hash()
+        self.status_cache = None
+        self.mg_score, self.eg_score, self.phase = score_pieces(self.bitboards)
+
+    def compute_hash(self) -> int:
+        """Computes the Zobrist hash of the position from scratch.
+        make_move keeps self.hash up to date, so this is only needed after setting up a position.
+
+        Returns:
+            int: 64 bit hash of the pieces, side to move, castling rights and en passant file
+        """
+
+        key = 0
+        for piece, bitboard in enumerate(self.bitboards):
+            for square in iter_squares(bitboard):
+                key ^= PIECE_KEYS[piece][square]
+
+        if not self.isWhiteTurn:
+            key ^= SIDE_KEY
+
+        key ^= CASTLING_KEYS[self.castling_rights]
+
+        if self.en_passant_capturable():
+            key ^= EN_PASSANT_KEYS[self.en_passant_target & 7]
+
+        return key
+
+    def en_passant_capturable(self) -> bool:
+        """Checks if the side to move has a pawn that attacks the en passant target square.
+        The en passant file is only part of the hash when this is true, so positions that only differ
+        by an en passant square nobody can use are treated as the same position.
+
+        Returns:
+            bool: Whether an en passant capture is possible (ignoring pins)
+        """
+        if self.en_passant_target is None:
+            return False
+        us = WHITE if self.isWhiteTurn else BLACK
+        return bool(PAWN_ATTACKS[us ^ 1][self.en_passant_target] & self.bitboards[us * 6 + PAWN])
+
+    @property
+    def white_kingside_castle(self) -> bool:
+        return bool(self.castling_rights & WHITE_KINGSIDE)
+
+    @white_kingside_castle.setter
+    def white_kingside_castle(self, value: bool):
+        self.set_castling_right(WHITE_KINGSIDE, value)
+
+    @property
+    def white_queenside_castle(self) -> bool:
+        return bool(self.castling_rights & WHITE_QUEENSIDE)
+
+    @white_queenside_castle.setter
+    def white_queenside_castle(self, value: bool):
+        self.set_castling_right(WHITE_QUEENSIDE, value)
+
+    @property
+    def black_kingside_castle(self) -> bool:
+        return bool(self.castling_rights & BLACK_KINGSIDE)
+
+    @black_kingside_castle.setter
+    def black_kingside_castle(self, value: bool):
+        self.set_castling_right(BLACK_KINGSIDE, value)
+
+    @property
+    def black_queenside_castle(self) -> bool:
+        return bool(self.castling_rights & BLACK_QUEENSIDE)
+
+    @black_queenside_castle.setter
+    def black_queenside_castle(self, value: bool):
+        self.set_castling_right(BLACK_QUEENSIDE, value)
+
+    def set_castling_right(self, right: int, value: bool):
+        """Sets or clears one of the castling rights.
+
+        Args:
+            right (int): Castling right (WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE or BLACK_QUEENSIDE)
+            value (bool): Whether the side can still castle that way
+        """
+        if value:
+            self.castling_rights |= right
+        else:
+            self.castling_rights &= ~right
+
     def __eq__(self, other: "Game") -> bool:
-        return False  # TODO: implement
+        """Checks if two games are in the same position (compared by Zobrist hash).
+
+        Args:
+            other (Game): Game to compare to
+
+        Returns:
+            bool: Whether the positions are the same
+        """
+        if not isinstance(other, Game):
+            return NotImplemented
+        return self.hash == other.hash
+
+    def __hash__(self) -> int:
+        return self.hash
 
     # def __repr__(self) -> str:
     # pass # TODO: implement
@@ -195,39 +372,17 @@ class Game:
 
             # Go through all files on the current rank
             for j in j_range:
-                # Get the bit at the current position
-                bit = 1 << (j + i * 8)
-
                 # TODO: custom colors?
                 board += Back.LIGHTGREEN_EX if (i + j) % 2 == 0 else Back.WHITE
                 board += Fore.BLACK
 
-                if self.black_pawns & bit:
-                    board += BLACK_TEXT[0]
-                elif self.black_knights & bit:
-                    board += BLACK_TEXT[1]
-                elif self.black_bishops & bit:
-                    board += BLACK_TEXT[2]
-                elif self.black_rooks & bit:
-                    board += BLACK_TEXT[3]
-                elif self.black_queens & bit:
-                    board += BLACK_TEXT[4]
-                elif self.black_king & bit:
-                    board += BLACK_TEXT[5]
-                elif self.white_pawns & bit:
-                    board += WHITE_TEXT[0]
-                elif self.white_knights & bit:
-                    board += WHITE_TEXT[1]
-                elif self.white_bishops & bit:
-                    board += WHITE_TEXT[2]
-                elif self.white_rooks & bit:
-                    board += WHITE_TEXT[3]
-                elif self.white_queens & bit:
-                    board += WHITE_TEXT[4]
-                elif self.white_king & bit:
-                    board += WHITE_TEXT[5]
-                else:
+                piece = self.piece_at(j + i * 8)
+                if piece is None:
                     board += " "
+                elif piece < 6:
+                    board += WHITE_TEXT[piece]
+                else:
+                    board += BLACK_TEXT[piece - 6]
 
                 # Spacing
                 board += " " + Back.RESET + Fore.RESET
@@ -248,38 +403,14 @@ class Game:
             bool: Whether the move was successful or not
         """
 
-        # TODO: validate string lengths
-
-        # This takes a PGN move string and makes the move
-
-        # This parses a PGN move string from back to front
-        # This is easier since the back is more consistent
-        # than the front in terms of position in the string.
-        # From the back it will always be (if they exist):
-        #   - Check/Checkmate
-        #   - Promotion
-        #   - Position to move to
-        #   - Takes
-        #   - Deciding position (rank, file, or both)
-        #       (if there are two pieces that can move to the same square)
-        #   - Piece type
-
-        move = self.parse_pgn_move(move_str)
-        
-        
-        if move is None:
+        try:
+            move = self.parse_san(move_str)
+        except ValueError as error:
+            print(error)
             return False
 
-        if move in ["O-O", "O-O-O"]:
-            # TODO: self.castle(move)
-            return True
-
-        # TODO: Get location of piece that is moving
-
-        # TODO: Get location of piece that is being taken
-
-        # TODO: Move the piece
-        
+        self.make_move(move)
+        self.moves.append(move)
         return True
 
     def move(
@@ -291,98 +422,614 @@ class Game:
         promotion: str = None,
         check: bool = False,
         checkmate: bool = False,
-    ):
+    ) -> bool:
         """Makes a move on the board based on the given parameters.
+        The move is only made if it is legal in the current position.
 
         Args:
             from_pos (str): Position to move from (e.g. "a1", "b2", "c3")
             to_pos (str): Position to move to (e.g. "a1", "b2", "c3")
-            piece (str): Type of piece to move (e.g. "N", "B", "R", "Q", "K", "a-h")
+            piece (str): Type of piece to move (e.g. "N", "B", "R", "Q", "K", "a-h", "O-O", "O-O-O")
             takes (bool): Whether the move is a take or not
             promotion (str, optional): Type of piece to promote to. Defaults to None.
             check (bool, optional): Whether the move is a check. Defaults to False.
             checkmate (bool, optional): Whether the move is a checkmate. Defaults to False.
+
+        Returns:
+            bool: Whether the move was made or not
         """
-        
-        # TODO: validate move parameters
-        # e.g. pawns must promote on the last rank
-
-        # Get move bits from positions
-        move = self.two_pos_to_bit(from_pos, to_pos)
-
-        # XOR the bitboard with the move number to move the piece
-        if self.isWhiteTurn:
-            match piece:
-                case "N":
-                    self.white_knights ^= move
-                case "B":
-                    self.white_bishops ^= move
-                case "R":
-                    self.white_rooks ^= move
-                case "Q":
-                    self.white_queens ^= move
-                case "K":
-                    self.white_king ^= move
-                case "O-O":  # Kingside Castling
-                    king_move = self.two_pos_to_bit("e1", "g1")
-                    rook_move = self.two_pos_to_bit("h1", "f1")
-
-                    self.white_king ^= king_move
-                    self.white_rooks ^= rook_move
-
-                    self.white_kingside_castle = False
-                    self.white_queenside_castle = False
-                case "O-O-O":  # Queenside Castling
-                    king_move = self.two_pos_to_bit("e1", "c1")
-                    rook_move = self.two_pos_to_bit("a1", "d1")
-
-                    self.white_king ^= king_move
-                    self.white_rooks ^= rook_move
-
-                    self.white_kingside_castle = False
-                    self.white_queenside_castle = False
-                case _:
-                    self.white_pawns ^= move
+
+        # Castling is given by the piece, the king always starts on the e file
+        if piece in ["O-O", "O-O-O"]:
+            back_rank = "1" if self.isWhiteTurn else "8"
+            from_pos = "e" + back_rank
+            to_pos = ("g" if piece == "O-O" else "c") + back_rank
+
+        from_square = SQUARE_INDEX[from_pos.lower()]
+        to_square = SQUARE_INDEX[to_pos.lower()]
+        promotion_type = (
+            None if promotion is None else PIECE_SYMBOLS.index(promotion.upper())
+        )
+
+        # Find the matching legal move
+        for move in self.generate_moves():
+            if (
+                move_from(move) == from_square
+                and move_to(move) == to_square
+                and promotion_piece(move) == promotion_type
+            ):
+                self.make_move(move)
+                self.moves.append(move)
+                return True
+
+        return False
+
+    def parse_san(self, san: str) -> int:
+        """Finds the legal move written in standard algebraic notation (e.g. "Nf3", "exd5", "O-O", "e8=Q+").
+
+        The pieces that could have made the move are found with attack tables from the destination square
+        (usually there is only one), so only their moves have to be generated.
+
+        Args:
+            san (str): Move in SAN. Check marks and annotations (+, #, !, ?) are ignored.
+
+        Raises:
+            ValueError: If the move is malformed, illegal or ambiguous
+
+        Returns:
+            int: Encoded move (see move.py)
+        """
+
+        piece_type, from_mask, to_square, promotion_type, castling = parse_san_token(san)
+        us = WHITE if self.isWhiteTurn else BLACK
+
+        if castling:
+            for move in self.generate_moves(captures=False, from_squares=self.bitboards[us * 6 + KING]):
+                if move >> 12 == castling:
+                    return move
+            raise ValueError(f"Illegal move: {san}")
+
+        found = 0
+        for move in self.generate_moves(from_squares=self.san_origins(piece_type, to_square) & from_mask):
+            if (move >> 6) & 0x3F == to_square and promotion_piece(move) == promotion_type:
+                if found:
+                    raise ValueError(f"Ambiguous move: {san}")
+                found = move
+
+        if not found:
+            raise ValueError(f"Illegal move: {san}")
+        return found
+
+    def parse_uci(self, uci: str) -> int:
+        """Finds the legal move written in UCI long algebraic notation (e.g. "e2e4", "e7e8q", "e1g1").
+
+        Args:
+            uci (str): Move in UCI notation
+
+        Raises:
+            ValueError: If the move is malformed or illegal
+
+        Returns:
+            int: Encoded move (see move.py)
+        """
+
+        from_square, to_square, promotion_type = parse_uci_squares(uci)
+        for move in self.generate_moves(from_squares=1 << from_square):
+            if (move >> 6) & 0x3F == to_square and promotion_piece(move) == promotion_type:
+                return move
+        raise ValueError(f"Illegal move: {uci}")
+
+    def san_origins(self, piece_type: int, to_square: int) -> int:
+        """Finds the pieces of the side to move that could move to a square, ignoring whether the move is legal.
+
+        Args:
+            piece_type (int): Type of the piece that moves
+            to_square (int): Square it moves to
+
+        Returns:
+            int: Bitboard of the pieces
+        """
+
+        us = WHITE if self.isWhiteTurn else BLACK
+        pieces = self.bitboards[us * 6 + piece_type]
+        occupied = self.occupancies[WHITE] | self.occupancies[BLACK]
+
+        match piece_type:
+            case 0:  # Pawn (captures, or one or two squares behind for a push)
+                behind = to_square - 8 if us == WHITE else to_square + 8
+                origins = PAWN_ATTACKS[us ^ 1][to_square]
+                if 0 <= behind < 64:
+                    origins |= 1 << behind
+                    if not (occupied >> behind) & 1:
+                        double = behind - 8 if us == WHITE else behind + 8
+                        if 0 <= double < 64:
+                            origins |= 1 << double
+                return origins & pieces
+            case 1:  # Knight
+                return KNIGHT_ATTACKS[to_square] & pieces
+            case 2:  # Bishop
+                return bishop_attacks(to_square, occupied) & pieces
+            case 3:  # Rook
+                return rook_attacks(to_square, occupied) & pieces
+            case 4:  # Queen
+                return queen_attacks(to_square, occupied) & pieces
+            case _:  # King
+                return KING_ATTACKS[to_square] & pieces
+
+    def move_to_san(self, move: int) -> str:
+        """Writes a legal move in standard algebraic notation, with + or # if it gives check or mate.
+
+        Args:
+            move (int): Legal move in the current position
+
+        Returns:
+            str: Move in SAN (e.g. "Nbd7", "exd5", "e8=Q+", "O-O")
+        """
+
+        from_square = move & 0x3F
+        to_square = (move >> 6) & 0x3F
+        flags = move >> 12
+
+        if flags == KING_CASTLE:
+            san = "O-O"
+        elif flags == QUEEN_CASTLE:
+            san = "O-O-O"
         else:
-            match piece:
-                case "N":
-                    self.black_knights ^= move
-                case "B":
-                    self.black_bishops ^= move
-                case "R":
-                    self.black_rooks ^= move
-                case "Q":
-                    self.black_queens ^= move
-                case "K":
-                    self.black_king ^= move
-                case "O-O":  # Kingside Castling
-                    king_move = self.two_pos_to_bit("e8", "g8")
-                    rook_move = self.two_pos_to_bit("h8", "f8")
-
-                    self.black_king ^= king_move
-                    self.black_rooks ^= rook_move
-
-                    self.black_kingside_castle = False
-                    self.black_queenside_castle = False
-                case "O-O-O":  # Queenside Castling
-                    king_move = self.two_pos_to_bit("e8", "c8")
-                    rook_move = self.two_pos_to_bit("a8", "d8")
-
-                    self.black_king ^= king_move
-                    self.black_rooks ^= rook_move
-
-                    self.black_kingside_castle = False
-                    self.black_queenside_castle = False
-                case _:
-                    self.black_pawns ^= move
-
-        # Switch the turn
-        self.isWhiteTurn = not self.isWhiteTurn
+            piece_type = self.mailbox[from_square] % 6
+            takes = "x" if flags & CAPTURE_FLAG else ""
+            if piece_type == PAWN:
+                san = (SQUARE_NAMES[from_square][0] + takes if takes else "") + SQUARE_NAMES[to_square]
+                if flags & PROMOTION_FLAG:
+                    san += "=" + PIECE_SYMBOLS[promotion_piece(move)]
+            else:
+                # Name the origin file, rank or both if another piece of the same type can also move there
+                others = 0
+                candidates = self.san_origins(piece_type, to_square) & ~(1 << from_square)
+                if candidates:
+                    for other in self.generate_moves(from_squares=candidates):
+                        if (other >> 6) & 0x3F == to_square:
+                            others |= 1 << (other & 0x3F)
+
+                origin = ""
+                if others:
+                    if not others & (FILE_A << (from_square & 7)):
+                        origin = SQUARE_NAMES[from_square][0]
+                    elif not others & (RANK_1 << (from_square & 0x38)):
+                        origin = SQUARE_NAMES[from_square][1]
+                    else:
+                        origin = SQUARE_NAMES[from_square]
+
+                san = PIECE_SYMBOLS[piece_type] + origin + takes + SQUARE_NAMES[to_square]
+
+        self.make_move(move)
+        if self.is_check():
+            san += "+" if self.generate_moves() else "#"
+        self.unmake_move()
+
+        return san
+
+    def make_move(self, move: int):
+        """Makes a move on the board. The move must be legal (see generate_moves).
+        An undo record is pushed onto the history so the move can be taken back with unmake_move.
+
+        Args:
+            move (int): Encoded move (see move.py)
+        """
+
+        bitboards = self.bitboards
+        mailbox = self.mailbox
+        occupancies = self.occupancies
+
+        us = WHITE if self.isWhiteTurn else BLACK
+        them = us ^ 1
+        from_square = move & 0x3F
+        to_square = (move >> 6) & 0x3F
+        flags = move >> 12
+        from_bit = 1 << from_square
+        to_bit = 1 << to_square
+        piece = mailbox[from_square]
+        old_key = key = self.hash
+        mg_score = self.mg_score
+        eg_score = self.eg_score
+
+        # Remove the captured piece
+        captured = None
+        if flags & CAPTURE_FLAG:
+            captured_square = to_square
+            if flags == EN_PASSANT:
+                captured_square = to_square - 8 if us == WHITE else to_square + 8
+            captured = mailbox[captured_square]
+            captured_bit = 1 << captured_square
+            bitboards[captured] ^= captured_bit
+            occupancies[them] ^= captured_bit
+            mailbox[captured_square] = None
+            key ^= PIECE_KEYS[captured][captured_square]
+            self.mg_score -= MG_TABLE[captured][captured_square]
+            self.eg_score -= EG_TABLE[captured][captured_square]
+            self.phase -= PHASE_TABLE[captured]
+
+        self.history.append(
+            (
+                move,
+                captured,
+                self.castling_rights,
+                self.en_passant_target,
+                self.halfmove_clock,
+                old_key,
+                mg_score,
+                eg_score,
+            )
+        )
+
+        # Take the old en passant file out of the hash
+        ep_square = self.en_passant_target
+        if ep_square is not None and PAWN_ATTACKS[them][ep_square] & bitboards[us * 6 + PAWN]:
+            key ^= EN_PASSANT_KEYS[ep_square & 7]
+
+        # Move the piece
+        move_bits = from_bit | to_bit
+        occupancies[us] ^= move_bits
+        mailbox[from_square] = None
+        key ^= PIECE_KEYS[piece][from_square]
+        self.mg_score -= MG_TABLE[piece][from_square]
+        self.eg_score -= EG_TABLE[piece][from_square]
+        if flags & PROMOTION_FLAG:
+            bitboards[piece] ^= from_bit
+            piece = us * 6 + PROMOTION_PIECES[flags & 3]
+            bitboards[piece] |= to_bit
+            self.phase += PHASE_TABLE[piece]
+        else:
+            bitboards[piece] ^= move_bits
+        mailbox[to_square] = piece
+        key ^= PIECE_KEYS[piece][to_square]
+        self.mg_score += MG_TABLE[piece][to_square]
+        self.eg_score += EG_TABLE[piece][to_square]
+
+        # Move the rook when castling
+        if flags == KING_CASTLE or flags == QUEEN_CASTLE:
+            rook_from, rook_to = CASTLING_ROOK_SQUARES[to_square]
+            rook = us * 6 + ROOK
+            rook_bits = (1 << rook_from) | (1 << rook_to)
+            bitboards[rook] ^= rook_bits
+            occupancies[us] ^= rook_bits
+            mailbox[rook_from] = None
+            mailbox[rook_to] = rook
+            key ^= PIECE_KEYS[rook][rook_from] ^ PIECE_KEYS[rook][rook_to]
+            self.mg_score += MG_TABLE[rook][rook_to] - MG_TABLE[rook][rook_from]
+            self.eg_score += EG_TABLE[rook][rook_to] - EG_TABLE[rook][rook_from]
+
+        # Update the state
+        castling_rights = self.castling_rights
+        self.castling_rights = castling_rights & (
+            CASTLING_RIGHTS_MASK[from_square] & CASTLING_RIGHTS_MASK[to_square]
+        )
+        key ^= CASTLING_KEYS[castling_rights] ^ CASTLING_KEYS[self.castling_rights]
+
+        if flags == DOUBLE_PAWN_PUSH:
+            ep_square = (from_square + to_square) >> 1
+            self.en_passant_target = ep_square
+            if PAWN_ATTACKS[us][ep_square] & bitboards[them * 6 + PAWN]:
+                key ^= EN_PASSANT_KEYS[ep_square & 7]
+        else:
+            self.en_passant_target = None
+
+        self.hash = key ^ SIDE_KEY
+
+        # piece is the promoted piece after a promotion, which is a pawn move too
+        if piece % 6 == PAWN or captured is not None or flags & PROMOTION_FLAG:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
 
-        # Increase the turn number
-        if self.isWhiteTurn:
+        if us == BLACK:
             self.fullmove_number += 1
 
+        self.isWhiteTurn = not self.isWhiteTurn
+
+    def unmake_move(self):
+        """Takes back the last move made with make_move."""
+
+        bitboards = self.bitboards
+        mailbox = self.mailbox
+        occupancies = self.occupancies
+
+        (
+            move,
+            captured,
+            self.castling_rights,
+            self.en_passant_target,
+            self.halfmove_clock,
+            self.hash,
+            self.mg_score,
+            self.eg_score,
+        ) = self.history.pop()
+
+        self.isWhiteTurn = not self.isWhiteTurn
+        us = WHITE if self.isWhiteTurn else BLACK
+        them = us ^ 1
+        if us == BLACK:
+            self.fullmove_number -= 1
+
+        from_square = move & 0x3F
+        to_square = (move >> 6) & 0x3F
+        flags = move >> 12
+        from_bit = 1 << from_square
+        to_bit = 1 << to_square
+        piece = mailbox[to_square]
+
+        # Move the piece back
+        move_bits = from_bit | to_bit
+        occupancies[us] ^= move_bits
+        mailbox[to_square] = None
+        if flags & PROMOTION_FLAG:
+            bitboards[piece] ^= to_bit
+            self.phase -= PHASE_TABLE[piece]
+            piece = us * 6 + PAWN
+            bitboards[piece] |= from_bit
+        else:
+            bitboards[piece] ^= move_bits
+        mailbox[from_square] = piece
+
+        # Move the rook back when castling
+        if flags == KING_CASTLE or flags == QUEEN_CASTLE:
+            rook_from, rook_to = CASTLING_ROOK_SQUARES[to_square]
+            rook = us * 6 + ROOK
+            rook_bits = (1 << rook_from) | (1 << rook_to)
+            bitboards[rook] ^= rook_bits
+            occupancies[us] ^= rook_bits
+            mailbox[rook_to] = None
+            mailbox[rook_from] = rook
+
+        # Put the captured piece back
+        if captured is not None:
+            captured_square = to_square
+            if flags == EN_PASSANT:
+                captured_square = to_square - 8 if us == WHITE else to_square + 8
+            captured_bit = 1 << captured_square
+            bitboards[captured] |= captured_bit
+            occupancies[them] |= captured_bit
+            mailbox[captured_square] = captured
+            self.phase += PHASE_TABLE[captured]
+
+    def generate_moves(
+        self, captures: bool = True, quiets: bool = True, from_squares: int = FULL_BOARD
+    ) -> list:
+        """Generates the legal moves for the side to move.
+
+        The checkers and pinned pieces are worked out once up front, then each piece's
+        pseudo-legal moves are masked so no move has to be tried on the board to see if it leaves the king in check.
+
+        Captures and quiet moves can be generated separately so a search can try the captures
+        before it has spent any time on the quiet moves. Promotions count as captures.
+
+        Args:
+            captures (bool, optional): Whether to generate captures and promotions. Defaults to True.
+            quiets (bool, optional): Whether to generate the other moves. Defaults to True.
+            from_squares (int, optional): Bitboard of the squares to generate moves from. Defaults to every square.
+
+        Returns:
+            list: Encoded moves (see move.py)
+        """
+
+        bb = self.bitboards
+        us = WHITE if self.isWhiteTurn else BLACK
+        them = us ^ 1
+        offset = us * 6
+        own = self.occupancies[us]
+        enemy = self.occupancies[them]
+        occupied = own | enemy
+        empty = ~occupied & FULL_BOARD
+        moves = []
+        append = moves.append
+
+        # Squares the moves are allowed to land on
+        kind_mask = (enemy if captures else 0) | (empty if quiets else 0)
+
+        king_square = lsb(bb[offset + KING])
+        checkers = self.attackers_to(king_square, occupied) & enemy
+
+        # King moves (the king is taken off the board so it can't hide behind itself from a slider)
+        occupied_without_king = occupied ^ (1 << king_square)
+        king_targets = KING_ATTACKS[king_square] & kind_mask if from_squares >> king_square & 1 else 0
+        for to_square in iter_squares(king_targets):
+            if not self.attackers_to(to_square, occupied_without_king) & enemy:
+                flags = CAPTURE if enemy >> to_square & 1 else QUIET
+                append(king_square | (to_square << 6) | (flags << 12))
+
+        # Only the king can move out of double check
+        if checkers & (checkers - 1):
+            return moves
+
+        # Other pieces must capture the checker or block the check
+        if checkers:
+            check_mask = checkers | BETWEEN[king_square][lsb(checkers)]
+        else:
+            check_mask = FULL_BOARD
+
+        # Pinned pieces are the only piece of ours between the king and an enemy slider
+        enemy_offset = them * 6
+        enemy_queens = bb[enemy_offset + QUEEN]
+        snipers = (rook_attacks(king_square, enemy) & (bb[enemy_offset + ROOK] | enemy_queens)) | (
+            bishop_attacks(king_square, enemy) & (bb[enemy_offset + BISHOP] | enemy_queens)
+        )
+        pinned = 0
+        for sniper in iter_squares(snipers):
+            blockers = BETWEEN[king_square][sniper] & occupied
+            if blockers and not blockers & (blockers - 1) and blockers & own:
+                pinned |= blockers
+
+        # Knights, bishops, rooks and queens
+        targets_mask = kind_mask & check_mask
+        for piece_type in (KNIGHT, BISHOP, ROOK, QUEEN):
+            for from_square in iter_squares(bb[offset + piece_type] & from_squares):
+                if piece_type == KNIGHT:
+                    # A pinned knight can never move
+                    if pinned >> from_square & 1:
+                        continue
+                    targets = KNIGHT_ATTACKS[from_square]
+                elif piece_type == BISHOP:
+                    targets = bishop_attacks(from_square, occupied)
+                elif piece_type == ROOK:
+                    targets = rook_attacks(from_square, occupied)
+                else:
+                    targets = queen_attacks(from_square, occupied)
+
+                targets &= targets_mask
+                if pinned >> from_square & 1:
+                    targets &= LINE[king_square][from_square]
+
+                for to_square in iter_squares(targets):
+                    flags = CAPTURE if enemy >> to_square & 1 else QUIET
+                    append(from_square | (to_square << 6) | (flags << 12))
+
+        # Pawns (pushes and captures are generated for all pawns at once by shifting the bitboard)
+        pawns = bb[offset + PAWN] & from_squares
+        if us == WHITE:
+            up = 8
+            single = (pawns << 8) & empty
+            double = ((single & (RANK_2 << 8)) << 8) & empty
+            left = ((pawns & ~FILE_A) << 7) & enemy
+            right = ((pawns & ~FILE_H) << 9) & enemy
+            left_shift, right_shift = 7, 9
+            promotion_rank = RANK_8
+        else:
+            up = -8
+            single = (pawns >> 8) & empty
+            double = ((single & (RANK_7 >> 8)) >> 8) & empty
+            left = ((pawns & ~FILE_A) >> 9) & enemy
+            right = ((pawns & ~FILE_H) >> 7) & enemy
+            left_shift, right_shift = -9, -7
+            promotion_rank = RANK_1
+
+        # Pushes to the last rank are promotions, which are generated with the captures
+        push_mask = check_mask & (
+            (promotion_rank if captures else 0) | (~promotion_rank & FULL_BOARD if quiets else 0)
+        )
+        if not quiets:
+            double = 0
+        if not captures:
+            left = right = 0
+
+        for targets, shift, flags in (
+            (single & push_mask, up, QUIET),
+            (double & check_mask, up * 2, DOUBLE_PAWN_PUSH),
+            (left & check_mask, left_shift, CAPTURE),
+            (right & check_mask, right_shift, CAPTURE),
+        ):
+            for to_square in iter_squares(targets):
+                from_square = to_square - shift
+                if pinned >> from_square & 1 and not LINE[king_square][from_square] >> to_square & 1:
+                    continue
+                if promotion_rank >> to_square & 1:
+                    # Promotion flags are 8-11, or 12-15 when capturing
+                    for promotion_flags in range(flags | 8, (flags | 8) + 4):
+                        append(from_square | (to_square << 6) | (promotion_flags << 12))
+                else:
+                    append(from_square | (to_square << 6) | (flags << 12))
+
+        # En passant is checked by making the capture on the occupancy, since taking two pawns off
+        # the same rank can uncover a check that the pin mask doesn't see
+        if captures and self.en_passant_target is not None:
+            ep_square = self.en_passant_target
+            captured_square = ep_square - up
+            for from_square in iter_squares(PAWN_ATTACKS[them][ep_square] & pawns):
+                occupied_after = (
+                    occupied ^ (1 << from_square) ^ (1 << captured_square) | (1 << ep_square)
+                )
+                attackers = self.attackers_to(king_square, occupied_after) & enemy
+                if not attackers & ~(1 << captured_square):
+                    append(from_square | (ep_square << 6) | (EN_PASSANT << 12))
+
+        # Castling (the king can't castle out of, through or into check)
+        if (
+            quiets
+            and not checkers
+            and self.castling_rights
+            and king_square == (4 if us == WHITE else 60)
+            and from_squares >> king_square & 1
+        ):
+            if us == WHITE:
+                sides = ((WHITE_KINGSIDE, KING_CASTLE), (WHITE_QUEENSIDE, QUEEN_CASTLE))
+            else:
+                sides = ((BLACK_KINGSIDE, KING_CASTLE), (BLACK_QUEENSIDE, QUEEN_CASTLE))
+            for right, flags in sides:
+                if not self.castling_rights & right:
+                    continue
+                to_square = king_square + 2 if flags == KING_CASTLE else king_square - 2
+                rook_from, rook_to = CASTLING_ROOK_SQUARES[to_square]
+                if not bb[offset + ROOK] >> rook_from & 1:
+                    continue
+                if BETWEEN[king_square][rook_from] & occupied:
+                    continue
+                if self.attackers_to(rook_to, occupied) & enemy or self.attackers_to(to_square, occupied) & enemy:
+                    continue
+                append(king_square | (to_square << 6) | (flags << 12))
+
+        return moves
+
+    def is_legal(self, move: int) -> bool:
+        """Checks if a move (e.g. one remembered from another position) is legal in this position.
+        Only the moves of the piece on the move's from square are generated.
+
+        Args:
+            move (int): Encoded move (see move.py)
+
+        Returns:
+            bool: Whether the move is legal or not
+        """
+        from_square = move & 0x3F
+        piece = self.mailbox[from_square]
+        if piece is None or (piece < 6) != self.isWhiteTurn:
+            return False
+        return move in self.generate_moves(from_squares=1 << from_square)
+
+    def perft(self, depth: int) -> int:
+        """Counts the leaf nodes of the legal move tree to the given depth.
+        This is used to check move generation against known counts and to measure its speed.
+        Also see https://www.chessprogramming.org/Perft
+
+        Args:
+            depth (int): Number of plies to search
+
+        Returns:
+            int: Number of leaf nodes
+        """
+
+        if depth <= 0:
+            return 1
+
+        moves = self.generate_moves()
+
+        # Leaves don't need to be made, only counted
+        if depth == 1:
+            return len(moves)
+
+        nodes = 0
+        for move in moves:
+            self.make_move(move)
+            nodes += self.perft(depth - 1)
+            self.unmake_move()
+
+        return nodes
+
+    def divide(self, depth: int) -> dict:
+        """Runs perft for each legal move so a wrong count can be narrowed down to a move.
+
+        Args:
+            depth (int): Number of plies to search (including the root move)
+
+        Returns:
+            dict: Leaf node count for each root move, keyed by UCI move string (e.g. "e2e4")
+        """
+
+        counts = {}
+        for move in self.generate_moves():
+            self.make_move(move)
+            counts[move_to_uci(move)] = self.perft(depth - 1)
+            self.unmake_move()
+
+        return counts
+
     def pos_to_bit(self, pos: str) -> int:
         """Converts a position to a bitboard.
 
@@ -393,11 +1040,7 @@ class Game:
             int: Bitboard of the position (e.g. a2 -> 0b00000000_00000000_00000000_00000000_00000000_00000000_00000000_00000010)
         """
 
-        file = pos[0]
-        rank = int(pos[1]) - 1
-
-        file_num = ["a", "b", "c", "d", "e", "f", "g", "h"].index(file.lower())
-        return 1 << (file_num + rank * 8)
+        return 1 << SQUARE_INDEX[pos.lower()]
 
     def bit_to_pos(self, bit: int) -> [str]:
         """Converts a bitboard to a list of positions.
@@ -408,7 +1051,7 @@ class Game:
         Returns:
             [str]: List of positions (e.g. ["a1", "b2", "c3"])
         """
-        pass  # TODO: implement
+        return [SQUARE_NAMES[square] for square in iter_squares(bit)]
 
     def two_pos_to_bit(self, pos1: str, pos2: str) -> int:
         """Converts two positions to a bitboard.
@@ -422,105 +1065,219 @@ class Game:
         """
         return self.pos_to_bit(pos1) ^ self.pos_to_bit(pos2)
 
+    def piece_at(self, square: int) -> int | None:
+        """Gets the piece on the given square.
+
+        Args:
+            square (int): Square index (0 is a1, 63 is h8)
+
+        Returns:
+            int | None: Piece index (see bitboards.py) or None if the square is empty
+        """
+        return self.mailbox[square]
+
+    def occupancy(self, color: int) -> int:
+        """Gets the bitboard of all pieces of the given color.
+
+        Args:
+            color (int): WHITE or BLACK
+
+        Returns:
+            int: Bitboard of the squares occupied by that color
+        """
+        bitboards = self.bitboards
+        offset = color * 6
+        return (
+            bitboards[offset]
+            | bitboards[offset + 1]
+            | bitboards[offset + 2]
+            | bitboards[offset + 3]
+            | bitboards[offset + 4]
+            | bitboards[offset + 5]
+        )
+
+    def attackers_to(self, square: int, occupied: int) -> int:
+        """Gets the pieces of both colors that attack the given square.
+
+        Args:
+            square (int): Square index
+            occupied (int): Bitboard of occupied squares to use for sliding pieces
+
+        Returns:
+            int: Bitboard of the attacking pieces
+        """
+        bb = self.bitboards
+        rooks = bb[3] | bb[4] | bb[9] | bb[10]
+        bishops = bb[2] | bb[4] | bb[8] | bb[10]
+        return (
+            (PAWN_ATTACKS[BLACK][square] & bb[0])
+            | (PAWN_ATTACKS[WHITE][square] & bb[6])
+            | (KNIGHT_ATTACKS[square] & (bb[1] | bb[7]))
+            | (KING_ATTACKS[square] & (bb[5] | bb[11]))
+            | (rook_attacks(square, occupied) & rooks)
+            | (bishop_attacks(square, occupied) & bishops)
+        )
+
+    def is_square_attacked(self, square: int, by_color: int) -> bool:
+        """Checks if the given square is attacked by any piece of the given color.
+
+        Args:
+            square (int): Square index
+            by_color (int): Color of the attacking side (WHITE or BLACK)
+
+        Returns:
+            bool: Whether the square is attacked or not
+        """
+        bb = self.bitboards
+        offset = by_color * 6
+
+        # Look from the square outwards with each piece's attack pattern
+        if PAWN_ATTACKS[by_color ^ 1][square] & bb[offset + PAWN]:
+            return True
+        if KNIGHT_ATTACKS[square] & bb[offset + KNIGHT]:
+            return True
+        if KING_ATTACKS[square] & bb[offset + KING]:
+            return True
+
+        occupied = self.occupancies[WHITE] | self.occupancies[BLACK]
+        queens = bb[offset + QUEEN]
+        if rook_attacks(square, occupied) & (bb[offset + ROOK] | queens):
+            return True
+        if bishop_attacks(square, occupied) & (bb[offset + BISHOP] | queens):
+            return True
+        return False
+
+    def available_squares(self, pos: str) -> int:
+        """Gets the squares the piece on the given position can move to, ignoring checks.
+
+        Args:
+            pos (str): Position of the piece (e.g. "a1", "b2", "c3")
+
+        Returns:
+            int: Bitboard of the available squares (0 if there is no piece)
+        """
+        square = SQUARE_INDEX[pos.lower()]
+        piece = self.piece_at(square)
+        if piece is None:
+            return 0
+
+        color = piece // 6
+        own = self.occupancies[color]
+        enemy = self.occupancies[color ^ 1]
+        occupied = own | enemy
+
+        match piece % 6:
+            case 0:  # Pawn
+                if color == WHITE:
+                    single = (1 << (square + 8)) & ~occupied
+                    double = (single << 8) & ~occupied if square // 8 == 1 else 0
+                else:
+                    single = (1 << square >> 8) & ~occupied
+                    double = (single >> 8) & ~occupied if square // 8 == 6 else 0
+                targets = enemy
+                if self.en_passant_target is not None:
+                    targets |= 1 << self.en_passant_target
+                return single | double | (PAWN_ATTACKS[color][square] & targets)
+            case 1:  # Knight
+                attacks = KNIGHT_ATTACKS[square]
+            case 2:  # Bishop
+                attacks = bishop_attacks(square, occupied)
+            case 3:  # Rook
+                attacks = rook_attacks(square, occupied)
+            case 4:  # Queen
+                attacks = queen_attacks(square, occupied)
+            case _:  # King
+                attacks = KING_ATTACKS[square]
+
+        return attacks & ~own
+
     def load_fen(self, fen: str):
-        """Loads the game from a FEN.
+        """Loads the game from a FEN (see fen.py).
 
         Args:
             fen (str): FEN to load
+
+        Raises:
+            ValueError: If the FEN is invalid
         """
+        self.load_position(parse_fen(fen))
 
-        # Set everything to 0
-        self.black_pawns = 0
-        self.black_knights = 0
-        self.black_bishops = 0
-        self.black_rooks = 0
-        self.black_queens = 0
-        self.black_king = 0
+    def to_fen(self) -> str:
+        """Gets the FEN of the current position.
 
-        self.white_pawns = 0
-        self.white_knights = 0
-        self.white_bishops = 0
-        self.white_rooks = 0
-        self.white_queens = 0
-        self.white_king = 0
+        Returns:
+            str: FEN of the position
+        """
+        return position_to_fen(self.position())
 
-        # Split the FEN into its components
-        fen_split = fen.split(" ")
-        (
-            piece_positions,
-            active_color,
-            castling_availability,
-            en_passant_target,
-            halfmove_clock,
-            fullmove_number,
-        ) = fen_split
-
-        # Get piece positions
-        piece_positions = piece_positions.split("/")
-        for rank in range(8):  # TODO: validate that there are 8 ranks in the FEN
-            file = 1
-            for item in piece_positions[rank]:
-                if item.isnumeric():
-                    file += int(item)
-                    continue
-                else:
-                    # Add the piece type
-                    bit = self.pos_to_bit(
-                        ["a", "b", "c", "d", "e", "f", "g", "h"][file - 1]
-                        + str(8 - rank)
-                    )
-                    match item:
-                        # Lowercase letters are black pieces
-                        case "p":
-                            self.black_pawns |= bit
-                        case "n":
-                            self.black_knights |= bit
-                        case "b":
-                            self.black_bishops |= bit
-                        case "r":
-                            self.black_rooks |= bit
-                        case "q":
-                            self.black_queens |= bit
-                        case "k":
-                            self.black_king |= bit
-
-                        # Capital letters are white pieces
-                        case "P":
-                            self.white_pawns |= bit
-                        case "N":
-                            self.white_knights |= bit
-                        case "B":
-                            self.white_bishops |= bit
-                        case "R":
-                            self.white_rooks |= bit
-                        case "Q":
-                            self.white_queens |= bit
-                        case "K":
-                            self.white_king |= bit
-
-                    file += 1
-
-        # Get the active color
-        self.isWhiteTurn = active_color == "w"
-
-        # TODO: implement
+    def position(self) -> Position:
+        """Takes a compact snapshot of the position (see position.py).
+        The move list, undo records and PGN tags are not part of it.
+
+        Returns:
+            Position: Current position
+        """
+        return Position(
+            self.bitboards,
+            Position.pack_state(
+                self.isWhiteTurn,
+                self.castling_rights,
+                self.en_passant_target,
+                self.halfmove_clock,
+                self.fullmove_number,
+            ),
+        )
+
+    def load_position(self, position: Position):
+        """Sets the game up from a snapshot taken with position().
+
+        Args:
+            position (Position): Position to load
+        """
+
+        self.bitboards = list(position.bitboards)
+        self.isWhiteTurn = position.is_white_turn
+        self.castling_rights = position.castling_rights
+        self.en_passant_target = position.en_passant_target
+        self.halfmove_clock = position.halfmove_clock
+        self.fullmove_number = position.fullmove_number
+
+        self.moves = []
+        self.history = []
+        self.tags = {}
+
+        self.sync_board()
 
     def load_pgn(self, pgn: str):
-        """Loads the game from a PGN.
+        """Loads the game from a PGN. If it has more than one game, the first one is loaded
+        (use pgn.read_games to go through all of them).
 
         Args:
             pgn (str): PGN to load
+
+        Raises:
+            ValueError: If the PGN has no games or has an invalid move
         """
-        pass  # TODO: implement
+
+        # pgn.py sets up Games itself, so it can't be imported until this module is loaded
+        from pgn import parse_game, read_chunks
+
+        for tags, movetext in read_chunks(pgn.splitlines()):
+            self.copy(parse_game(tags, movetext))
+            return
+
+        raise ValueError("PGN has no games")
 
     def parse_pgn_move(self, move_str: str) -> dict | str:
         """Parses a PGN move string into a dictionary of its components.
+        Piece letters are uppercase and files are lowercase, so "bxc3" is a pawn move and "Bxc3" is a bishop move.
 
         Args:
             move_str (str): Move string to parse
 
         Returns:
-            dict|str: Dictionary of the move's components or a string if the move is a resignation or castling
+            dict|str: Dictionary of the move's components or a string if the move is a resignation or castling.
+                      None if the move string is invalid.
         """
 
         # --- Check for resignation --- #
@@ -531,147 +1288,135 @@ class Game:
         if move_str in ["O-O", "O-O-O"]:
             return move_str
 
-        # To lowercase
-        move_str = move_str.lower()
-        
-        # Check length
-        if len(move_str) < 2:
-            print("Invalid move: Too short")
+        match = SAN_PATTERN.fullmatch(move_str)
+        if match is None:
+            print(f"Invalid move: {move_str}")
             return None
 
-        # --- Check/Checkmate --- #
-        check = False
-        checkmate = False
-        if move_str[-1] in ["+", "#"]:
-            check_str = move_str[-1]
-            move_str = move_str[:-1]
-
-            check = check_str == "+"
-            checkmate = check_str == "#"
+        piece, from_file, from_rank, takes, move_to, promotion, check_str = match.groups()
 
-            # If there is still a + or #, then it's invalid
-            if "+" in move_str or "#" in move_str:
-                print("Invalid move: Bad +/#")
-                return None
-
-        # If there is a + or # not at the end, then it's invalid
-        elif move_str in ["+", "#"]:
-            print("Invalid move: Bad +/#")
-            return None
-
-        # --- Promotion --- #
-        promotion = None
-        if move_str[-2] == "=":
-            promotion = move_str[-1]
-            move_str = move_str[:-2]
-
-            # Validate promotion
-            if promotion not in ["n", "b", "r", "q"]:
-                print("Invalid move: Bad promotion")
-                return None
-
-        # If there is still a =, then it's invalid
-        elif "=" in move_str:
-            print("Invalid move: Bad promotion")
-            return None
+        # Pawns are named by their file
+        if piece is None:
+            piece = from_file or move_to[0]
+            from_file = None if from_file == piece else from_file
 
-        # --- Position to move to --- #
-        move_to = move_str[-2:]
-        move_str = move_str[:-2]
+        deciding_pos = (from_file or "") + (from_rank or "")
 
-        # Validate position to move to
-        if len(move_to) != 2:
-            print("Invalid move: Bad position to move to")
-            return None
-        if not self.validate_is_pos(move_to):
-            print("Invalid move: Bad position to move to")
-            return None
-
-        # If move_str is empty now, then it's a pawn move (without a deciding position or takes)
-        if len(move_str) == 0:
-            piece = move_to[0]
-            return {
-                "piece": piece,
-                "deciding_pos": None,
-                "takes": False,
-                "move_to": move_to,
-                "promotion": promotion,
-                "check": check,
-                "checkmate": checkmate,
-            }
-
-        # --- Takes --- #
-        takes = move_str[-1] == "x"
-        if takes:
-            move_str = move_str[:-1]
-
-            # If there is still an x, then it's invalid
-            if "x" in move_str:
-                print("Invalid move: Bad take")
-                return None
-
-        # --- Deciding position --- #
-        deciding_pos = None
-
-        # Deciding position if there is more than 1 character left
-        if len(move_str) > 1:
-            deciding_pos = move_str[1:]
-            move_str = move_str[0]
-
-            # Check if it is a file or rank
-            if (
-                len(deciding_pos) == 1
-                and not self.validate_is_file(deciding_pos)
-                and not self.validate_is_rank(deciding_pos)
-            ):
-                print("Invalid move: Bad deciding position")
-                return None
-
-            # Check if it is a board position
-            if not self.validate_is_pos(deciding_pos):
-                print("Invalid move: Bad deciding position")
-                return None
-
-        # --- Piece type --- #
-        piece = move_str
-
-        # Validate piece type
-        if piece not in [
-            "n",
-            "b",
-            "r",
-            "q",
-            "k",
-            "a",
-            "b",
-            "c",
-            "d",
-            "e",
-            "f",
-            "g",
-            "h",
-        ]:
-            print("Invalid move: Bad piece type")
-            return None
-
-        # Return the parsed move
         return {
             "piece": piece,
-            "deciding_pos": deciding_pos,
-            "takes": takes,
+            "deciding_pos": deciding_pos or None,
+            "takes": takes is not None,
             "move_to": move_to,
             "promotion": promotion,
-            "check": check,
-            "checkmate": checkmate,
+            "check": check_str == "+",
+            "checkmate": check_str == "#",
         }
 
+    def status(self) -> tuple:
+        """Gets the pieces giving check to the side to move and how many legal moves it has.
+        Both are worked out once per position and kept with its hash, so asking about check, checkmate
+        and stalemate after a move only generates the legal moves once.
+
+        Returns:
+            tuple: (bitboard of the checking pieces, number of legal moves)
+        """
+
+        cached = self.status_cache
+        if cached is not None and cached[0] == self.hash:
+            return cached[1], cached[2]
+
+        us = WHITE if self.isWhiteTurn else BLACK
+        occupied = self.occupancies[WHITE] | self.occupancies[BLACK]
+        checkers = self.attackers_to(lsb(self.bitboards[us * 6 + KING]), occupied) & self.occupancies[us ^ 1]
+        legal_moves = len(self.generate_moves())
+
+        self.status_cache = (self.hash, checkers, legal_moves)
+        return checkers, legal_moves
+
     def is_check(self) -> bool:
         """Checks if the current side is in check.
 
         Returns:
             bool: Whether the current side is in check or not
         """
-        pass
+
+        # The search asks this in every position, so it only looks at the king unless the status is known
+        cached = self.status_cache
+        if cached is not None and cached[0] == self.hash:
+            return cached[1] != 0
+
+        us = WHITE if self.isWhiteTurn else BLACK
+        return self.is_square_attacked(lsb(self.bitboards[us * 6 + KING]), us ^ 1)
+
+    def is_repetition(self, count: int = 3) -> bool:
+        """Checks if the current position has come up count times in the game (including now).
+        Only the positions since the last capture or pawn move are compared, none before it can come back.
+
+        Args:
+            count (int, optional): Number of times. Defaults to 3 (threefold repetition).
+
+        Returns:
+            bool: Whether the position has come up count times
+        """
+
+        # The undo record of each move has the hash of the position it was made in.
+        # The same side has to be to move, so only every other position can match.
+        history = self.history
+        key = self.hash
+        oldest = len(history) - min(self.halfmove_clock, len(history))
+        seen = 1
+        for index in range(len(history) - 4, oldest - 1, -2):
+            if history[index][5] == key:
+                seen += 1
+                if seen >= count:
+                    return True
+        return False
+
+    def is_fifty_moves(self) -> bool:
+        """Checks if fifty moves (by each side) have been made without a capture or a pawn move."""
+        return self.halfmove_clock >= 100
+
+    def is_insufficient_material(self) -> bool:
+        """Checks if neither side has the pieces to checkmate (e.g. king and knight against king,
+        or only bishops that are all on the same color of square).
+
+        Returns:
+            bool: Whether checkmate is impossible
+        """
+
+        bitboards = self.bitboards
+        if (
+            bitboards[WHITE * 6 + PAWN]
+            | bitboards[BLACK * 6 + PAWN]
+            | bitboards[WHITE * 6 + ROOK]
+            | bitboards[BLACK * 6 + ROOK]
+            | bitboards[WHITE * 6 + QUEEN]
+            | bitboards[BLACK * 6 + QUEEN]
+        ):
+            return False
+
+        knights = bitboards[WHITE * 6 + KNIGHT] | bitboards[BLACK * 6 + KNIGHT]
+        bishops = bitboards[WHITE * 6 + BISHOP] | bitboards[BLACK * 6 + BISHOP]
+        minors = knights | bishops
+
+        # A single minor piece can't mate, and neither can bishops that can never leave their color
+        if not minors & (minors - 1):
+            return True
+        return not knights and (not bishops & LIGHT_SQUARES or not bishops & DARK_SQUARES)
+
+    def is_draw(self) -> bool:
+        """Checks if the game is drawn by threefold repetition, the fifty-move rule or insufficient material.
+        Stalemate is checked by is_stalemate. A checkmate on the move that ends the fifty moves still counts,
+        which is found from the cached status (see status).
+
+        Returns:
+            bool: Whether the game is drawn
+        """
+        return (
+            (self.is_fifty_moves() and not self.is_checkmate())
+            or self.is_repetition()
+            or self.is_insufficient_material()
+        )
 
     def is_checkmate(self) -> bool:
         """Checks if the current side is in checkmate.
@@ -679,7 +1424,8 @@ class Game:
         Returns:
             bool: Whether the current side is in checkmate or not
         """
-        pass
+        checkers, legal_moves = self.status()
+        return legal_moves == 0 and checkers != 0
 
     def is_stalemate(self) -> bool:
         """Checks if the current side is in stalemate.
@@ -687,7 +1433,8 @@ class Game:
         Returns:
             bool: Whether the current side is in stalemate or not
         """
-        pass
+        checkers, legal_moves = self.status()
+        return legal_moves == 0 and checkers == 0
 
     def validate_state(self) -> bool:
         """Validates the current state of the board. This includes:
@@ -0,0 +1,199 @@
+# Lazy SMP: several processes searching the same position with one shared transposition table
+#
+# Every process runs the normal iterative deepening search (see search.py) on the same root, and they
+# share their results through a SharedTranspositionTable (see tt.py). The helpers don't split the work,
+# they just fill the table with positions the main search will reach, so it finds cutoffs and best moves
+# to try first without searching for them itself. To keep the helpers from all searching the same tree
+# in the same order, every other helper searches each iteration a ply deeper, and the helpers try
+# the root moves (after the best one) in a shuffled order.
+# When the main search finishes, the helpers are stopped and the deepest result is reported.
+# The main search can also send each iteration it finishes back while it runs, e.g. for UCI info lines.
+# Also see https://www.chessprogramming.org/Lazy_SMP
+
+import multiprocessing
+import os
+import queue
+import random
+from game import Game
+from position import Position
+from search import Search
+from tt import SharedTranspositionTable
+
+
+class HelperSearch(Search):
+    """Search run by a helper process, which searches in a different order than the main search
+    and stops when told to through an event."""
+
+    def __init__(self, game, stop_event, depth_offset: int = 0, seed: int = 0, progress=None, **kwargs):
+        """Sets up a helper search.
+
+        Args:
+            game (Game): Game to search
+            stop_event (multiprocessing.Event): Set when the search should stop
+            depth_offset (int, optional): Plies to add to the depth of every iteration. Defaults to 0.
+            seed (int, optional): Seed for shuffling the root moves. Defaults to 0 (not shuffled).
+            progress (multiprocessing.Queue, optional): Queue to put every finished iteration on. Defaults to None.
+            **kwargs: Passed on to Search
+        """
+        super().__init__(game, **kwargs)
+        self.stop_event = stop_event
+        self.depth_offset = depth_offset
+        self.rng = random.Random(seed) if seed else None
+        self.progress = progress
+
+    def check_stop(self):
+        if self.stop_event.is_set():
+            self.stopped = True
+        super().check_stop()
+
+    def search_root(self, depth: int, root_moves: list) -> list:
+        if self.rng is not None:
+            others = root_moves[1:]
+            self.rng.shuffle(others)
+            root_moves = root_moves[:1] + others
+        lines = super().search_root(min(depth + self.depth_offset, self.max_depth), root_moves)
+        if self.progress is not None:
+            self.progress.put((None, lines, self.nodes, self.tb_hits))
+        return lines
+
+
+def _worker(
+    index: int,
+    packed: bytes,
+    history: list,
+    table_name: str,
+    entries: int,
+    generation: int,
+    options: dict,
+    time_manager,
+    stop_event,
+    results,
+    report: bool,
+):
+    """Process entry point: searches the position and puts (index, lines, nodes, tb_hits) on the results queue.
+    If report is set, the main search also puts (None, lines, nodes, tb_hits) there after every iteration."""
+
+    game = Game()
+    game.load_position(Position.from_bytes(packed))
+    game.history = history
+    tt = SharedTranspositionTable.attach(table_name, entries, generation)
+    try:
+        if index == 0:
+            progress = results if report else None
+            search = HelperSearch(game, stop_event, progress=progress, tt=tt, time_manager=time_manager, **options)
+        else:
+            search = HelperSearch(game, stop_event, depth_offset=index & 1, seed=index, tt=tt, **options)
+        lines = search.run()
+        results.put((index, lines, search.nodes, search.tb_hits))
+    finally:
+        tt.close()
+
+
+def lazy_smp_search(
+    game: Game,
+    count: int = 3,
+    max_depth: int = 64,
+    time_limit: float = None,
+    processes: int = None,
+    tt: SharedTranspositionTable = None,
+    tablebase=None,
+    stop_event=None,
+    time_manager=None,
+    on_iteration=None,
+) -> tuple:
+    """Searches a position with several processes sharing one transposition table.
+
+    Args:
+        game (Game): Game to search (it is left as it was)
+        count (int, optional): Number of moves to find. Defaults to 3.
+        max_depth (int, optional): Deepest iteration to search. Defaults to 64.
+        time_limit (float, optional): Seconds to search for. Defaults to None (no limit).
+        processes (int, optional): Number of processes (including the main search). Defaults to the number of CPUs.
+        tt (SharedTranspositionTable, optional): Table to reuse from earlier searches. Defaults to a new table.
+        tablebase (syzygy.Tablebase, optional): Endgame tablebase to probe (each process opens its own). Defaults to None.
+        stop_event (multiprocessing.Event, optional): Event another thread can set to stop the search early.
+            Defaults to a new event.
+        time_manager (timeman.TimeManager, optional): Clock for the main search to stop by (the helpers stop with it).
+            Defaults to None.
+        on_iteration (callable, optional): Called with (lines, nodes, tb_hits) of the main search every time it
+            finishes an iteration. Defaults to None.
+
+    Returns:
+        tuple: (the best lines, best first, like Search.run, total nodes searched by all processes)
+    """
+
+    processes = processes or os.cpu_count() or 1
+    own_table = tt is None
+    if own_table:
+        tt = SharedTranspositionTable()
+
+    options = {"max_depth": max_depth, "time_limit": time_limit, "multipv": count, "tablebase": tablebase}
+    packed = game.position().to_bytes()
+
+    # The moves since the last capture or pawn move, for the processes to find repetitions with
+    history = game.history[len(game.history) - min(game.halfmove_clock, len(game.history)) :]
+    stop_event = stop_event if stop_event is not None else multiprocessing.Event()
+    results = multiprocessing.Queue()
+
+    workers = [
+        multiprocessing.Process(
+            target=_worker,
+            args=(
+                index,
+                packed,
+                history,
+                tt.shm.name,
+                len(tt.keys),
+                tt.generation,
+                options,
+                time_manager if index == 0 else None,
+                stop_event,
+                results,
+                on_iteration is not None,
+            ),
+            daemon=True,
+        )
+        for index in range(processes)
+    ]
+
+    try:
+        for worker in workers:
+            worker.start()
+
+        # Once the main search is done the helpers can stop, they only have to finish their current iteration
+        found = {}
+        while len(found) < processes:
+            try:
+                index, lines, nodes, tb_hits = results.get(timeout=0.1)
+            except queue.Empty:
+                if any(worker.exitcode not in (None, 0) for worker in workers):
+                    raise RuntimeError("A search process failed")
+                continue
+            if index is None:
+                on_iteration(lines, nodes, tb_hits)
+                continue
+            found[index] = (lines, nodes)
+            if index == 0:
+                stop_event.set()
+
+        for worker in workers:
+            worker.join()
+    finally:
+        stop_event.set()
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+        if own_table:
+            tt.unlink()
+        else:
+            # Every search moved the shared table to the next generation
+            tt.new_search()
+
+    # Report the deepest search that found as many lines as the main one (the main search wins ties)
+    best_lines = found[0][0]
+    for index in range(1, processes):
+        lines = found[index][0]
+        if lines and len(lines) == len(best_lines) and lines[0]["depth"] > best_lines[0]["depth"]:
+            best_lines = lines
+
+    return best_lines, sum(nodes for _, nodes in found.values())
@@ -1,7 +1,70 @@
 from colorama import Fore, Style
 from game import Game
+from lazy_smp import lazy_smp_search
+from move import move_to_uci
+from polyglot import OpeningBook
+from search import find_best_moves, pv_to_str, score_to_str
+from syzygy import Tablebase
+from tt import SharedTranspositionTable, TranspositionTable
+import atexit
+import os
 import random
 
+# Seconds to think for when asked for a hint
+HINT_TIME = 5.0
+
+# Processes to search a hint with (see lazy_smp.py)
+HINT_PROCESSES = os.cpu_count() or 1
+
+# Polyglot opening book to take hints from before searching (used if the file exists)
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+
+# Directory of Syzygy tablebase files for hints in endgames (used if it exists)
+SYZYGY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "syzygy")
+
+# Transposition table kept between hints so later hints start from what earlier ones found
+hint_table = TranspositionTable()
+
+# Same for hints searched with several processes, created the first time it's needed
+hint_shared_table = None
+
+# Opening book, opened the first time it's needed (False if there isn't one)
+hint_book = None
+
+# Tablebase, opened the first time it's needed (False if there isn't one)
+hint_tablebase = None
+
+
+def get_hint_book():
+    """Gets the opening book for hints, opening it the first time. Returns None if there is no book."""
+    global hint_book
+    if hint_book is None:
+        try:
+            hint_book = OpeningBook(BOOK_PATH)
+        except (OSError, ValueError):
+            hint_book = False
+    return hint_book or None
+
+
+def get_hint_tablebase():
+    """Gets the tablebase for hints, opening it the first time. Returns None if there are no tables."""
+    global hint_tablebase
+    if hint_tablebase is None:
+        hint_tablebase = Tablebase(SYZYGY_PATH) if os.path.isdir(SYZYGY_PATH) else False
+        if hint_tablebase and hint_tablebase.max_pieces == 0:
+            hint_tablebase = False
+    return hint_tablebase or None
+
+
+def get_hint_shared_table() -> SharedTranspositionTable:
+    """Gets the shared transposition table for hints, creating it the first time."""
+    global hint_shared_table
+    if hint_shared_table is None:
+        hint_shared_table = SharedTranspositionTable()
+        atexit.register(hint_shared_table.unlink)
+    return hint_shared_table
+
+
 COMMANDS = ["quit", "help", "new", "print", "resign", "hint"]
 COMMAND_DESC = {
     "quit": "Close the program.",
@@ -9,7 +72,7 @@ COMMAND_DESC = {
     "new": "Start a new game.",
     "print": "Print the board.",
     "resign": "Resign the game.",
-    "hint": "Get the 3 best moves for the current position based on ♞.eef's evaluation.",
+    "hint": "Get the 3 best moves for the current position based on ♞.eef's evaluation.\n  Moves from the opening book (book.bin) are given if there are any, and endgames use the Syzygy tables in syzygy/.\n  Otherwise, optionally give the seconds to think for and the number of processes to use (e.g. hint 10 4).",
 }
 
 
@@ -62,6 +125,61 @@ def handle_command(command, game, args: list):
                 )
             else:
                 print(game)
+        case "hint":
+            if game is None:
+                print(
+                    f"{Fore.LIGHTRED_EX}No game is in progress. Type 'new' to create a new game.{Style.RESET_ALL}"
+                )
+                return game
+
+            # Book moves are found instantly, so there's no need to search in the opening
+            book = get_hint_book()
+            book_moves = book.moves(game) if book else []
+            if book_moves:
+                total = sum(weight for _, weight in book_moves) or 1
+                for i, (move, weight) in enumerate(book_moves[:3]):
+                    print(
+                        f"{Fore.LIGHTGREEN_EX}{i + 1}. {move_to_uci(move)}{Style.RESET_ALL}"
+                        f" (book, {100 * weight // total}%)"
+                    )
+                return game
+
+            time_limit = HINT_TIME
+            if len(args) > 0:
+                try:
+                    time_limit = float(args[0])
+                except ValueError:
+                    print(f"{Fore.LIGHTRED_EX}Invalid time: {args[0]}{Style.RESET_ALL}")
+                    return game
+
+            processes = HINT_PROCESSES
+            if len(args) > 1:
+                if not args[1].isdigit() or int(args[1]) < 1:
+                    print(f"{Fore.LIGHTRED_EX}Invalid number of processes: {args[1]}{Style.RESET_ALL}")
+                    return game
+                processes = int(args[1])
+
+            if processes > 1:
+                lines, _ = lazy_smp_search(
+                    game,
+                    count=3,
+                    time_limit=time_limit,
+                    processes=processes,
+                    tt=get_hint_shared_table(),
+                    tablebase=get_hint_tablebase(),
+                )
+            else:
+                lines = find_best_moves(
+                    game, count=3, time_limit=time_limit, tt=hint_table, tablebase=get_hint_tablebase()
+                )
+            if len(lines) == 0:
+                print("There are no legal moves.")
+
+            for i, line in enumerate(lines):
+                print(
+                    f"{Fore.LIGHTGREEN_EX}{i + 1}. {move_to_uci(line['move'])}{Style.RESET_ALL}"
+                    f" ({score_to_str(line['score'])}, depth {line['depth']}): {pv_to_str(line['pv'])}"
+                )
         case _:
             print("Not implemented yet.")
 
@@ -86,7 +204,7 @@ def __main__(*args, **kwargs):
 
         # Check commands
         if tokens[0] in COMMANDS:
-            game = handle_command(inp, game, tokens[1:])
+            game = handle_command(tokens[0], game, tokens[1:])
             continue
 
         # Check if game exists
@@ -103,6 +221,18 @@ def __main__(*args, **kwargs):
         if move_res:
             print(game)
 
+            if game.is_checkmate():
+                winner = "Black" if game.isWhiteTurn else "White"
+                print(f"{Fore.LIGHTYELLOW_EX}Checkmate, {winner} wins.{Style.RESET_ALL}")
+            elif game.is_stalemate():
+                print(f"{Fore.LIGHTYELLOW_EX}Draw by stalemate.{Style.RESET_ALL}")
+            elif game.is_repetition():
+                print(f"{Fore.LIGHTYELLOW_EX}Draw by threefold repetition.{Style.RESET_ALL}")
+            elif game.is_fifty_moves():
+                print(f"{Fore.LIGHTYELLOW_EX}Draw by the fifty-move rule.{Style.RESET_ALL}")
+            elif game.is_insufficient_material():
+                print(f"{Fore.LIGHTYELLOW_EX}Draw by insufficient material.{Style.RESET_ALL}")
+
 
 # Run main function
 if __name__ == "__main__":
@@ -0,0 +1,196 @@
+# Compact move encoding.
+#
+# A move is a plain int so that move lists are cheap to build, compare and store:
+#   bits 0-5:   square the piece moves from (0 is a1, 63 is h8)
+#   bits 6-11:  square the piece moves to
+#   bits 12-15: flags (see below)
+# This fits in 16 bits. 0 (a1 to a1) is never a real move and is used as "no move".
+# Also see https://www.chessprogramming.org/Encoding_Moves
+
+import re
+from functools import lru_cache
+from bitboards import (
+    BISHOP,
+    FILE_A,
+    FULL_BOARD,
+    KING,
+    KNIGHT,
+    PAWN,
+    PIECE_SYMBOLS,
+    QUEEN,
+    RANK_1,
+    ROOK,
+    SQUARE_INDEX,
+    SQUARE_NAMES,
+)
+
+NULL_MOVE = 0
+
+# Flags
+QUIET = 0
+DOUBLE_PAWN_PUSH = 1
+KING_CASTLE = 2
+QUEEN_CASTLE = 3
+CAPTURE = 4
+EN_PASSANT = 5
+KNIGHT_PROMOTION = 8
+BISHOP_PROMOTION = 9
+ROOK_PROMOTION = 10
+QUEEN_PROMOTION = 11
+KNIGHT_PROMOTION_CAPTURE = 12
+BISHOP_PROMOTION_CAPTURE = 13
+ROOK_PROMOTION_CAPTURE = 14
+QUEEN_PROMOTION_CAPTURE = 15
+
+# Bits of the flags
+CAPTURE_FLAG = 4
+PROMOTION_FLAG = 8
+
+# Piece type promoted to for the low 2 bits of a promotion flag
+PROMOTION_PIECES = [KNIGHT, BISHOP, ROOK, QUEEN]
+PROMOTION_LETTERS = "nbrq"
+
+# Piece, origin file, origin rank, capture, destination square, promotion and check mark of a SAN move
+SAN_PATTERN = re.compile(r"([NBRQK])?([a-h])?([1-8])?(x)?([a-h][1-8])(?:=?([NBRQ]))?([+#])?")
+
+
+def encode_move(from_square: int, to_square: int, flags: int = QUIET) -> int:
+    """Encodes a move as an int.
+
+    Args:
+        from_square (int): Square the piece moves from
+        to_square (int): Square the piece moves to
+        flags (int, optional): Move flags. Defaults to QUIET.
+
+    Returns:
+        int: Encoded move
+    """
+    return from_square | (to_square << 6) | (flags << 12)
+
+
+def move_from(move: int) -> int:
+    """Gets the square a move starts on."""
+    return move & 0x3F
+
+
+def move_to(move: int) -> int:
+    """Gets the square a move ends on."""
+    return (move >> 6) & 0x3F
+
+
+def move_flags(move: int) -> int:
+    """Gets the flags of a move."""
+    return move >> 12
+
+
+def is_capture(move: int) -> bool:
+    """Checks if a move captures a piece (including en passant)."""
+    return bool((move >> 12) & CAPTURE_FLAG)
+
+
+def is_promotion(move: int) -> bool:
+    """Checks if a move promotes a pawn."""
+    return bool((move >> 12) & PROMOTION_FLAG)
+
+
+def promotion_piece(move: int) -> int | None:
+    """Gets the piece type a move promotes to.
+
+    Returns:
+        int | None: Piece type (see bitboards.py) or None if the move is not a promotion
+    """
+    flags = move >> 12
+    if flags & PROMOTION_FLAG:
+        return PROMOTION_PIECES[flags & 3]
+    return None
+
+
+def move_to_uci(move: int) -> str:
+    """Converts a move to UCI long algebraic notation.
+
+    Args:
+        move (int): Encoded move
+
+    Returns:
+        str: Move string (e.g. "e2e4", "e7e8q"), "0000" for NULL_MOVE
+    """
+    if move == NULL_MOVE:
+        return "0000"
+
+    uci = SQUARE_NAMES[move & 0x3F] + SQUARE_NAMES[(move >> 6) & 0x3F]
+    flags = move >> 12
+    if flags & PROMOTION_FLAG:
+        uci += PROMOTION_LETTERS[flags & 3]
+    return uci
+
+
+def parse_uci_squares(uci: str) -> tuple:
+    """Splits a UCI move string into its squares and promotion piece.
+
+    Args:
+        uci (str): Move string (e.g. "e2e4", "e7e8q")
+
+    Raises:
+        ValueError: If the string is not a valid UCI move
+
+    Returns:
+        tuple: (from square, to square, promotion piece type or None)
+    """
+    if len(uci) not in (4, 5):
+        raise ValueError(f"Invalid UCI move: {uci}")
+
+    try:
+        from_square = SQUARE_INDEX[uci[0:2]]
+        to_square = SQUARE_INDEX[uci[2:4]]
+    except KeyError:
+        raise ValueError(f"Invalid UCI move: {uci}") from None
+
+    promotion = None
+    if len(uci) == 5:
+        if uci[4] not in PROMOTION_LETTERS:
+            raise ValueError(f"Invalid UCI move: {uci}")
+        promotion = PROMOTION_PIECES[PROMOTION_LETTERS.index(uci[4])]
+
+    return from_square, to_square, promotion
+
+
+@lru_cache(maxsize=4096)
+def parse_san_token(san: str) -> tuple:
+    """Parses the parts of a SAN move that don't depend on the position.
+    The same few thousand tokens make up almost every game, so the results are cached.
+
+    Args:
+        san (str): Move in SAN (e.g. "Nbd7", "exd5", "e8=Q+", "O-O"). Annotations (!, ?) are ignored.
+
+    Raises:
+        ValueError: If the string is not a valid SAN move
+
+    Returns:
+        tuple: (piece type, bitboard of the squares the piece can come from, destination square,
+                promotion piece type or None, castling flag or QUIET). Castling moves have no destination square (None).
+    """
+
+    text = san.rstrip("!?")
+    castling = text.rstrip("+#")
+    if castling in ("O-O", "0-0"):
+        return KING, FULL_BOARD, None, None, KING_CASTLE
+    if castling in ("O-O-O", "0-0-0"):
+        return KING, FULL_BOARD, None, None, QUEEN_CASTLE
+
+    match = SAN_PATTERN.fullmatch(text)
+    if match is None:
+        raise ValueError(f"Invalid move: {san}")
+    piece_letter, from_file, from_rank, _, to_name, promotion_letter, _ = match.groups()
+
+    piece_type = PAWN if piece_letter is None else PIECE_SYMBOLS.index(piece_letter)
+    if promotion_letter is not None and piece_type != PAWN:
+        raise ValueError(f"Invalid move: {san}")
+
+    from_mask = FULL_BOARD
+    if from_file is not None:
+        from_mask &= FILE_A << (ord(from_file) - 97)
+    if from_rank is not None:
+        from_mask &= RANK_1 << ((ord(from_rank) - 49) * 8)
+
+    promotion = None if promotion_letter is None else PIECE_SYMBOLS.index(promotion_letter)
+    return piece_type, from_mask, SQUARE_INDEX[to_name], promotion, QUIET
@@ -0,0 +1,131 @@
+# Move ordering for the search
+#
+# Alpha-beta cuts off sooner the earlier the best move is searched, so moves are tried in stages:
+#   1. The transposition table move (best move the last time the position was searched)
+#   2. Captures and promotions, most valuable victim first, then least valuable attacker (MVV-LVA)
+#   3. Killer moves (quiet moves that caused a cutoff at the same ply in a sibling position)
+#   4. The other quiet moves, by their history score (how often they have caused cutoffs)
+# The moves of each stage are only generated once the earlier stages are done, so when an early
+# move cuts off the quiet moves are never generated.
+# Also see https://www.chessprogramming.org/Move_Ordering
+
+from move import CAPTURE_FLAG, EN_PASSANT, PROMOTION_FLAG, PROMOTION_PIECES
+
+# Killer moves kept per ply
+KILLER_SLOTS = 2
+
+# History scores are halved once any of them goes over this so old results fade out
+HISTORY_LIMIT = 1 << 20
+
+# Victim/attacker order for MVV-LVA (pawn, knight, bishop, rook, queen, king)
+MVV_LVA_VALUES = [1, 3, 3, 5, 9, 20]
+
+
+def mvv_lva(game, move: int) -> int:
+    """Scores a capture or promotion for ordering. Higher is searched first.
+
+    Args:
+        game (Game): Game the move is made in
+        move (int): Capture or promotion
+
+    Returns:
+        int: Score (victim value times 32 minus attacker value, plus the promotion piece's value)
+    """
+
+    flags = move >> 12
+    score = 0
+    if flags & CAPTURE_FLAG:
+        if flags == EN_PASSANT:
+            victim = 0
+        else:
+            victim = game.mailbox[(move >> 6) & 0x3F] % 6
+        attacker = game.mailbox[move & 0x3F] % 6
+        score = MVV_LVA_VALUES[victim] * 32 - MVV_LVA_VALUES[attacker]
+    if flags & PROMOTION_FLAG:
+        score += MVV_LVA_VALUES[PROMOTION_PIECES[flags & 3]] * 32
+    return score
+
+
+class MoveOrdering:
+    """Killer moves and history scores collected during a search."""
+
+    def __init__(self, max_ply: int = 128):
+        """Creates empty tables.
+
+        Args:
+            max_ply (int, optional): Deepest ply killer moves are kept for. Defaults to 128.
+        """
+        self.max_ply = max_ply
+        self.clear()
+
+    def clear(self):
+        """Forgets all killer moves and history scores."""
+
+        # killers[ply] is a list of KILLER_SLOTS moves, most recent first
+        self.killers = [[0] * KILLER_SLOTS for _ in range(self.max_ply)]
+
+        # history[color * 4096 + to * 64 + from] (butterfly board, indexed by the low 12 bits of the move)
+        self.history = [0] * (2 * 64 * 64)
+
+    def add_cutoff(self, game, move: int, ply: int, depth: int):
+        """Records that a quiet move caused a beta cutoff.
+
+        Args:
+            game (Game): Game the move was made in (before making it)
+            move (int): Move that caused the cutoff
+            ply (int): Distance from the root
+            depth (int): Remaining depth of the node (deeper cutoffs count for more)
+        """
+
+        if ply < self.max_ply:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+
+        index = (0 if game.isWhiteTurn else 4096) + (move & 0xFFF)
+        self.history[index] += depth * depth
+        if self.history[index] > HISTORY_LIMIT:
+            self.history = [score >> 1 for score in self.history]
+
+    def moves(self, game, ply: int, tt_move: int = 0, quiets: bool = True):
+        """Generates the legal moves of the position in stages, best guesses first.
+
+        Args:
+            game (Game): Game to generate moves for
+            ply (int): Distance from the root (for killer moves)
+            tt_move (int, optional): Best move from the transposition table. Defaults to 0 (none).
+            quiets (bool, optional): Whether to generate quiet moves at all. Defaults to True.
+
+        Yields:
+            int: Legal moves, each exactly once
+        """
+
+        # 1. Transposition table move (it could be from another position if the hash collided)
+        if tt_move and game.is_legal(tt_move):
+            yield tt_move
+
+        # 2. Captures and promotions
+        captures = game.generate_moves(quiets=False)
+        captures.sort(key=lambda move: mvv_lva(game, move), reverse=True)
+        for move in captures:
+            if move != tt_move:
+                yield move
+
+        if not quiets:
+            return
+
+        # 3. Killer moves (only once the quiet moves are generated, since a killer has to be legal here)
+        quiet_moves = game.generate_moves(captures=False)
+        killers = self.killers[ply] if ply < self.max_ply else []
+        for move in killers:
+            if move and move != tt_move and move in quiet_moves:
+                yield move
+
+        # 4. Other quiet moves by history score
+        history = self.history
+        offset = 0 if game.isWhiteTurn else 4096
+        quiet_moves.sort(key=lambda move: history[offset + (move & 0xFFF)], reverse=True)
+        for move in quiet_moves:
+            if move != tt_move and move not in killers:
+                yield move
@@ -0,0 +1,205 @@
+# Perft and search split across processes
+#
+# Threads don't run Python code in parallel, so the root of the tree is split across a pool of processes.
+# Each task is a position packed with Position.to_bytes (at most 30 bytes) and the depth left to search,
+# so nothing big has to be pickled to the workers. Each worker sets up its own Game from the position.
+# Searches also get the undo records since the last capture or pawn move, so they see repetitions of
+# positions played before the root.
+#   - Perft splits the tree a ply or two below the root (so there are enough tasks to keep every worker
+#     busy) and adds up the counts.
+#   - Search gives each root move to a worker, which searches the position after it one ply shallower.
+#     The root moves are searched independently (they don't share alpha-beta bounds or a transposition table),
+#     so this searches more nodes than one search would, but the moves are searched at the same time.
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from game import Game
+from move import move_to_uci
+from position import Position
+from search import MATE_SCORE, MATE_THRESHOLD, Search
+
+# Perft is split one ply deeper when the root has fewer than this many moves per worker
+TASKS_PER_WORKER = 4
+
+
+def _load(packed: bytes) -> Game:
+    """Sets up a Game from a packed position."""
+    game = Game()
+    game.load_position(Position.from_bytes(packed))
+    return game
+
+
+def _perft_task(packed: bytes, depth: int) -> int:
+    """Worker: counts the leaf nodes below a packed position."""
+    return _load(packed).perft(depth)
+
+
+def _search_task(packed: bytes, history: list, move: int, max_depth: int, deadline: float | None) -> tuple:
+    """Worker: searches the position after a root move.
+
+    Returns:
+        tuple: (move, score for the side that made the move, pv, depth, nodes)
+    """
+
+    game = _load(packed)
+    game.history = history
+    game.make_move(move)
+
+    # Checkmate or stalemate after the move
+    if not game.generate_moves():
+        return move, MATE_SCORE - 1 if game.is_check() else 0, [move], 1, 1
+
+    # Drawn after the move, which the search would find one ply below the root (see Search.negamax)
+    if (
+        game.halfmove_clock >= 100
+        or (game.halfmove_clock >= 4 and game.is_repetition(2))
+        or game.is_insufficient_material()
+    ):
+        return move, 0, [move], 1, 1
+
+    # Only the root move to search, so the position after it is only resolved with captures
+    if max_depth <= 1:
+        search = Search(game)
+        search.start_time = time.perf_counter()
+        score = -search.quiescence(-MATE_SCORE, MATE_SCORE, 0)
+        return move, score, [move], 1, search.nodes
+
+    time_limit = None if deadline is None else max(0.0, deadline - time.time())
+    search = Search(game, max_depth=max_depth - 1, time_limit=time_limit)
+    best = search.run()[0]
+
+    # The score is for the opponent, one ply further from the root
+    score = -best["score"]
+    if score >= MATE_THRESHOLD:
+        score -= 1
+    elif score <= -MATE_THRESHOLD:
+        score += 1
+
+    return move, score, [move] + best["pv"], best["depth"] + 1, search.nodes
+
+
+def split(game: Game, plies: int) -> list:
+    """Lists the positions a number of plies below the root.
+
+    Args:
+        game (Game): Game to split (it is left as it was)
+        plies (int): Plies to go down (at least 1)
+
+    Returns:
+        list: (root move, packed position) for every line of legal moves
+    """
+
+    tasks = []
+    for move in game.generate_moves():
+        game.make_move(move)
+        if plies <= 1:
+            tasks.append((move, game.position().to_bytes()))
+        else:
+            tasks.extend((move, packed) for _, packed in split(game, plies - 1))
+        game.unmake_move()
+
+    return tasks
+
+
+def parallel_divide(game: Game, depth: int, workers: int = None) -> dict:
+    """Runs perft for each legal move across a pool of processes (see Game.divide).
+
+    Args:
+        game (Game): Game to count (it is left as it was)
+        depth (int): Number of plies to search (including the root move)
+        workers (int, optional): Number of processes. Defaults to the number of CPUs.
+
+    Returns:
+        dict: Leaf node count for each root move, keyed by UCI move string (e.g. "e2e4")
+    """
+
+    workers = workers or os.cpu_count() or 1
+    if depth <= 1:
+        return game.divide(depth)
+
+    # Go a ply deeper if the root moves alone would leave workers idle near the end
+    plies = 1
+    if depth > 2 and len(game.generate_moves()) < workers * TASKS_PER_WORKER:
+        plies = 2
+    tasks = split(game, plies)
+
+    counts = {move_to_uci(move): 0 for move in game.generate_moves()}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(
+            _perft_task,
+            [packed for _, packed in tasks],
+            [depth - plies] * len(tasks),
+            chunksize=max(1, len(tasks) // (workers * TASKS_PER_WORKER)),
+        )
+        for (move, _), nodes in zip(tasks, results):
+            counts[move_to_uci(move)] += nodes
+
+    return counts
+
+
+def parallel_perft(game: Game, depth: int, workers: int = None) -> int:
+    """Counts the leaf nodes of the legal move tree across a pool of processes (see Game.perft).
+
+    Args:
+        game (Game): Game to count (it is left as it was)
+        depth (int): Number of plies to search
+        workers (int, optional): Number of processes. Defaults to the number of CPUs.
+
+    Returns:
+        int: Number of leaf nodes
+    """
+    if depth <= 1:
+        return game.perft(depth)
+    return sum(parallel_divide(game, depth, workers).values())
+
+
+def parallel_search(
+    game: Game,
+    count: int = 3,
+    max_depth: int = 64,
+    time_limit: float = None,
+    workers: int = None,
+) -> tuple:
+    """Finds the best moves in a position by searching each root move in its own process.
+
+    Args:
+        game (Game): Game to search (it is left as it was)
+        count (int, optional): Number of moves to return. Defaults to 3.
+        max_depth (int, optional): Deepest iteration to search, counting the root move. Defaults to 64.
+        time_limit (float, optional): Seconds to search for. Defaults to None (no limit).
+        workers (int, optional): Number of processes. Defaults to the number of CPUs.
+
+    Returns:
+        tuple: (the best lines, best first, like Search.run, total nodes searched)
+    """
+
+    moves = game.generate_moves()
+    if not moves:
+        return [], 0
+
+    workers = workers or os.cpu_count() or 1
+    deadline = None if time_limit is None else time.time() + time_limit
+    packed = game.position().to_bytes()
+
+    # The moves since the last capture or pawn move, for the workers to find repetitions with
+    history = game.history[len(game.history) - min(game.halfmove_clock, len(game.history)) :]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(moves))) as executor:
+        results = list(
+            executor.map(
+                _search_task,
+                [packed] * len(moves),
+                [history] * len(moves),
+                moves,
+                [max_depth] * len(moves),
+                [deadline] * len(moves),
+            )
+        )
+
+    results.sort(key=lambda result: result[1], reverse=True)
+    lines = [
+        {"move": move, "score": score, "pv": pv, "depth": depth}
+        for move, score, pv, depth, _ in results[:count]
+    ]
+    return lines, sum(result[4] for result in results)
@@ -0,0 +1,240 @@
+# Reading PGN (Portable Game Notation) files
+#
+# read_games goes through a PGN file one game at a time, so files of any size can be replayed
+# without loading them into memory. Each game is read as its tag pairs and its movetext, then the moves
+# are made on a new Game (SAN is resolved with Game.parse_san). Comments ({...} and ;...),
+# variations ((...)), NAGs ($1) and move numbers are skipped, only the main line is played.
+# Also see https://www.chessprogramming.org/Portable_Game_Notation
+
+import mmap
+import os
+import re
+from game import STARTING_FEN, Game
+
+# [Name "Value"]
+TAG_PATTERN = re.compile(r'\[\s*(\w+)\s*"((?:[^"\\]|\\.)*)"\s*\]')
+
+# Tokens of the movetext: comments, NAGs, variation brackets, move numbers, results and moves
+TOKEN_PATTERN = re.compile(
+    r"\{[^}]*\}?|;[^\n]*|\$\d+|[()]|\d+\.+|1-0|0-1|1/2-1/2|\*|[^\s{}();$.]+"
+)
+
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+
+
+def _open_lines(source, use_mmap: bool):
+    """Iterates over the lines of a PGN source.
+
+    Args:
+        source (str | os.PathLike | file): Path or file to read
+        use_mmap (bool): Whether to memory map the file instead of reading it through a buffer
+
+    Yields:
+        bytes | str: Lines, including the line ending (str if the file was opened in text mode)
+    """
+
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as file:
+            yield from _open_lines(file, use_mmap)
+        return
+
+    if use_mmap:
+        if os.fstat(source.fileno()).st_size == 0:
+            return
+        with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield from iter(mapped.readline, b"")
+        return
+
+    yield from source
+
+
+def scan_games(lines, keep_movetext: bool = True):
+    """Splits PGN lines into games without parsing the moves.
+
+    Args:
+        lines (iterable): Lines of PGN, including the line endings (bytes, or str which is encoded as UTF-8)
+        keep_movetext (bool, optional): Whether to keep the movetext. Defaults to True.
+
+    Yields:
+        tuple: (byte offset of the game's first line, tags dict, movetext str or None) for each game
+    """
+
+    offset = 0
+    start = None
+    tags = {}
+    movetext = []
+    has_movetext = False
+    in_comment = False
+
+    for line in lines:
+        if isinstance(line, str):
+            line = line.encode("utf-8")
+
+        line_offset = offset
+        offset += len(line)
+
+        stripped = line.strip()
+
+        # Escaped lines are for other programs to read
+        if not stripped or stripped[0] == 37:  # %
+            continue
+
+        if stripped[0] == 91 and not in_comment:  # [
+            # A tag after movetext starts the next game
+            if has_movetext:
+                yield start, tags, "\n".join(movetext) if keep_movetext else None
+                start = None
+                tags = {}
+                movetext = []
+                has_movetext = False
+
+            if start is None:
+                start = line_offset
+            for name, value in TAG_PATTERN.findall(stripped.decode("utf-8", errors="replace")):
+                tags[name] = value.replace('\\"', '"').replace("\\\\", "\\")
+            continue
+
+        if start is None:
+            start = line_offset
+        has_movetext = True
+        if keep_movetext:
+            movetext.append(stripped.decode("utf-8", errors="replace"))
+
+        # Keep track of multi-line comments so a "[" inside one isn't taken as a tag
+        opened = stripped.rfind(b"{")
+        closed = stripped.rfind(b"}")
+        if opened != closed:
+            in_comment = opened > closed
+
+    if start is not None:
+        yield start, tags, "\n".join(movetext) if keep_movetext else None
+
+
+def read_chunks(lines):
+    """Splits PGN lines into games without parsing the moves.
+
+    Args:
+        lines (iterable): Lines of PGN (bytes or str)
+
+    Yields:
+        tuple: (tags dict, movetext str) for each game
+    """
+    for _, tags, movetext in scan_games(lines):
+        yield tags, movetext
+
+
+def parse_game(tags: dict, movetext: str) -> Game:
+    """Sets up a Game from its tags and plays the main line of its movetext.
+
+    Args:
+        tags (dict): Tag pairs of the game (the game starts from the FEN tag if there is one)
+        movetext (str): Moves of the game
+
+    Raises:
+        ValueError: If the FEN tag or a move is invalid
+
+    Returns:
+        Game: Game after its last move, with its moves in Game.moves and its tags in Game.tags
+    """
+
+    if "FEN" in tags:
+        game = Game("fen", tags["FEN"])
+    else:
+        game = Game()
+    game.tags = dict(tags)
+
+    variation_depth = 0
+    for token in TOKEN_PATTERN.findall(movetext):
+        first = token[0]
+        if first == "(":
+            variation_depth += 1
+        elif first == ")":
+            variation_depth = max(0, variation_depth - 1)
+        elif variation_depth or first in "{;$" or first.isdigit() and token[-1] == ".":
+            continue
+        elif token in RESULTS:
+            game.tags.setdefault("Result", token)
+        else:
+            try:
+                move = game.parse_san(token)
+            except ValueError as error:
+                number = f"{game.fullmove_number}{'.' if game.isWhiteTurn else '...'}"
+                raise ValueError(f"{error} (move {number})") from None
+            game.make_move(move)
+            game.moves.append(move)
+
+    return game
+
+
+def read_games(source, use_mmap: bool = False, skip_invalid: bool = False):
+    """Reads the games of a PGN file one at a time.
+
+    Args:
+        source (str | os.PathLike | file): Path of the PGN file, or a file opened in binary or text mode
+        use_mmap (bool, optional): Whether to memory map the file (source has to be a path or a binary file).
+            Defaults to False.
+        skip_invalid (bool, optional): Whether to skip games with invalid moves instead of raising. Defaults to False.
+
+    Raises:
+        ValueError: If a game has an invalid move and skip_invalid is False
+
+    Yields:
+        Game: Each game after its last move
+    """
+
+    for number, (tags, movetext) in enumerate(read_chunks(_open_lines(source, use_mmap)), start=1):
+        try:
+            yield parse_game(tags, movetext)
+        except ValueError as error:
+            if not skip_invalid:
+                raise ValueError(f"Game {number}: {error}") from None
+
+
+def write_game(game: Game) -> str:
+    """Writes a game as PGN, with its tags and the moves in Game.moves from its starting position.
+
+    Args:
+        game (Game): Game to write (its moves have to have been made with make_move, e.g. by read_games or move_str)
+
+    Returns:
+        str: PGN of the game
+    """
+
+    # Go back to the starting position to write the moves out in SAN
+    replay = Game(game)
+    for _ in game.moves:
+        replay.unmake_move()
+
+    tags = dict(game.tags)
+    tags.setdefault("Result", "*")
+    if replay.to_fen() != STARTING_FEN:
+        tags["SetUp"] = "1"
+        tags["FEN"] = replay.to_fen()
+
+    lines = []
+    for name, value in tags.items():
+        escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+        lines.append(f'[{name} "{escaped}"]')
+    lines.append("")
+
+    tokens = []
+    for move in game.moves:
+        if replay.isWhiteTurn:
+            tokens.append(f"{replay.fullmove_number}.")
+        elif not tokens:
+            tokens.append(f"{replay.fullmove_number}...")
+        tokens.append(replay.move_to_san(move))
+        replay.make_move(move)
+    tokens.append(tags["Result"])
+
+    # Movetext lines are kept under 80 characters
+    line = ""
+    for token in tokens:
+        if line and len(line) + 1 + len(token) > 79:
+            lines.append(line)
+            line = token
+        else:
+            line = f"{line} {token}" if line else token
+    lines.append(line)
+
+    return "\n".join(lines) + "\n"
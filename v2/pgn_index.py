@@ -0,0 +1,293 @@
+# Index of the games in a PGN file, for finding games without reading the whole file
+#
+# Building the index reads the file once, only looking at the tag pairs (the moves aren't parsed),
+# and records where each game starts and the values of a few tags. With the index a game can be read
+# by its number by seeking straight to it, and games can be filtered by their tags without reading
+# the file at all. Only the games that are asked for are parsed into a Game.
+#
+# The index is saved next to the PGN file (games.pgn.idx for games.pgn) in a compact binary format,
+# all little endian:
+#   magic (8 bytes), PGN file size (8), number of games (8), number of tags (4), number of strings (4)
+#   tag names: length (2) + UTF-8 bytes for each
+#   strings: length (4) + UTF-8 bytes for each (every tag value is stored once, string 0 is "")
+#   offsets: byte offset of each game, then the file size (8 each)
+#   for each tag: the string number of the tag's value in each game (4 each)
+
+import os
+import struct
+import sys
+from array import array
+from pgn import parse_game, scan_games
+
+MAGIC = b"PGNIDX1\n"
+
+# Tags indexed by default (the Seven Tag Roster and the opening code)
+INDEXED_TAGS = ("Event", "Site", "Date", "Round", "White", "Black", "Result", "ECO")
+
+_HEADER = struct.Struct("<QQII")
+
+
+def _to_little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(typecode: str, data: bytes) -> array:
+    values = array(typecode, data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+class PgnIndex:
+    """Byte offsets and tag values of the games in a PGN file."""
+
+    def __init__(self, pgn_path: str, tag_names: tuple = INDEXED_TAGS):
+        """Creates an empty index. Use build or open to fill it.
+
+        Args:
+            pgn_path (str): Path of the PGN file
+            tag_names (tuple, optional): Tags to index. Defaults to INDEXED_TAGS.
+        """
+        self.pgn_path = os.fspath(pgn_path)
+        self.tag_names = tuple(tag_names)
+        self.pgn_size = 0
+
+        # offsets[n] is where game n starts, offsets[-1] is the end of the file
+        self.offsets = array("Q", [0])
+
+        # Every distinct tag value, and columns[tag][n] is the value's number for game n
+        self.strings = [""]
+        self.string_ids = {"": 0}
+        self.columns = {name: array("I") for name in self.tag_names}
+
+    @classmethod
+    def build(cls, pgn_path: str, tag_names: tuple = INDEXED_TAGS) -> "PgnIndex":
+        """Indexes a PGN file by reading its tags.
+
+        Args:
+            pgn_path (str): Path of the PGN file
+            tag_names (tuple, optional): Tags to index. Defaults to INDEXED_TAGS.
+
+        Returns:
+            PgnIndex: Index of the file
+        """
+
+        index = cls(pgn_path, tag_names)
+        offsets = array("Q")
+
+        with open(index.pgn_path, "rb") as file:
+            for offset, tags, _ in scan_games(file, keep_movetext=False):
+                offsets.append(offset)
+                for name in index.tag_names:
+                    index.columns[name].append(index.string_id(tags.get(name, "")))
+
+        index.pgn_size = os.path.getsize(index.pgn_path)
+        offsets.append(index.pgn_size)
+        index.offsets = offsets
+        return index
+
+    @classmethod
+    def open(cls, pgn_path: str, tag_names: tuple = INDEXED_TAGS) -> "PgnIndex":
+        """Loads the saved index of a PGN file, or builds and saves it if there isn't an up to date one
+        with the same tags.
+
+        Args:
+            pgn_path (str): Path of the PGN file
+            tag_names (tuple, optional): Tags to index. Defaults to INDEXED_TAGS.
+
+        Returns:
+            PgnIndex: Index of the file
+        """
+
+        index_path = cls.index_path(pgn_path)
+        if os.path.exists(index_path) and os.path.getmtime(index_path) >= os.path.getmtime(pgn_path):
+            try:
+                index = cls.load(pgn_path)
+                if index.tag_names == tuple(tag_names):
+                    return index
+            except ValueError:
+                pass
+
+        index = cls.build(pgn_path, tag_names)
+        index.save()
+        return index
+
+    @staticmethod
+    def index_path(pgn_path: str) -> str:
+        """Gets the path the index of a PGN file is saved to."""
+        return os.fspath(pgn_path) + ".idx"
+
+    def string_id(self, value: str) -> int:
+        """Gets the number of a tag value, adding it to the strings if it's new."""
+        string_id = self.string_ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.strings.append(value)
+            self.string_ids[value] = string_id
+        return string_id
+
+    def save(self, path: str = None):
+        """Saves the index.
+
+        Args:
+            path (str, optional): File to save to. Defaults to the PGN path with ".idx" added.
+        """
+
+        parts = [MAGIC, _HEADER.pack(self.pgn_size, len(self), len(self.tag_names), len(self.strings))]
+        for name in self.tag_names:
+            encoded = name.encode("utf-8")
+            parts.append(struct.pack("<H", len(encoded)) + encoded)
+        for value in self.strings:
+            encoded = value.encode("utf-8")
+            parts.append(struct.pack("<I", len(encoded)) + encoded)
+        parts.append(_to_little_endian(self.offsets))
+        for name in self.tag_names:
+            parts.append(_to_little_endian(self.columns[name]))
+
+        with open(path or self.index_path(self.pgn_path), "wb") as file:
+            file.write(b"".join(parts))
+
+    @classmethod
+    def load(cls, pgn_path: str, path: str = None) -> "PgnIndex":
+        """Loads a saved index.
+
+        Args:
+            pgn_path (str): Path of the PGN file
+            path (str, optional): File to load from. Defaults to the PGN path with ".idx" added.
+
+        Raises:
+            ValueError: If the file isn't an index or the PGN file has changed size since it was built
+
+        Returns:
+            PgnIndex: The index
+        """
+
+        with open(path or cls.index_path(pgn_path), "rb") as file:
+            data = file.read()
+
+        if data[: len(MAGIC)] != MAGIC:
+            raise ValueError("Not a PGN index file")
+        position = len(MAGIC)
+        pgn_size, count, tag_count, string_count = _HEADER.unpack_from(data, position)
+        position += _HEADER.size
+
+        if os.path.getsize(pgn_path) != pgn_size:
+            raise ValueError("PGN index is out of date")
+
+        tag_names = []
+        for _ in range(tag_count):
+            (length,) = struct.unpack_from("<H", data, position)
+            tag_names.append(data[position + 2 : position + 2 + length].decode("utf-8"))
+            position += 2 + length
+
+        index = cls(pgn_path, tag_names)
+        index.pgn_size = pgn_size
+
+        strings = []
+        for _ in range(string_count):
+            (length,) = struct.unpack_from("<I", data, position)
+            strings.append(data[position + 4 : position + 4 + length].decode("utf-8"))
+            position += 4 + length
+        index.strings = strings
+        index.string_ids = {value: string_id for string_id, value in enumerate(strings)}
+
+        size = (count + 1) * 8
+        index.offsets = _from_little_endian("Q", data[position : position + size])
+        position += size
+        for name in index.tag_names:
+            index.columns[name] = _from_little_endian("I", data[position : position + count * 4])
+            position += count * 4
+
+        if len(index.offsets) != count + 1 or position != len(data):
+            raise ValueError("PGN index file is truncated")
+
+        return index
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def tags(self, number: int) -> dict:
+        """Gets the indexed tags of a game.
+
+        Args:
+            number (int): Game number (0 is the first game)
+
+        Returns:
+            dict: Value of each indexed tag ("" if the game doesn't have it)
+        """
+        return {name: self.strings[self.columns[name][number]] for name in self.tag_names}
+
+    def read_text(self, number: int) -> bytes:
+        """Reads the PGN text of a game.
+
+        Args:
+            number (int): Game number (0 is the first game)
+
+        Returns:
+            bytes: The game's tags and movetext as they are in the file
+        """
+
+        if not 0 <= number < len(self):
+            raise IndexError("Game number out of range")
+
+        with open(self.pgn_path, "rb") as file:
+            file.seek(self.offsets[number])
+            return file.read(self.offsets[number + 1] - self.offsets[number])
+
+    def read_game(self, number: int):
+        """Reads and parses one game.
+
+        Args:
+            number (int): Game number (0 is the first game)
+
+        Raises:
+            IndexError: If there is no game with the number
+            ValueError: If the game has an invalid move
+
+        Returns:
+            Game: Game after its last move
+        """
+        for _, tags, movetext in scan_games(self.read_text(number).splitlines(keepends=True)):
+            return parse_game(tags, movetext)
+        raise ValueError("Game has no tags or moves")
+
+    def find(self, **filters):
+        """Finds the games whose tags match, without reading the PGN file.
+        Each filter is a tag name and either a value, a collection of values or a function of the value
+        that returns whether it matches (e.g. White="Morphy, Paul", ECO={"C41", "C42"}, Date=lambda d: d > "1900").
+
+        Raises:
+            KeyError: If a tag isn't indexed
+
+        Yields:
+            int: Numbers of the matching games, in order
+        """
+
+        # Work out which string numbers match each filter, so the games only have to be compared by number
+        conditions = []
+        for name, wanted in filters.items():
+            if name not in self.columns:
+                raise KeyError(f"Tag is not indexed: {name}")
+            if isinstance(wanted, str):
+                matching = {self.string_ids[wanted]} if wanted in self.string_ids else set()
+            elif callable(wanted):
+                matching = {string_id for string_id, value in enumerate(self.strings) if wanted(value)}
+            else:
+                matching = {self.string_ids[value] for value in wanted if value in self.string_ids}
+            conditions.append((self.columns[name], matching))
+
+        for number in range(len(self)):
+            if all(column[number] in matching for column, matching in conditions):
+                yield number
+
+    def games(self, **filters):
+        """Reads the games whose tags match (see find), parsing only those games.
+
+        Yields:
+            Game: Each matching game after its last move
+        """
+        for number in self.find(**filters):
+            yield self.read_game(number)
@@ -0,0 +1,179 @@
+# Compact, immutable snapshot of a position
+#
+# A Game carries a lot with it (mailbox, occupancies, undo records, move list, PGN tags, ...),
+# which makes it expensive to copy and store. A Position is only what is needed to set the board up again:
+#   bitboards: tuple of the 12 piece bitboards (same order as Game.bitboards)
+#   state: the rest of the position packed into one int:
+#       bit 0:      1 if it is black's turn
+#       bits 1-4:   castling rights (see Game.castling_rights)
+#       bits 5-11:  en passant target square + 1 (0 if there is none)
+#       bits 12-27: halfmove clock
+#       bits 28-47: fullmove number
+# Positions are hashable and compare equal when all of the above is the same, so they can be used as
+# dict keys and in sets. They also pickle through to_bytes, which is at most 30 bytes.
+# Use Game.position() to take a snapshot and Game.load_position() to set a game up from one.
+
+from bitboards import iter_squares
+
+_SIDE_MASK = 1
+_CASTLING_SHIFT = 1
+_EN_PASSANT_SHIFT = 5
+_HALFMOVE_SHIFT = 12
+_FULLMOVE_SHIFT = 28
+
+# Bytes used for the state by to_bytes (the fullmove number gets 20 bits)
+_STATE_BYTES = 6
+
+# Largest clocks that fit in the packed state (a real game never gets close to either)
+MAX_HALFMOVE_CLOCK = 0xFFFF
+MAX_FULLMOVE_NUMBER = (1 << (_STATE_BYTES * 8 - _FULLMOVE_SHIFT)) - 1
+
+
+class Position:
+    """Piece placement, side to move, castling rights, en passant square and clocks of a position."""
+
+    __slots__ = ("bitboards", "state")
+
+    def __init__(self, bitboards: tuple, state: int):
+        """Creates a position. Use Game.position() to get the position of a game.
+
+        Args:
+            bitboards (tuple): The 12 piece bitboards
+            state (int): Packed side to move, castling rights, en passant square and clocks (see pack_state)
+        """
+        self.bitboards = tuple(bitboards)
+        self.state = state
+
+    @staticmethod
+    def pack_state(
+        is_white_turn: bool,
+        castling_rights: int,
+        en_passant_target: int | None,
+        halfmove_clock: int,
+        fullmove_number: int,
+    ) -> int:
+        """Packs the state of a position into an int.
+
+        Args:
+            is_white_turn (bool): Whether it is white's turn
+            castling_rights (int): 4 bit castling rights mask
+            en_passant_target (int | None): En passant target square, or None
+            halfmove_clock (int): Halfmoves since the last capture or pawn move
+            fullmove_number (int): Fullmove number
+
+        Raises:
+            ValueError: If a clock doesn't fit in the packed state (see MAX_HALFMOVE_CLOCK and MAX_FULLMOVE_NUMBER)
+
+        Returns:
+            int: Packed state
+        """
+        if not 0 <= halfmove_clock <= MAX_HALFMOVE_CLOCK:
+            raise ValueError(f"Halfmove clock out of range (0 to {MAX_HALFMOVE_CLOCK}): {halfmove_clock}")
+        if not 1 <= fullmove_number <= MAX_FULLMOVE_NUMBER:
+            raise ValueError(f"Fullmove number out of range (1 to {MAX_FULLMOVE_NUMBER}): {fullmove_number}")
+        return (
+            (0 if is_white_turn else _SIDE_MASK)
+            | (castling_rights << _CASTLING_SHIFT)
+            | ((0 if en_passant_target is None else en_passant_target + 1) << _EN_PASSANT_SHIFT)
+            | (halfmove_clock << _HALFMOVE_SHIFT)
+            | (fullmove_number << _FULLMOVE_SHIFT)
+        )
+
+    @property
+    def is_white_turn(self) -> bool:
+        return not self.state & _SIDE_MASK
+
+    @property
+    def castling_rights(self) -> int:
+        return (self.state >> _CASTLING_SHIFT) & 0xF
+
+    @property
+    def en_passant_target(self) -> int | None:
+        square = (self.state >> _EN_PASSANT_SHIFT) & 0x7F
+        return square - 1 if square else None
+
+    @property
+    def halfmove_clock(self) -> int:
+        return (self.state >> _HALFMOVE_SHIFT) & 0xFFFF
+
+    @property
+    def fullmove_number(self) -> int:
+        return self.state >> _FULLMOVE_SHIFT
+
+    def __eq__(self, other: "Position") -> bool:
+        if not isinstance(other, Position):
+            return NotImplemented
+        return self.state == other.state and self.bitboards == other.bitboards
+
+    def __hash__(self) -> int:
+        return hash((self.bitboards, self.state))
+
+    def __repr__(self) -> str:
+        return f"Position({self.bitboards!r}, {self.state!r})"
+
+    # Positions are immutable, so copies can share the same object
+    def __copy__(self) -> "Position":
+        return self
+
+    def __deepcopy__(self, memo: dict) -> "Position":
+        return self
+
+    def __reduce__(self) -> tuple:
+        return (Position.from_bytes, (self.to_bytes(),))
+
+    def to_bytes(self) -> bytes:
+        """Packs the position into at most 30 bytes:
+        8 bytes of occupancy, 6 bytes of state and then the piece on each occupied square (a1 first)
+        as 4 bit piece indices, two per byte.
+
+        Returns:
+            bytes: Packed position
+        """
+
+        occupied = 0
+        for bitboard in self.bitboards:
+            occupied |= bitboard
+
+        pieces = [0] * 64
+        for piece, bitboard in enumerate(self.bitboards):
+            for square in iter_squares(bitboard):
+                pieces[square] = piece
+
+        nibbles = [pieces[square] for square in iter_squares(occupied)]
+        if len(nibbles) & 1:
+            nibbles.append(0)
+
+        return (
+            occupied.to_bytes(8, "little")
+            + self.state.to_bytes(_STATE_BYTES, "little")
+            + bytes(nibbles[i] | (nibbles[i + 1] << 4) for i in range(0, len(nibbles), 2))
+        )
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Position":
+        """Unpacks a position packed with to_bytes.
+
+        Args:
+            data (bytes): Packed position
+
+        Raises:
+            ValueError: If the data is too short for the number of pieces it has
+
+        Returns:
+            Position: Unpacked position
+        """
+
+        occupied = int.from_bytes(data[:8], "little")
+        state = int.from_bytes(data[8 : 8 + _STATE_BYTES], "little")
+        packed_pieces = data[8 + _STATE_BYTES :]
+
+        bitboards = [0] * 12
+        for i, square in enumerate(iter_squares(occupied)):
+            if i >> 1 >= len(packed_pieces):
+                raise ValueError("Packed position is missing pieces")
+            piece = (packed_pieces[i >> 1] >> ((i & 1) * 4)) & 0xF
+            if piece >= 12:
+                raise ValueError("Invalid piece in packed position")
+            bitboards[piece] |= 1 << square
+
+        return cls(bitboards, state)
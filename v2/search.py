@@ -0,0 +1,472 @@
+# Search for the best moves in a position
+#
+# Iterative deepening negamax with alpha-beta pruning and principal variation search (PVS).
+# The search works on the Game in place with make_move/unmake_move.
+# Also see https://www.chessprogramming.org/Search
+
+import time
+from bitboards import popcount
+from evaluation import evaluate
+from move import CAPTURE_FLAG, EN_PASSANT, PROMOTION_FLAG, move_to_uci
+from ordering import MoveOrdering
+from see import SEE_VALUES, see
+from tt import BOUND_EXACT, BOUND_LOWER, BOUND_UPPER, TranspositionTable
+
+INFINITY = 1_000_000
+
+# Mate scores are MATE_SCORE minus the number of plies to mate
+MATE_SCORE = 100_000
+MATE_THRESHOLD = MATE_SCORE - 1000
+
+# How often (in nodes) the clock is checked
+CHECK_INTERVAL = 1024
+CHECK_MASK = CHECK_INTERVAL - 1
+
+# Deepest ply the search (including quiescence) can reach
+MAX_PLY = 128
+
+# Score of a position the tablebase says is won (below the mate scores, as the mate isn't known)
+TB_WIN_SCORE = MATE_THRESHOLD - 2 * MAX_PLY
+
+# Scores of the tablebase results: loss, blessed loss, draw, cursed win, win (see syzygy.Tablebase.probe_wdl)
+TB_SCORES = [-TB_WIN_SCORE, -2, 0, 2, TB_WIN_SCORE]
+
+# Captures that can't raise the score to alpha even with this much extra are skipped in quiescence
+DELTA_MARGIN = 200
+
+
+class SearchStopped(Exception):
+    """Raised inside the search when it has to stop (time is up or stop() was called)."""
+
+
+def score_to_str(score: int) -> str:
+    """Formats a score for display.
+
+    Args:
+        score (int): Score in centipawns for the side to move
+
+    Returns:
+        str: Score in pawns (e.g. "+0.35") or moves to mate (e.g. "#3", "#-2")
+    """
+    if score >= MATE_THRESHOLD:
+        return f"#{(MATE_SCORE - score + 1) // 2}"
+    if score <= -MATE_THRESHOLD:
+        return f"#-{(MATE_SCORE + score) // 2}"
+    if score == TB_WIN_SCORE:
+        return "TB win"
+    if score == -TB_WIN_SCORE:
+        return "TB loss"
+    return f"{score / 100:+.2f}"
+
+
+def score_to_tt(score: int, ply: int) -> int:
+    """Makes a mate score relative to the position instead of the root before storing it in the transposition table."""
+    if score >= MATE_THRESHOLD:
+        return score + ply
+    if score <= -MATE_THRESHOLD:
+        return score - ply
+    return score
+
+
+def score_from_tt(score: int, ply: int) -> int:
+    """Makes a mate score from the transposition table relative to the root again."""
+    if score >= MATE_THRESHOLD:
+        return score - ply
+    if score <= -MATE_THRESHOLD:
+        return score + ply
+    return score
+
+
+class Search:
+    """Searches a Game for its best moves."""
+
+    def __init__(
+        self,
+        game,
+        max_depth: int = 64,
+        time_limit: float = None,
+        multipv: int = 1,
+        tt: TranspositionTable = None,
+        tablebase=None,
+        time_manager=None,
+    ):
+        """Sets up a search. Nothing is searched until run is called.
+
+        Args:
+            game (Game): Game to search, moves are made and taken back on it during the search
+            max_depth (int, optional): Deepest iteration to search. Defaults to 64.
+            time_limit (float, optional): Seconds to search for. Defaults to None (no limit).
+            multipv (int, optional): Number of best moves to find. Defaults to 1.
+            tt (TranspositionTable, optional): Table to share between searches. Defaults to a new table.
+            tablebase (syzygy.Tablebase, optional): Endgame tablebase to probe. Defaults to None.
+            time_manager (timeman.TimeManager, optional): Clock to search by, on top of time_limit. Defaults to None.
+        """
+
+        self.game = game
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self.multipv = multipv
+        self.tt = tt if tt is not None else TranspositionTable()
+        self.ordering = MoveOrdering()
+        self.tablebase = tablebase
+        self.time_manager = time_manager
+
+        self.nodes = 0
+        self.tb_hits = 0
+        self.start_time = 0.0
+        self.stopped = False
+
+        # The first iteration always finishes so there is always a move to return
+        self.can_stop = False
+
+        # Principal variation found at each ply of the current search
+        self.pv_table = [[] for _ in range(MAX_PLY + 1)]
+
+    def stop(self):
+        """Asks the search to stop as soon as possible. The last finished iteration is kept."""
+        self.stopped = True
+
+    def elapsed(self) -> float:
+        """Gets the seconds since the search started."""
+        return time.perf_counter() - self.start_time
+
+    def check_stop(self):
+        """Raises SearchStopped if the search has to stop."""
+        if not self.can_stop:
+            return
+        if (
+            self.stopped
+            or (self.time_limit is not None and self.elapsed() >= self.time_limit)
+            or (self.time_manager is not None and self.time_manager.out_of_time())
+        ):
+            self.stopped = True
+            raise SearchStopped()
+
+    def run(self) -> list:
+        """Runs iterative deepening until the depth or time limit is hit.
+
+        Returns:
+            list: The best lines, best first. Each is a dict with "move", "score", "pv" (list of moves) and "depth".
+                  Empty if there are no legal moves.
+        """
+
+        self.start_time = time.perf_counter()
+        self.nodes = 0
+        self.tb_hits = 0
+        self.can_stop = False
+        self.tt.new_search()
+        self.ordering.clear()
+
+        root_moves = self.game.generate_moves()
+        if len(root_moves) == 0:
+            return []
+
+        # In a tablebase ending, only search the moves that keep the best result and make progress
+        if self.tablebase is not None:
+            tablebase_moves = self.tablebase.root_moves(self.game)
+            if tablebase_moves:
+                root_moves = tablebase_moves
+
+        results = []
+        for depth in range(1, self.max_depth + 1):
+            try:
+                iteration = self.search_root(depth, root_moves)
+            except SearchStopped:
+                break
+
+            results = iteration
+            self.can_stop = True
+            if self.stopped:
+                break
+
+            # Search the best moves from this iteration first in the next one
+            ordered = [line["move"] for line in results]
+            root_moves = ordered + [move for move in root_moves if move not in ordered]
+
+            # No point searching deeper once a mate is found for every line
+            if all(abs(line["score"]) >= MATE_THRESHOLD for line in results):
+                break
+
+            # With a clock, stop when the best move has settled (or there is only one)
+            if self.time_manager is not None:
+                self.time_manager.update(results[0]["move"], results[0]["score"])
+                if len(root_moves) == 1 or self.time_manager.should_stop():
+                    break
+
+        return results
+
+    def search_root(self, depth: int, root_moves: list) -> list:
+        """Searches the root to the given depth, once per line of MultiPV.
+        Each line is searched with the moves of the better lines left out.
+
+        Args:
+            depth (int): Depth to search
+            root_moves (list): Legal moves of the root, in the order to search them
+
+        Returns:
+            list: The best lines (see run)
+        """
+
+        lines = []
+        excluded = []
+        for _ in range(min(self.multipv, len(root_moves))):
+            moves = [move for move in root_moves if move not in excluded]
+            score, pv = self.search_moves(depth, moves)
+            lines.append({"move": pv[0], "score": score, "pv": pv, "depth": depth})
+            excluded.append(pv[0])
+
+        return lines
+
+    def search_moves(self, depth: int, moves: list) -> tuple:
+        """Searches the given root moves with a full window.
+
+        Returns:
+            tuple: (score, principal variation)
+        """
+
+        game = self.game
+        alpha = -INFINITY
+        beta = INFINITY
+        best_pv = []
+
+        for index, move in enumerate(moves):
+            game.make_move(move)
+            try:
+                if index == 0:
+                    score = -self.negamax(depth - 1, -beta, -alpha, 1)
+                else:
+                    score = -self.negamax(depth - 1, -alpha - 1, -alpha, 1)
+                    if score > alpha:
+                        score = -self.negamax(depth - 1, -beta, -alpha, 1)
+            finally:
+                game.unmake_move()
+
+            if score > alpha or index == 0:
+                alpha = score
+                best_pv = [move] + self.pv_table[1]
+
+        return alpha, best_pv
+
+    def negamax(self, depth: int, alpha: int, beta: int, ply: int) -> int:
+        """Searches the position with alpha-beta and principal variation search.
+
+        Args:
+            depth (int): Remaining depth
+            alpha (int): Lower bound of the window
+            beta (int): Upper bound of the window
+            ply (int): Distance from the root
+
+        Returns:
+            int: Score for the side to move
+        """
+
+        self.nodes += 1
+        if not self.nodes & CHECK_MASK:
+            self.check_stop()
+
+        self.pv_table[ply] = []
+
+        # Drawn by the fifty-move rule (unless the fiftieth move was checkmate), by repetition or by material
+        # that can't mate. Inside the search a position coming back once is enough, whoever could avoid it
+        # would have done so the first time. The phase counts every minor piece and more for rooks and
+        # queens, so it rules out most positions before the material is looked at.
+        game = self.game
+        if (
+            (game.halfmove_clock >= 100 and (not game.is_check() or game.generate_moves()))
+            or (game.halfmove_clock >= 4 and game.is_repetition(2))
+            or (game.phase <= 2 and game.is_insufficient_material())
+        ):
+            return 0
+
+        if depth <= 0:
+            return self.quiescence(alpha, beta, ply)
+
+        key = game.hash
+
+        # Use the stored result if it was searched deep enough and its bound settles this window
+        tt_move = 0
+        entry = self.tt.probe(key)
+        if entry is not None:
+            tt_move, tt_score, tt_depth, bound = entry
+            if tt_depth >= depth:
+                tt_score = score_from_tt(tt_score, ply)
+                if (
+                    bound == BOUND_EXACT
+                    or (bound == BOUND_LOWER and tt_score >= beta)
+                    or (bound == BOUND_UPPER and tt_score <= alpha)
+                ):
+                    if tt_move:
+                        self.pv_table[ply] = [tt_move]
+                    return tt_score
+
+        # The result of a tablebase ending is known, so there's nothing to search.
+        # Only probe right after a capture or pawn move, where the fifty-move counter the tables assume is right.
+        tablebase = self.tablebase
+        if (
+            tablebase is not None
+            and game.halfmove_clock == 0
+            and not game.castling_rights
+            and popcount(game.occupancies[0] | game.occupancies[1]) <= tablebase.max_pieces
+        ):
+            wdl = tablebase.get_wdl(game)
+            if wdl is not None:
+                self.tb_hits += 1
+                score = TB_SCORES[wdl + 2]
+                # It holds at any depth
+                self.tt.store(key, 0, score, MAX_PLY, BOUND_EXACT)
+                return score
+
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_move = 0
+        index = -1
+
+        for index, move in enumerate(self.ordering.moves(game, ply, tt_move)):
+            game.make_move(move)
+            try:
+                if index == 0:
+                    score = -self.negamax(depth - 1, -beta, -alpha, ply + 1)
+                else:
+                    # Prove the move is worse than the best so far with a null window,
+                    # only search it fully if that fails
+                    score = -self.negamax(depth - 1, -alpha - 1, -alpha, ply + 1)
+                    if alpha < score < beta:
+                        score = -self.negamax(depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                game.unmake_move()
+
+            if score > best_score:
+                best_score = score
+                best_move = move
+
+                if score > alpha:
+                    alpha = score
+                    self.pv_table[ply] = [move] + self.pv_table[ply + 1]
+
+                    if score >= beta:
+                        if not (move >> 12) & (CAPTURE_FLAG | PROMOTION_FLAG):
+                            self.ordering.add_cutoff(game, move, ply, depth)
+                        break
+
+        # Checkmate or stalemate (mates closer to the root score higher)
+        if index == -1:
+            return -MATE_SCORE + ply if game.is_check() else 0
+
+        if best_score >= beta:
+            bound = BOUND_LOWER
+        elif best_score > original_alpha:
+            bound = BOUND_EXACT
+        else:
+            bound = BOUND_UPPER
+            best_move = 0
+        self.tt.store(key, best_move, score_to_tt(best_score, ply), depth, bound)
+
+        return best_score
+
+
+    def quiescence(self, alpha: int, beta: int, ply: int) -> int:
+        """Searches captures and promotions until the position is quiet, so the evaluation isn't
+        taken in the middle of an exchange (the horizon effect).
+
+        The side to move can "stand pat" with the static evaluation instead of capturing, except in check
+        where every evasion is searched. Captures that lose material (by SEE) or can't get the score
+        back up to alpha (delta pruning) are skipped.
+
+        Args:
+            alpha (int): Lower bound of the window
+            beta (int): Upper bound of the window
+            ply (int): Distance from the root
+
+        Returns:
+            int: Score for the side to move
+        """
+
+        self.nodes += 1
+        if not self.nodes & CHECK_MASK:
+            self.check_stop()
+
+        self.pv_table[ply] = []
+
+        game = self.game
+        if ply >= MAX_PLY:
+            return evaluate(game)
+
+        in_check = game.is_check()
+        if in_check:
+            best_score = -INFINITY
+            stand_pat = -INFINITY
+        else:
+            stand_pat = best_score = evaluate(game)
+            if stand_pat >= beta:
+                return stand_pat
+            if stand_pat > alpha:
+                alpha = stand_pat
+
+        searched = False
+        for move in self.ordering.moves(game, ply, quiets=in_check):
+            if not in_check:
+                flags = move >> 12
+                if not flags & PROMOTION_FLAG:
+                    # Delta pruning
+                    if flags & CAPTURE_FLAG and flags != EN_PASSANT:
+                        captured_value = SEE_VALUES[game.mailbox[(move >> 6) & 0x3F] % 6]
+                    else:
+                        captured_value = SEE_VALUES[0]
+                    if stand_pat + captured_value + DELTA_MARGIN <= alpha:
+                        continue
+
+                # Losing captures
+                if see(game, move) < 0:
+                    continue
+
+            searched = True
+            game.make_move(move)
+            try:
+                score = -self.quiescence(-beta, -alpha, ply + 1)
+            finally:
+                game.unmake_move()
+
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    self.pv_table[ply] = [move] + self.pv_table[ply + 1]
+                    if score >= beta:
+                        break
+
+        # Checkmate
+        if in_check and not searched:
+            return -MATE_SCORE + ply
+
+        return best_score
+
+
+def find_best_moves(
+    game,
+    count: int = 3,
+    max_depth: int = 64,
+    time_limit: float = None,
+    tt: TranspositionTable = None,
+    tablebase=None,
+) -> list:
+    """Finds the best moves in a position.
+
+    Args:
+        game (Game): Game to search (it is left as it was)
+        count (int, optional): Number of moves to find. Defaults to 3.
+        max_depth (int, optional): Deepest iteration to search. Defaults to 64.
+        time_limit (float, optional): Seconds to search for. Defaults to None (no limit).
+        tt (TranspositionTable, optional): Table to reuse from earlier searches. Defaults to a new table.
+        tablebase (syzygy.Tablebase, optional): Endgame tablebase to probe. Defaults to None.
+
+    Returns:
+        list: The best lines, best first (see Search.run)
+    """
+    return Search(
+        game, max_depth=max_depth, time_limit=time_limit, multipv=count, tt=tt, tablebase=tablebase
+    ).run()
+
+
+def pv_to_str(pv: list) -> str:
+    """Formats a principal variation as UCI moves separated by spaces."""
+    return " ".join(move_to_uci(move) for move in pv)
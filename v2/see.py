@@ -0,0 +1,92 @@
+# Static exchange evaluation (SEE)
+#
+# Works out the material result of a sequence of captures on one square, where both sides always
+# recapture with their least valuable piece and can stop capturing when it stops paying off.
+# Only the bitboards are used, nothing is made on the board. X-ray attackers (e.g. a rook behind a rook)
+# join in as the pieces in front of them are taken off the occupancy.
+# Also see https://www.chessprogramming.org/Static_Exchange_Evaluation
+
+from bitboards import BISHOP, BLACK, KING, PAWN, QUEEN, ROOK, WHITE, bishop_attacks, rook_attacks
+from move import CAPTURE_FLAG, EN_PASSANT, PROMOTION_FLAG, PROMOTION_PIECES
+
+# Value of each piece type for exchanges (pawn, knight, bishop, rook, queen, king)
+SEE_VALUES = [100, 320, 330, 500, 900, 20000]
+
+
+def see(game, move: int) -> int:
+    """Evaluates the exchange started by a move.
+
+    Args:
+        game (Game): Game the move is made in (before making it)
+        move (int): Capture or promotion to evaluate
+
+    Returns:
+        int: Material won (positive) or lost (negative) by the side making the move, in centipawns
+    """
+
+    bb = game.bitboards
+    from_square = move & 0x3F
+    to_square = (move >> 6) & 0x3F
+    flags = move >> 12
+    to_bit = 1 << to_square
+
+    occupied = game.occupancies[WHITE] | game.occupancies[BLACK]
+    side = BLACK if game.isWhiteTurn else WHITE
+
+    # First capture
+    attacker_value = SEE_VALUES[game.mailbox[from_square] % 6]
+    if flags == EN_PASSANT:
+        gain = [SEE_VALUES[PAWN]]
+        occupied ^= 1 << (to_square - 8 if side == BLACK else to_square + 8)
+    elif flags & CAPTURE_FLAG:
+        gain = [SEE_VALUES[game.mailbox[to_square] % 6]]
+    else:
+        gain = [0]
+    if flags & PROMOTION_FLAG:
+        promotion_value = SEE_VALUES[PROMOTION_PIECES[flags & 3]]
+        gain[0] += promotion_value - SEE_VALUES[PAWN]
+        attacker_value = promotion_value
+    occupied ^= 1 << from_square
+
+    bishops = bb[BISHOP] | bb[QUEEN] | bb[6 + BISHOP] | bb[6 + QUEEN]
+    rooks = bb[ROOK] | bb[QUEEN] | bb[6 + ROOK] | bb[6 + QUEEN]
+    attackers = game.attackers_to(to_square, occupied) & occupied
+
+    # Recaptures, each with the least valuable attacker
+    while True:
+        side_attackers = attackers & game.occupancies[side]
+        if not side_attackers:
+            break
+
+        for piece_type in range(PAWN, KING + 1):
+            subset = side_attackers & bb[side * 6 + piece_type]
+            if subset:
+                break
+
+        # The king can only recapture if nothing defends the square any more
+        if piece_type == KING and attackers & game.occupancies[side ^ 1]:
+            break
+
+        # Score if the capture is made, relative to the side making it
+        gain.append(attacker_value - gain[-1])
+
+        # The side to capture is worse off whether or not it does, so the exchange stops here
+        if max(-gain[-2], gain[-1]) < 0:
+            gain.pop()
+            break
+
+        attacker_value = SEE_VALUES[piece_type]
+        occupied ^= subset & -subset
+
+        # Pieces behind the one that captured can now attack the square
+        attackers |= (bishop_attacks(to_square, occupied) & bishops) | (
+            rook_attacks(to_square, occupied) & rooks
+        )
+        attackers &= occupied & ~to_bit
+        side ^= 1
+
+    # Go back through the captures, each side can stop instead of capturing
+    for i in range(len(gain) - 1, 0, -1):
+        gain[i - 1] = -max(-gain[i - 1], gain[i])
+
+    return gain[0]
@@ -0,0 +1,319 @@
+# Binary files of positions and games
+#
+# FEN and PGN are text that has to be parsed, which is slow for large datasets. These files store the
+# same information in a compact binary form that is read through a memory map, so a position is a slice
+# of the file and no parsing is needed beyond unpacking a few ints. All numbers are little endian.
+#
+# Position files: 8 byte header (POSITION_MAGIC), then one 32 byte record per position:
+#   Position.to_bytes (occupancy, state and 4 bits per piece, at most 30 bytes) padded with zeros
+# Records have a fixed size, so position n is at 8 + 32 * n and can be read without reading the ones before it.
+#
+# Game files: 8 byte header (GAME_MAGIC), then for each game:
+#   starting position (32 bytes, as above), number of moves (2 bytes), result (1 byte, see RESULTS),
+#   1 unused byte, then the moves as 16 bit move codes (see move.py)
+# Games have different lengths, so the offset of each game is found by skipping over the earlier ones
+# (only their move counts are read) the first time a game is looked up by number.
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from game import Game
+from position import Position
+
+POSITION_MAGIC = b"EEFPOS1\n"
+GAME_MAGIC = b"EEFGAM1\n"
+HEADER_SIZE = 8
+
+POSITION_SIZE = 32
+
+# Starting position, number of moves, result, unused
+_GAME_HEADER = struct.Struct("<32sHBx")
+
+# Result codes, index is the code
+RESULTS = ["*", "1-0", "0-1", "1/2-1/2"]
+
+
+def pack_position(position: Position) -> bytes:
+    """Packs a position into a fixed size record.
+
+    Args:
+        position (Position): Position to pack
+
+    Returns:
+        bytes: POSITION_SIZE bytes
+    """
+    return position.to_bytes().ljust(POSITION_SIZE, b"\0")
+
+
+def _open_map(path: str, magic: bytes, kind: str) -> tuple:
+    """Opens a file for reading through a memory map and checks its header.
+
+    Returns:
+        tuple: (file, memory map or None if the file is only a header)
+    """
+    file = open(path, "rb")
+    try:
+        if file.read(HEADER_SIZE) != magic:
+            raise ValueError(f"Not a {kind} file: {path}")
+        if os.fstat(file.fileno()).st_size == HEADER_SIZE:
+            return file, None
+        return file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except BaseException:
+        file.close()
+        raise
+
+
+class _BinaryFile:
+    """Opening and closing shared by the readers and writers."""
+
+    def close(self):
+        """Closes the file."""
+        if getattr(self, "map", None) is not None:
+            self.map.close()
+            self.map = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class PositionWriter(_BinaryFile):
+    """Writes positions to a position file. Appends to the file if it already exists."""
+
+    def __init__(self, path: str):
+        """Opens a position file for writing.
+
+        Args:
+            path (str): File to write to
+        """
+        exists = os.path.exists(path) and os.path.getsize(path) >= HEADER_SIZE
+        if exists:
+            with open(path, "rb") as file:
+                if file.read(HEADER_SIZE) != POSITION_MAGIC:
+                    raise ValueError(f"Not a position file: {path}")
+        self.file = open(path, "ab")
+        if not exists:
+            self.file.write(POSITION_MAGIC)
+
+    def write(self, position):
+        """Writes a position.
+
+        Args:
+            position (Position | Game): Position to write (a Game's current position is written)
+        """
+        if isinstance(position, Game):
+            position = position.position()
+        self.file.write(pack_position(position))
+
+    def write_many(self, positions):
+        """Writes positions.
+
+        Args:
+            positions (iterable): Positions or Games to write
+        """
+        for position in positions:
+            self.write(position)
+
+
+class PositionReader(_BinaryFile):
+    """Reads positions from a position file through a memory map."""
+
+    def __init__(self, path: str):
+        """Opens a position file for reading.
+
+        Args:
+            path (str): File to read
+
+        Raises:
+            ValueError: If the file isn't a position file
+        """
+        self.file, self.map = _open_map(path, POSITION_MAGIC, "position")
+        size = 0 if self.map is None else len(self.map)
+        self.count = max(0, size - HEADER_SIZE) // POSITION_SIZE
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> Position:
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("Position number out of range")
+        start = HEADER_SIZE + index * POSITION_SIZE
+        return Position.from_bytes(self.map[start : start + POSITION_SIZE])
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self[index]
+
+    def read_game(self, index: int) -> Game:
+        """Sets up a Game from a position in the file.
+
+        Args:
+            index (int): Position number
+
+        Returns:
+            Game: Game in the position
+        """
+        game = Game()
+        game.load_position(self[index])
+        return game
+
+
+def _moves_to_bytes(moves: list) -> bytes:
+    codes = array("H", moves)
+    if sys.byteorder == "big":
+        codes.byteswap()
+    return codes.tobytes()
+
+
+def _moves_from_bytes(data: bytes) -> list:
+    codes = array("H", data)
+    if sys.byteorder == "big":
+        codes.byteswap()
+    return codes.tolist()
+
+
+class GameWriter(_BinaryFile):
+    """Writes games to a game file. Appends to the file if it already exists."""
+
+    def __init__(self, path: str):
+        """Opens a game file for writing.
+
+        Args:
+            path (str): File to write to
+        """
+        exists = os.path.exists(path) and os.path.getsize(path) >= HEADER_SIZE
+        if exists:
+            with open(path, "rb") as file:
+                if file.read(HEADER_SIZE) != GAME_MAGIC:
+                    raise ValueError(f"Not a game file: {path}")
+        self.file = open(path, "ab")
+        if not exists:
+            self.file.write(GAME_MAGIC)
+
+    def write(self, game: Game):
+        """Writes a game: its starting position, its moves (Game.moves) and its result (the Result tag).
+
+        Args:
+            game (Game): Game to write (its moves have to have been made with make_move, e.g. by pgn.read_games)
+
+        Raises:
+            ValueError: If the game has more than 65535 moves
+        """
+
+        if len(game.moves) > 0xFFFF:
+            raise ValueError("Game has too many moves to store")
+
+        # Go back to the starting position
+        start = Game(game)
+        for _ in game.moves:
+            start.unmake_move()
+
+        result = game.tags.get("Result", "*")
+        self.write_moves(start.position(), game.moves, RESULTS.index(result) if result in RESULTS else 0)
+
+    def write_moves(self, start: Position, moves: list, result: int = 0):
+        """Writes a game from its starting position and moves, without having to set up a Game.
+
+        Args:
+            start (Position): Starting position
+            moves (list): Encoded moves (see move.py)
+            result (int, optional): Result code (index into RESULTS). Defaults to 0 (unknown).
+        """
+        self.file.write(_GAME_HEADER.pack(pack_position(start), len(moves), result))
+        self.file.write(_moves_to_bytes(moves))
+
+
+class GameReader(_BinaryFile):
+    """Reads games from a game file through a memory map."""
+
+    def __init__(self, path: str):
+        """Opens a game file for reading.
+
+        Args:
+            path (str): File to read
+
+        Raises:
+            ValueError: If the file isn't a game file
+        """
+        self.file, self.map = _open_map(path, GAME_MAGIC, "game")
+
+        # Offsets of the games, found the first time a game is looked up by number
+        self.offsets = None
+
+    def records(self):
+        """Reads the games without setting them up on a Game.
+
+        Yields:
+            tuple: (offset, starting Position, list of moves, result code)
+        """
+        if self.map is None:
+            return
+        data = self.map
+        offset = HEADER_SIZE
+        end = len(data)
+        while offset + _GAME_HEADER.size <= end:
+            packed, count, result = _GAME_HEADER.unpack_from(data, offset)
+            moves_start = offset + _GAME_HEADER.size
+            moves_end = moves_start + count * 2
+            if moves_end > end:
+                raise ValueError("Game file is truncated")
+            yield offset, Position.from_bytes(packed), _moves_from_bytes(data[moves_start:moves_end]), result
+            offset = moves_end
+
+    def _find_offsets(self):
+        offsets = array("Q")
+        if self.map is not None:
+            offset = HEADER_SIZE
+            while offset + _GAME_HEADER.size <= len(self.map):
+                offsets.append(offset)
+                (count,) = struct.unpack_from("<H", self.map, offset + 32)
+                offset += _GAME_HEADER.size + count * 2
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        if self.offsets is None:
+            self._find_offsets()
+        return len(self.offsets)
+
+    def record(self, index: int) -> tuple:
+        """Reads one game without setting it up on a Game.
+
+        Args:
+            index (int): Game number (0 is the first game)
+
+        Returns:
+            tuple: (starting Position, list of moves, result code)
+        """
+        if self.offsets is None:
+            self._find_offsets()
+        offset = self.offsets[index]
+        packed, count, result = _GAME_HEADER.unpack_from(self.map, offset)
+        moves_start = offset + _GAME_HEADER.size
+        return Position.from_bytes(packed), _moves_from_bytes(self.map[moves_start : moves_start + count * 2]), result
+
+    def __getitem__(self, index: int) -> Game:
+        return _replay(*self.record(index))
+
+    def __iter__(self):
+        for _, start, moves, result in self.records():
+            yield _replay(start, moves, result)
+
+
+def _replay(start: Position, moves: list, result: int) -> Game:
+    """Sets up a game from its starting position and plays its moves."""
+    game = Game()
+    game.load_position(start)
+    for move in moves:
+        game.make_move(move)
+        game.moves.append(move)
+    game.tags["Result"] = RESULTS[result] if result < len(RESULTS) else "*"
+    return game
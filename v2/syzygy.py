@@ -0,0 +1,1258 @@
+# Syzygy endgame tablebases
+#
+# Syzygy tables hold the exact result of every position with few pieces (up to 7). There are two kinds of file:
+#   - WDL (.rtbw): win, draw or loss for the side to move, counting the fifty-move rule
+#     (a "cursed" win or "blessed" loss is one the fifty-move rule turns into a draw)
+#   - DTZ (.rtbz): distance to zeroing, the number of plies to the next capture or pawn move
+#     that keeps the result. Playing the move with the lowest DTZ always makes progress.
+# Both are probed here by reading the files directly, without any other program or library.
+#
+# A position is turned into an index by ordering its pieces and using the board's symmetries
+# (see _Table.encode_pieces and _Table.encode_pawns), then the value at that index is decompressed.
+# The values are compressed in blocks of a few dozen bytes: each block is a stream of canonical Huffman codes,
+# and each code is a symbol that stands for a pair of symbols (recursively), so one symbol can cover
+# thousands of positions. A block is decoded into its list of symbols the first time it's needed and
+# kept in a least recently used cache, so probing nearby positions again (which a search does all the time)
+# only has to find the symbol and walk down its pairs.
+#
+# The tables only store positions without captures (a capture leads to a smaller table), so probing
+# also tries the captures (see Tablebase.probe_ab). The files are memory mapped when they're first probed,
+# so only the pages that are read are loaded and the operating system can drop them again.
+# Positions with castling rights aren't in the tables.
+# Also see https://www.chessprogramming.org/Syzygy_Bases
+
+import math
+import mmap
+import os
+import re
+import struct
+from bisect import bisect_right
+from collections import OrderedDict
+from bitboards import KING, KING_ATTACKS, PAWN, popcount
+from move import CAPTURE_FLAG, EN_PASSANT
+
+WDL_SUFFIX = ".rtbw"
+DTZ_SUFFIX = ".rtbz"
+WDL_MAGIC = b"\x71\xe8\x23\x5d"
+DTZ_MAGIC = b"\xd7\x66\x0c\xa5"
+
+# Decoded blocks kept in the cache
+CACHE_BLOCKS = 1 << 14
+
+# Table names, e.g. KQvKR (the pieces of each side, strongest first)
+TABLE_NAME_PATTERN = re.compile(r"K[QRBNP]*vK[QRBNP]*")
+
+# Piece letters in the order they're written in table names, with their piece types
+NAME_PIECES = (("K", KING), ("Q", 4), ("R", 3), ("B", 2), ("N", 1), ("P", PAWN))
+
+_UINT16 = struct.Struct("<H")
+_UINT32 = struct.Struct("<I")
+_UINT32_BE = struct.Struct(">I")
+_UINT64_BE = struct.Struct(">Q")
+_MASK_64 = 0xFFFF_FFFF_FFFF_FFFF
+
+# Symmetry tables of the position encoding.
+# The first pieces are moved into the a1-d1-d4 triangle by flipping the board, TRIANGLE numbers those squares.
+# fmt: off
+TRIANGLE = [
+    6, 0, 1, 2, 2, 1, 0, 6,
+    0, 7, 3, 4, 4, 3, 7, 0,
+    1, 3, 8, 5, 5, 8, 3, 1,
+    2, 4, 5, 9, 9, 5, 4, 2,
+    2, 4, 5, 9, 9, 5, 4, 2,
+    1, 3, 8, 5, 5, 8, 3, 1,
+    0, 7, 3, 4, 4, 3, 7, 0,
+    6, 0, 1, 2, 2, 1, 0, 6,
+]
+
+# Squares of the triangle, by their TRIANGLE number
+INV_TRIANGLE = [1, 2, 3, 10, 11, 19, 0, 9, 18, 27]
+
+# Numbers of the squares below the a1-h8 diagonal (and of the diagonal after them)
+LOWER = [
+    28,  0,  1,  2,  3,  4,  5,  6,
+     0, 29,  7,  8,  9, 10, 11, 12,
+     1,  7, 30, 13, 14, 15, 16, 17,
+     2,  8, 13, 31, 18, 19, 20, 21,
+     3,  9, 14, 18, 32, 22, 23, 24,
+     4, 10, 15, 19, 22, 33, 25, 26,
+     5, 11, 16, 20, 23, 25, 34, 27,
+     6, 12, 17, 21, 24, 26, 27, 35,
+]
+
+# Numbers of the squares on the diagonals
+DIAG = [
+     0,  0,  0,  0,  0,  0,  0,  8,
+     0,  1,  0,  0,  0,  0,  9,  0,
+     0,  0,  2,  0,  0, 10,  0,  0,
+     0,  0,  0,  3, 11,  0,  0,  0,
+     0,  0,  0, 12,  4,  0,  0,  0,
+     0,  0, 13,  0,  0,  5,  0,  0,
+     0, 14,  0,  0,  0,  0,  6,  0,
+    15,  0,  0,  0,  0,  0,  0,  7,
+]
+
+# Pawn tables are split by the file of the leading pawn (flipped onto files a-d), FLAP numbers its squares
+FLAP = [
+    0,  0,  0,  0,  0,  0,  0, 0,
+    0,  6, 12, 18, 18, 12,  6, 0,
+    1,  7, 13, 19, 19, 13,  7, 1,
+    2,  8, 14, 20, 20, 14,  8, 2,
+    3,  9, 15, 21, 21, 15,  9, 3,
+    4, 10, 16, 22, 22, 16, 10, 4,
+    5, 11, 17, 23, 23, 17, 11, 5,
+    0,  0,  0,  0,  0,  0,  0, 0,
+]
+
+# Order of the squares of the other leading pawns
+PTWIST = [
+     0,  0,  0,  0,  0,  0,  0,  0,
+    47, 35, 23, 11, 10, 22, 34, 46,
+    45, 33, 21,  9,  8, 20, 32, 44,
+    43, 31, 19,  7,  6, 18, 30, 42,
+    41, 29, 17,  5,  4, 16, 28, 40,
+    39, 27, 15,  3,  2, 14, 26, 38,
+    37, 25, 13,  1,  0, 12, 24, 36,
+     0,  0,  0,  0,  0,  0,  0,  0,
+]
+
+# Squares by their FLAP number
+INV_FLAP = [
+     8, 16, 24, 32, 40, 48,
+     9, 17, 25, 33, 41, 49,
+    10, 18, 26, 34, 42, 50,
+    11, 19, 27, 35, 43, 51,
+]
+# fmt: on
+
+FILE_TO_FILE = [0, 1, 2, 3, 3, 2, 1, 0]
+
+# Number of placements of the first pieces for each encoding: three unique pieces, unused, the two kings
+PIVOT_FACTORS = [31332, 28056, 462]
+
+
+def _off_diagonal(square: int) -> int:
+    """Gets how far a square is above (positive) or below (negative) the a1-h8 diagonal."""
+    return (square >> 3) - (square & 7)
+
+
+def _flip_diagonal(square: int) -> int:
+    """Mirrors a square in the a1-h8 diagonal."""
+    return ((square >> 3) | (square << 3)) & 63
+
+
+# KK_INDEX[triangle number of the first king][square of the second king] for the legal placements of two kings,
+# with the placements where both are on the diagonal numbered last
+KK_INDEX = [[-1] * 64 for _ in range(10)]
+_both_on_diagonal = []
+_code = 0
+for _index, _first in enumerate(INV_TRIANGLE):
+    for _second in range(64):
+        if _first == _second or KING_ATTACKS[_first] >> _second & 1:
+            continue
+        if not _off_diagonal(_first) and _off_diagonal(_second) > 0:
+            continue
+        if not _off_diagonal(_first) and not _off_diagonal(_second):
+            _both_on_diagonal.append((_index, _second))
+        else:
+            KK_INDEX[_index][_second] = _code
+            _code += 1
+for _index, _second in _both_on_diagonal:
+    KK_INDEX[_index][_second] = _code
+    _code += 1
+
+# PAWN_INDEX[leading pawns - 1][FLAP number] is where the placements with the first pawn there start,
+# PAWN_FACTORS[leading pawns - 1][file] is the number of placements of the leading pawns for each file
+PAWN_INDEX = [[0] * 24 for _ in range(5)]
+PAWN_FACTORS = [[0] * 4 for _ in range(5)]
+for _pawns in range(5):
+    _total = 0
+    for _flap in range(24):
+        if _flap and _flap % 6 == 0:
+            PAWN_FACTORS[_pawns][_flap // 6 - 1] = _total
+            _total = 0
+        PAWN_INDEX[_pawns][_flap] = _total
+        _total += 1 if _pawns == 0 else math.comb(PTWIST[INV_FLAP[_flap]], _pawns)
+    PAWN_FACTORS[_pawns][3] = _total
+
+# DTZ tables store their values per WDL result through these
+WDL_TO_MAP = [1, 3, 0, 2, 0]
+PA_FLAGS = [8, 0, 0, 0, 4]
+
+# DTZ of a position where a capture or pawn move is played next, for each WDL result
+WDL_TO_DTZ = [-1, -101, 0, 101, 1]
+
+# Root moves are ranked by these (see Tablebase.root_moves)
+MAX_DTZ = 1 << 18
+
+
+def material_key(bitboards: list, mirror: bool = False) -> str:
+    """Gets the table name of a position's material, e.g. KRPvKR.
+
+    Args:
+        bitboards (list): Bitboards of the position (see Game.bitboards)
+        mirror (bool, optional): Whether to swap the colors. Defaults to False.
+
+    Returns:
+        str: White's pieces, "v", then black's pieces (the other way around if mirrored)
+    """
+    first = 6 if mirror else 0
+    second = 0 if mirror else 6
+    return (
+        "".join(letter * popcount(bitboards[first + piece_type]) for letter, piece_type in NAME_PIECES)
+        + "v"
+        + "".join(letter * popcount(bitboards[second + piece_type]) for letter, piece_type in NAME_PIECES)
+    )
+
+
+def _key_from_pieces(pieces: list, mirror: bool = False) -> str:
+    """Gets the table name of the pieces stored in a table (piece type in the low 3 bits, 8 for black)."""
+    colors = (8, 0) if mirror else (0, 8)
+    return "v".join(
+        "".join(letter * pieces.count(color | piece_type + 1) for letter, piece_type in NAME_PIECES)
+        for color in colors
+    )
+
+
+def _mirror_name(name: str) -> str:
+    """Swaps the sides of a table name."""
+    first, second = name.split("v")
+    return f"{second}v{first}"
+
+
+def _dtz_before_zeroing(wdl: int) -> int:
+    """Gets the DTZ of a position where the next move is a capture or pawn move."""
+    return WDL_TO_DTZ[wdl + 2]
+
+
+class _Pairs:
+    """Compressed values of one part of a table (one side to move, and for pawn tables one file)."""
+
+    __slots__ = (
+        "flags",
+        "constant",
+        "block_size",
+        "index_bits",
+        "min_length",
+        "base",
+        "offsets",
+        "pairs",
+        "lengths",
+        "values",
+        "index_table",
+        "size_table",
+        "data",
+    )
+
+
+class _Table:
+    """One table file, memory mapped the first time it's probed."""
+
+    magic = None
+
+    def __init__(self, path: str):
+        """Sets up a table. The file isn't read until the table is probed.
+
+        Args:
+            path (str): Path of the file (its name has to be the table's name, e.g. KQvKR.rtbw)
+        """
+
+        self.path = path
+        self.file = None
+        self.map = None
+
+        name = os.path.splitext(os.path.basename(path))[0]
+        self.key = name
+        self.mirrored_key = _mirror_name(name)
+        self.symmetric = self.key == self.mirrored_key
+        self.num = len(name) - 1
+        self.has_pawns = "P" in name
+
+        first, second = name.split("v")
+        if self.has_pawns:
+            # The leading pawns are the color with fewer pawns (but at least one)
+            self.pawns = [second.count("P"), first.count("P")]
+            if self.pawns[1] > 0 and (self.pawns[0] == 0 or self.pawns[1] < self.pawns[0]):
+                self.pawns.reverse()
+        else:
+            unique = sum(side.count(letter) == 1 for side in (first, second) for letter, _ in NAME_PIECES)
+            self.encoding = 0 if unique >= 3 else 2
+
+    def open(self):
+        """Memory maps the file and reads its header, if that hasn't been done yet.
+
+        Raises:
+            ValueError: If the file isn't a valid table
+        """
+
+        if self.map is not None:
+            return
+
+        self.file = open(self.path, "rb")
+        try:
+            size = os.fstat(self.file.fileno()).st_size
+            if size % 64 != 16:
+                raise ValueError(f"Not a Syzygy table: {self.path}")
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            if self.map[:4] != self.magic:
+                raise ValueError(f"Not a Syzygy table: {self.path}")
+            if hasattr(mmap, "MADV_RANDOM"):
+                self.map.madvise(mmap.MADV_RANDOM)
+            self.read_header()
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        """Unmaps the file."""
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def read_header(self):
+        raise NotImplementedError
+
+    def uint16(self, offset: int) -> int:
+        return _UINT16.unpack_from(self.map, offset)[0]
+
+    def uint32(self, offset: int) -> int:
+        return _UINT32.unpack_from(self.map, offset)[0]
+
+    def setup_pairs(self, offset: int, size: int, wdl: bool) -> tuple:
+        """Reads the compression data of one part of the table.
+
+        Args:
+            offset (int): Where the data starts
+            size (int): Number of positions in the part
+            wdl (bool): Whether this is a WDL table
+
+        Returns:
+            tuple: (_Pairs, offset after the data, (size of the index table, size table and blocks))
+        """
+
+        data = self.map
+        pairs = _Pairs()
+        pairs.flags = data[offset]
+
+        # The whole part has one value
+        if data[offset] & 0x80:
+            pairs.index_bits = 0
+            pairs.constant = data[offset + 1] if wdl else 0
+            return pairs, offset + 2, (0, 0, 0)
+
+        pairs.block_size = data[offset + 1]
+        pairs.index_bits = data[offset + 2]
+        real_blocks = self.uint32(offset + 4)
+        blocks = real_blocks + data[offset + 3]
+        max_length = data[offset + 8]
+        min_length = data[offset + 9]
+        lengths = max_length - min_length + 1
+        symbols = self.uint16(offset + 10 + 2 * lengths)
+
+        pairs.min_length = min_length
+        pairs.offsets = [self.uint16(offset + 10 + 2 * i) for i in range(lengths)]
+
+        # Lowest code of each length, left aligned in 64 bits
+        base = [0] * lengths
+        for i in range(lengths - 2, -1, -1):
+            base[i] = (base[i + 1] + pairs.offsets[i] - pairs.offsets[i + 1]) // 2
+        pairs.base = [base[i] << (64 - (min_length + i)) for i in range(lengths)]
+
+        # Each symbol is a pair of smaller symbols, or a value if its second half is 0xFFF
+        symbol_data = offset + 12 + 2 * lengths
+        pairs.pairs = []
+        pairs.values = []
+        for symbol in range(symbols):
+            at = symbol_data + 3 * symbol
+            left = ((data[at + 1] & 0xF) << 8) | data[at]
+            right = (data[at + 2] << 4) | (data[at + 1] >> 4)
+            pairs.pairs.append((left, right))
+            pairs.values.append(left if not wdl else data[at])
+
+        # Number of values each symbol stands for, minus 1
+        pairs.lengths = [None] * symbols
+        for symbol in range(symbols):
+            stack = [symbol]
+            while stack:
+                current = stack[-1]
+                if pairs.lengths[current] is not None:
+                    stack.pop()
+                    continue
+                left, right = pairs.pairs[current]
+                if right == 0xFFF:
+                    pairs.lengths[current] = 0
+                    stack.pop()
+                    continue
+                pending = [child for child in (left, right) if pairs.lengths[child] is None]
+                if pending:
+                    stack.extend(pending)
+                else:
+                    pairs.lengths[current] = pairs.lengths[left] + pairs.lengths[right] + 1
+                    stack.pop()
+
+        indices = (size + (1 << pairs.index_bits) - 1) >> pairs.index_bits
+        sizes = (6 * indices, 2 * blocks, (1 << pairs.block_size) * real_blocks)
+        return pairs, symbol_data + 3 * symbols + (symbols & 1), sizes
+
+    def decode_block(self, pairs: _Pairs, block: int) -> tuple:
+        """Decodes the Huffman codes of a block.
+
+        Returns:
+            tuple: (list of symbols, list of the number of values up to the end of each symbol)
+        """
+
+        data = self.map
+        count = self.uint16(pairs.size_table + 2 * block) + 1
+        offset = pairs.data + (block << pairs.block_size)
+        min_length = pairs.min_length
+        base = pairs.base
+        offsets = pairs.offsets
+        lengths = pairs.lengths
+
+        symbols = []
+        ends = []
+        total = 0
+        code = _UINT64_BE.unpack_from(data, offset)[0]
+        offset += 8
+        empty_bits = 0
+        while True:
+            length = 0
+            while code < base[length]:
+                length += 1
+            symbol = offsets[length] + ((code - base[length]) >> (64 - min_length - length))
+            symbols.append(symbol)
+            total += lengths[symbol] + 1
+            ends.append(total)
+            if total >= count:
+                return symbols, ends
+
+            code = (code << (min_length + length)) & _MASK_64
+            empty_bits += min_length + length
+            if empty_bits >= 32:
+                empty_bits -= 32
+                code |= _UINT32_BE.unpack_from(data, offset)[0] << empty_bits
+                offset += 4
+
+    def decompress(self, pairs: _Pairs, index: int, cache: OrderedDict, cache_size: int) -> int:
+        """Gets the value at an index.
+
+        Args:
+            pairs (_Pairs): Part of the table the index is in
+            index (int): Index of the position (see encode_pieces and encode_pawns)
+            cache (OrderedDict): Decoded blocks, least recently used first
+            cache_size (int): Number of blocks to keep in the cache
+
+        Returns:
+            int: Stored value
+        """
+
+        if not pairs.index_bits:
+            return pairs.constant
+
+        # The index table points at a block near every 2^index_bits positions, walk from there to the right block
+        main_index = index >> pairs.index_bits
+        position = (index & ((1 << pairs.index_bits) - 1)) - (1 << (pairs.index_bits - 1))
+        block = self.uint32(pairs.index_table + 6 * main_index)
+        position += self.uint16(pairs.index_table + 6 * main_index + 4)
+        if position < 0:
+            while position < 0:
+                block -= 1
+                position += self.uint16(pairs.size_table + 2 * block) + 1
+        else:
+            size = self.uint16(pairs.size_table + 2 * block)
+            while position > size:
+                position -= size + 1
+                block += 1
+                size = self.uint16(pairs.size_table + 2 * block)
+
+        cache_key = (id(pairs), block)
+        decoded = cache.get(cache_key)
+        if decoded is None:
+            decoded = self.decode_block(pairs, block)
+            cache[cache_key] = decoded
+            if len(cache) > cache_size:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(cache_key)
+
+        # Find the symbol the position is in, then the value inside it
+        symbols, ends = decoded
+        i = bisect_right(ends, position)
+        if i:
+            position -= ends[i - 1]
+        symbol = symbols[i]
+
+        lengths = pairs.lengths
+        while lengths[symbol]:
+            left, right = pairs.pairs[symbol]
+            if position <= lengths[left]:
+                symbol = left
+            else:
+                position -= lengths[left] + 1
+                symbol = right
+
+        return pairs.values[symbol]
+
+    def set_norm_pieces(self, pieces: list) -> list:
+        """Groups the pieces of a pawnless table: the first 3 (or the 2 kings), then runs of the same piece."""
+        norm = [0] * self.num
+        norm[0] = 3 if self.encoding == 0 else 2
+        self._group(norm, pieces, norm[0])
+        return norm
+
+    def set_norm_pawns(self, pieces: list) -> list:
+        """Groups the pieces of a pawn table: the leading pawns, the other pawns, then runs of the same piece."""
+        norm = [0] * self.num
+        norm[0] = self.pawns[0]
+        if self.pawns[1]:
+            norm[self.pawns[0]] = self.pawns[1]
+        self._group(norm, pieces, self.pawns[0] + self.pawns[1])
+        return norm
+
+    def _group(self, norm: list, pieces: list, start: int):
+        i = start
+        while i < self.num:
+            j = i
+            while j < self.num and pieces[j] == pieces[i]:
+                norm[i] += 1
+                j += 1
+            i += norm[i]
+
+    def factors_pieces(self, order: int, norm: list) -> tuple:
+        """Works out the multiplier of each group's index in a pawnless table.
+
+        Returns:
+            tuple: (factors, number of positions)
+        """
+        factors = [0] * self.num
+        free = 64 - norm[0]
+        product = 1
+        i = norm[0]
+        k = 0
+        while i < self.num or k == order:
+            if k == order:
+                factors[0] = product
+                product *= PIVOT_FACTORS[self.encoding]
+            else:
+                factors[i] = product
+                product *= math.comb(free, norm[i])
+                free -= norm[i]
+                i += norm[i]
+            k += 1
+        return factors, product
+
+    def factors_pawns(self, order: int, order2: int, norm: list, file: int) -> tuple:
+        """Works out the multiplier of each group's index in one file of a pawn table.
+
+        Returns:
+            tuple: (factors, number of positions)
+        """
+        factors = [0] * self.num
+        i = norm[0]
+        if order2 < 0x0F:
+            i += norm[i]
+        free = 64 - i
+        product = 1
+        k = 0
+        while i < self.num or k == order or k == order2:
+            if k == order:
+                factors[0] = product
+                product *= PAWN_FACTORS[norm[0] - 1][file]
+            elif k == order2:
+                factors[norm[0]] = product
+                product *= math.comb(48 - norm[0], norm[norm[0]])
+            else:
+                factors[i] = product
+                product *= math.comb(free, norm[i])
+                free -= norm[i]
+                i += norm[i]
+            k += 1
+        return factors, product
+
+    def squares(
+        self, bitboards: list, pieces: list, squares: list, color_flip: int, rank_flip: int, start: int = 0, end: int = None
+    ):
+        """Fills in the squares of the table's pieces (from the start-th to before the end-th) from the bitboards."""
+        i = start
+        end = self.num if end is None else end
+        while i < end:
+            piece = pieces[i] ^ color_flip
+            bitboard = bitboards[(piece >> 3) * 6 + (piece & 7) - 1]
+            while bitboard:
+                low = bitboard & -bitboard
+                squares[i] = (low.bit_length() - 1) ^ rank_flip
+                bitboard ^= low
+                i += 1
+
+    def encode_pieces(self, squares: list, norm: list, factors: list) -> int:
+        """Gets the index of a position in a pawnless table. The squares are reordered."""
+
+        n = self.num
+
+        # Flip the board so the first piece is in the a1-d1-d4 triangle
+        if squares[0] & 0x04:
+            squares[:] = [square ^ 0x07 for square in squares]
+        if squares[0] & 0x20:
+            squares[:] = [square ^ 0x38 for square in squares]
+        for i in range(3 if self.encoding == 0 else 2):
+            off = _off_diagonal(squares[i])
+            if off:
+                if off > 0:
+                    squares[:] = [_flip_diagonal(square) for square in squares]
+                break
+
+        if self.encoding == 0:
+            # Three unique pieces
+            s0, s1, s2 = squares[0], squares[1], squares[2]
+            i = int(s1 > s0)
+            j = int(s2 > s0) + int(s2 > s1)
+            if _off_diagonal(s0):
+                index = TRIANGLE[s0] * 63 * 62 + (s1 - i) * 62 + (s2 - j)
+            elif _off_diagonal(s1):
+                index = 6 * 63 * 62 + DIAG[s0] * 28 * 62 + LOWER[s1] * 62 + s2 - j
+            elif _off_diagonal(s2):
+                index = 6 * 63 * 62 + 4 * 28 * 62 + DIAG[s0] * 7 * 28 + (DIAG[s1] - i) * 28 + LOWER[s2]
+            else:
+                index = (
+                    6 * 63 * 62 + 4 * 28 * 62 + 4 * 7 * 28 + DIAG[s0] * 7 * 6 + (DIAG[s1] - i) * 6 + (DIAG[s2] - j)
+                )
+            start = 3
+        else:
+            # The two kings
+            index = KK_INDEX[TRIANGLE[squares[0]]][squares[1]]
+            start = 2
+
+        return self._encode_groups(index * factors[0], squares, norm, factors, start, n)
+
+    def encode_pawns(self, squares: list, norm: list, factors: list) -> int:
+        """Gets the index of a position in one file of a pawn table. The squares are reordered."""
+
+        n = self.num
+        leading = self.pawns[0]
+
+        if squares[0] & 0x04:
+            squares[:] = [square ^ 0x07 for square in squares]
+
+        # Leading pawns
+        squares[1:leading] = sorted(squares[1:leading], key=PTWIST.__getitem__, reverse=True)
+        t = leading - 1
+        index = PAWN_INDEX[t][FLAP[squares[0]]]
+        for i in range(t, 0, -1):
+            index += math.comb(PTWIST[squares[i]], t - i + 1)
+        index *= factors[0]
+
+        # Other pawns (they can't be on the first or last rank or on the leading pawns' squares)
+        i = leading
+        end = i + self.pawns[1]
+        if end > i:
+            squares[i:end] = sorted(squares[i:end])
+            total = 0
+            for m in range(i, end):
+                square = squares[m]
+                below = sum(square > squares[k] for k in range(i))
+                total += math.comb(square - below - 8, m - i + 1)
+            index += total * factors[i]
+            i = end
+
+        return self._encode_groups(index, squares, norm, factors, i, n)
+
+    @staticmethod
+    def _encode_groups(index: int, squares: list, norm: list, factors: list, i: int, n: int) -> int:
+        """Adds the index of each group of the same piece (as a combination of the free squares)."""
+        while i < n:
+            t = norm[i]
+            squares[i : i + t] = sorted(squares[i : i + t])
+            total = 0
+            for m in range(i, i + t):
+                square = squares[m]
+                below = sum(square > squares[k] for k in range(i))
+                total += math.comb(square - below, m - i + 1)
+            index += total * factors[i]
+            i += t
+        return index
+
+    def pawn_file(self, squares: list) -> int:
+        """Puts the leading pawn that decides the file first and gets the file (0-3)."""
+        for i in range(1, self.pawns[0]):
+            if FLAP[squares[0]] > FLAP[squares[i]]:
+                squares[0], squares[i] = squares[i], squares[0]
+        return FILE_TO_FILE[squares[0] & 0x07]
+
+    def orientation(self, bitboards: list, white_to_move: bool) -> tuple:
+        """Works out how the position maps onto the table.
+
+        Returns:
+            tuple: (8 to swap the colors or 0, 0x38 to flip the ranks or 0, stored side to look up)
+        """
+        if self.symmetric:
+            return (0, 0, 0) if white_to_move else (8, 0x38, 0)
+        if material_key(bitboards) != self.key:
+            return 8, 0x38, int(white_to_move)
+        return 0, 0, int(not white_to_move)
+
+
+class _WdlTable(_Table):
+    """Win/draw/loss table."""
+
+    magic = WDL_MAGIC
+
+    def read_header(self):
+        data = self.map
+        split = data[4] & 0x01
+        files = 4 if data[4] & 0x02 else 1
+        sides = 2 if split else 1
+        offset = 5
+
+        # parts[file][side] = (pieces, norm, factors, pairs), one file for pawnless tables
+        parts = []
+        if not self.has_pawns:
+            part = []
+            for side in range(2):
+                shift = 4 * side
+                pieces = [(data[offset + 1 + i] >> shift) & 0x0F for i in range(self.num)]
+                norm = self.set_norm_pieces(pieces)
+                factors, size = self.factors_pieces((data[offset] >> shift) & 0x0F, norm)
+                part.append([pieces, norm, factors, size])
+            parts.append(part)
+            offset += self.num + 1
+
+            # Some tables have their pieces in the other order than their name
+            self.key = _key_from_pieces(parts[0][0][0])
+            self.mirrored_key = _key_from_pieces(parts[0][0][0], mirror=True)
+        else:
+            extra = 1 + int(self.pawns[1] > 0)
+            for file in range(4):
+                part = []
+                for side in range(2):
+                    shift = 4 * side
+                    order = (data[offset] >> shift) & 0x0F
+                    order2 = (data[offset + 1] >> shift) & 0x0F if self.pawns[1] else 0x0F
+                    pieces = [(data[offset + extra + i] >> shift) & 0x0F for i in range(self.num)]
+                    norm = self.set_norm_pawns(pieces)
+                    factors, size = self.factors_pawns(order, order2, norm, file)
+                    part.append([pieces, norm, factors, size])
+                parts.append(part)
+                offset += self.num + extra
+        offset += offset & 0x01
+
+        # Compression data, then the index tables, the size tables and the blocks of every part
+        sizes = {}
+        for file in range(files):
+            for side in range(sides):
+                pairs, offset, sizes[file, side] = self.setup_pairs(offset, parts[file][side][3], True)
+                parts[file][side][3] = pairs
+        for file in range(files):
+            for side in range(sides):
+                parts[file][side][3].index_table = offset
+                offset += sizes[file, side][0]
+        for file in range(files):
+            for side in range(sides):
+                parts[file][side][3].size_table = offset
+                offset += sizes[file, side][1]
+        for file in range(files):
+            for side in range(sides):
+                offset = (offset + 0x3F) & ~0x3F
+                parts[file][side][3].data = offset
+                offset += sizes[file, side][2]
+
+        self.parts = parts
+
+    def probe(self, bitboards: list, white_to_move: bool, cache: OrderedDict, cache_size: int) -> int:
+        """Looks up a position without captures.
+
+        Returns:
+            int: -2 (loss), -1 (blessed loss), 0 (draw), 1 (cursed win) or 2 (win) for the side to move
+        """
+
+        self.open()
+        color_flip, rank_flip, side = self.orientation(bitboards, white_to_move)
+        squares = [0] * self.num
+
+        if not self.has_pawns:
+            pieces, norm, factors, pairs = self.parts[0][side]
+            self.squares(bitboards, pieces, squares, color_flip, 0)
+            index = self.encode_pieces(squares, norm, factors)
+        else:
+            # The leading pawns decide which file's part to use
+            self.squares(bitboards, self.parts[0][0][0], squares, color_flip, rank_flip, end=self.pawns[0])
+            pieces, norm, factors, pairs = self.parts[self.pawn_file(squares)][side]
+            self.squares(bitboards, pieces, squares, color_flip, rank_flip, start=self.pawns[0])
+            index = self.encode_pawns(squares, norm, factors)
+
+        return self.decompress(pairs, index, cache, cache_size) - 2
+
+
+class _DtzTable(_Table):
+    """Distance to zeroing table. Only one side to move is stored, the other is found with a search (see Tablebase)."""
+
+    magic = DTZ_MAGIC
+
+    def read_header(self):
+        data = self.map
+        files = 4 if data[4] & 0x02 else 1
+        offset = 5
+
+        # parts[file] = (pieces, norm, factors, pairs, flags, value maps), one file for pawnless tables
+        parts = []
+        if not self.has_pawns:
+            pieces = [data[offset + 1 + i] & 0x0F for i in range(self.num)]
+            norm = self.set_norm_pieces(pieces)
+            factors, size = self.factors_pieces(data[offset] & 0x0F, norm)
+            parts.append([pieces, norm, factors, size])
+            offset += self.num + 1
+
+            self.key = _key_from_pieces(pieces)
+            self.mirrored_key = _key_from_pieces(pieces, mirror=True)
+        else:
+            extra = 1 + int(self.pawns[1] > 0)
+            for file in range(4):
+                order = data[offset] & 0x0F
+                order2 = data[offset + 1] & 0x0F if self.pawns[1] else 0x0F
+                pieces = [data[offset + extra + i] & 0x0F for i in range(self.num)]
+                norm = self.set_norm_pawns(pieces)
+                factors, size = self.factors_pawns(order, order2, norm, file)
+                parts.append([pieces, norm, factors, size])
+                offset += self.num + extra
+        offset += offset & 0x01
+
+        sizes = []
+        for file in range(files):
+            pairs, offset, part_sizes = self.setup_pairs(offset, parts[file][3], False)
+            parts[file][3] = pairs
+            sizes.append(part_sizes)
+
+        # The values can go through a map per WDL result, which is either bytes or 16 bit words
+        self.value_maps = offset
+        for file in range(files):
+            flags = parts[file][3].flags
+            maps = []
+            if flags & 2:
+                if not flags & 16:
+                    for _ in range(4):
+                        maps.append(offset + 1 - self.value_maps)
+                        offset += 1 + data[offset]
+                else:
+                    if self.has_pawns:
+                        offset += offset & 0x01
+                    for _ in range(4):
+                        maps.append((offset + 2 - self.value_maps) // 2)
+                        offset += 2 + 2 * self.uint16(offset)
+            parts[file].append(maps)
+        offset += offset & 0x01
+
+        for file in range(files):
+            parts[file][3].index_table = offset
+            offset += sizes[file][0]
+        for file in range(files):
+            parts[file][3].size_table = offset
+            offset += sizes[file][1]
+        for file in range(files):
+            offset = (offset + 0x3F) & ~0x3F
+            parts[file][3].data = offset
+            offset += sizes[file][2]
+
+        self.parts = parts
+
+    def probe(self, bitboards: list, white_to_move: bool, wdl: int, cache: OrderedDict, cache_size: int) -> int | None:
+        """Looks up a position without captures.
+
+        Args:
+            wdl (int): WDL result of the position (see _WdlTable.probe)
+
+        Returns:
+            int | None: Plies to zeroing (not counting the rounding of the table), or None if the side to move isn't stored
+        """
+
+        self.open()
+        color_flip, rank_flip, side = self.orientation(bitboards, white_to_move)
+        squares = [0] * self.num
+
+        if not self.has_pawns:
+            pieces, norm, factors, pairs, maps = self.parts[0]
+            if (pairs.flags & 1) != side and not self.symmetric:
+                return None
+            self.squares(bitboards, pieces, squares, color_flip, 0)
+            index = self.encode_pieces(squares, norm, factors)
+        else:
+            self.squares(bitboards, self.parts[0][0], squares, color_flip, rank_flip, end=self.pawns[0])
+            pieces, norm, factors, pairs, maps = self.parts[self.pawn_file(squares)]
+            if (pairs.flags & 1) != side:
+                return None
+            self.squares(bitboards, pieces, squares, color_flip, rank_flip, start=self.pawns[0])
+            index = self.encode_pawns(squares, norm, factors)
+
+        value = self.decompress(pairs, index, cache, cache_size)
+
+        flags = pairs.flags
+        if flags & 2:
+            if not flags & 16:
+                value = self.map[self.value_maps + maps[WDL_TO_MAP[wdl + 2]] + value]
+            else:
+                value = self.uint16(self.value_maps + 2 * (maps[WDL_TO_MAP[wdl + 2]] + value))
+
+        # Some values are stored in moves instead of plies
+        if not flags & PA_FLAGS[wdl + 2] or wdl & 1:
+            value *= 2
+
+        return value
+
+
+class Tablebase:
+    """Syzygy tables from one or more directories, probed through Games."""
+
+    def __init__(self, directory: str = None, cache_blocks: int = CACHE_BLOCKS):
+        """Finds the tables in a directory. They aren't opened until they're probed.
+
+        Args:
+            directory (str, optional): Directory of .rtbw and .rtbz files. Defaults to None (add them with add_directory).
+            cache_blocks (int, optional): Number of decoded blocks to keep. Defaults to CACHE_BLOCKS.
+        """
+
+        self.directories = []
+        self.wdl = {}
+        self.dtz = {}
+        self.cache = OrderedDict()
+        self.cache_blocks = cache_blocks
+
+        # Most pieces of any table, positions with more can't be probed
+        self.max_pieces = 0
+
+        if directory is not None:
+            self.add_directory(directory)
+
+    def add_directory(self, directory: str) -> int:
+        """Adds the tables in a directory.
+
+        Args:
+            directory (str): Directory of .rtbw and .rtbz files
+
+        Returns:
+            int: Number of tables found
+        """
+
+        directory = os.path.abspath(directory)
+        self.directories.append(directory)
+
+        found = 0
+        for filename in os.listdir(directory):
+            name, suffix = os.path.splitext(filename)
+            if not TABLE_NAME_PATTERN.fullmatch(name):
+                continue
+            if suffix == WDL_SUFFIX:
+                tables, table = self.wdl, _WdlTable(os.path.join(directory, filename))
+            elif suffix == DTZ_SUFFIX:
+                tables, table = self.dtz, _DtzTable(os.path.join(directory, filename))
+            else:
+                continue
+
+            for key in (table.key, table.mirrored_key):
+                if key in tables:
+                    tables[key].close()
+                tables[key] = table
+            self.max_pieces = max(self.max_pieces, table.num)
+            found += 1
+
+        return found
+
+    def close(self):
+        """Closes the tables."""
+        for table in list(self.wdl.values()) + list(self.dtz.values()):
+            table.close()
+        self.cache.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __reduce__(self):
+        # Memory maps can't be sent to other processes, so they reopen the directories instead
+        return _reopen, (self.directories, self.cache_blocks)
+
+    def probe_wdl_table(self, game) -> int:
+        """Looks up a position in its WDL table, without trying the captures."""
+
+        bitboards = game.bitboards
+        if not any(bitboards[piece] for piece in range(12) if piece % 6 != KING):
+            return 0
+
+        key = material_key(bitboards)
+        table = self.wdl.get(key)
+        if table is None:
+            raise ValueError(f"Missing WDL table: {key}")
+        return table.probe(bitboards, game.isWhiteTurn, self.cache, self.cache_blocks)
+
+    def probe_dtz_table(self, game, wdl: int) -> int | None:
+        """Looks up a position in its DTZ table, without trying the captures."""
+
+        key = material_key(game.bitboards)
+        table = self.dtz.get(key)
+        if table is None:
+            raise ValueError(f"Missing DTZ table: {key}")
+        return table.probe(game.bitboards, game.isWhiteTurn, wdl, self.cache, self.cache_blocks)
+
+    def probe_ab(self, game, alpha: int, beta: int) -> tuple:
+        """Finds the WDL result of a position by trying the captures (except en passant) and looking up the rest.
+
+        Returns:
+            tuple: (WDL result, 2 if a capture gives the result, 1 if the table does)
+        """
+
+        if popcount(game.occupancies[0] | game.occupancies[1]) > self.max_pieces + 1:
+            raise ValueError("Too many pieces to probe the tablebase")
+
+        for move in game.generate_moves(quiets=False):
+            flags = move >> 12
+            if not flags & CAPTURE_FLAG or flags == EN_PASSANT:
+                continue
+            game.make_move(move)
+            try:
+                score = -self.probe_ab(game, -beta, -alpha)[0]
+            finally:
+                game.unmake_move()
+
+            if score > alpha:
+                if score >= beta:
+                    return score, 2
+                alpha = score
+
+        score = self.probe_wdl_table(game)
+        if alpha >= score:
+            return alpha, 1 + int(alpha > 0)
+        return score, 1
+
+    def _en_passant_result(self, game) -> int:
+        """Gets the best WDL result of the en passant captures, or -3 if there aren't any."""
+
+        best = -3
+        if game.en_passant_target is None:
+            return best
+
+        pawns = game.bitboards[(0 if game.isWhiteTurn else 6) + PAWN]
+        for move in game.generate_moves(quiets=False, from_squares=pawns):
+            if move >> 12 != EN_PASSANT:
+                continue
+            game.make_move(move)
+            try:
+                best = max(best, -self.probe_ab(game, -2, 2)[0])
+            finally:
+                game.unmake_move()
+        return best
+
+    def _only_en_passant(self, game) -> bool:
+        """Checks if every legal move is an en passant capture."""
+        return all(move >> 12 == EN_PASSANT for move in game.generate_moves())
+
+    def _check_probe(self, game):
+        if game.castling_rights:
+            raise ValueError("Positions with castling rights aren't in the tablebase")
+
+    def probe_wdl(self, game) -> int:
+        """Gets the win/draw/loss result of a position, assuming the last move was a capture or pawn move
+        (the fifty-move counter is 0).
+
+        Args:
+            game (Game): Position to probe (moves are made and taken back on it)
+
+        Raises:
+            ValueError: If the position has castling rights, too many pieces, or a table is missing
+
+        Returns:
+            int: 2 if the side to move wins, 1 if it wins but the fifty-move rule makes it a draw (cursed win),
+                 0 if it's a draw, -1 if it loses but the fifty-move rule saves it (blessed loss), -2 if it loses
+        """
+
+        self._check_probe(game)
+        score = self.probe_ab(game, -2, 2)[0]
+
+        en_passant = self._en_passant_result(game)
+        if en_passant > -3:
+            if en_passant >= score:
+                score = en_passant
+            elif score == 0 and self._only_en_passant(game):
+                score = en_passant
+
+        return score
+
+    def probe_dtz(self, game) -> int:
+        """Gets the distance to zeroing of a position, assuming the fifty-move counter is 0.
+
+        Args:
+            game (Game): Position to probe (moves are made and taken back on it)
+
+        Raises:
+            ValueError: If the position has castling rights, too many pieces, or a table is missing
+
+        Returns:
+            int: Plies to the next capture or pawn move with best play, positive if the side to move wins and
+                 negative if it loses (more than 100 if the fifty-move rule makes it a draw), 0 for a draw.
+                 It can be 1 too high, as the tables round some values.
+        """
+
+        self._check_probe(game)
+        dtz = self._probe_dtz_no_en_passant(game)
+
+        en_passant = self._en_passant_result(game)
+        if en_passant == -3:
+            return dtz
+
+        # An en passant capture can be better than what the table says
+        en_passant = WDL_TO_DTZ[en_passant + 2]
+        if dtz < -100:
+            if en_passant >= 0:
+                dtz = en_passant
+        elif dtz < 0:
+            if en_passant >= 0 or en_passant < -100:
+                dtz = en_passant
+        elif dtz > 100:
+            if en_passant > 0:
+                dtz = en_passant
+        elif dtz > 0:
+            if en_passant == 1:
+                dtz = en_passant
+        elif en_passant >= 0:
+            dtz = en_passant
+        elif self._only_en_passant(game):
+            dtz = en_passant
+
+        return dtz
+
+    def _probe_dtz_no_en_passant(self, game) -> int:
+        wdl, found_by = self.probe_ab(game, -2, 2)
+        if wdl == 0:
+            return 0
+
+        # A capture wins (or holds the loss), which zeroes the counter right away
+        if found_by == 2:
+            return _dtz_before_zeroing(wdl)
+
+        own = game.occupancies[0 if game.isWhiteTurn else 1]
+        pawns = game.bitboards[(0 if game.isWhiteTurn else 6) + PAWN]
+
+        # A pawn move that keeps the win zeroes the counter too
+        if wdl > 0:
+            for move in game.generate_moves(from_squares=pawns):
+                if move >> 12 & CAPTURE_FLAG:
+                    continue
+                game.make_move(move)
+                try:
+                    score = -self.probe_wdl(game)
+                finally:
+                    game.unmake_move()
+                if score == wdl:
+                    return 1 if score == 2 else 101
+
+        dtz = self.probe_dtz_table(game, wdl)
+        if dtz is not None:
+            return _dtz_before_zeroing(wdl) + (dtz if wdl > 0 else -dtz)
+
+        # The table only has the other side to move, so search a ply
+        if wdl > 0:
+            best = 0xFFFF
+            for move in game.generate_moves(from_squares=own & ~pawns):
+                if move >> 12 & CAPTURE_FLAG:
+                    continue
+                game.make_move(move)
+                try:
+                    score = -self.probe_dtz(game)
+                    if score == 1 and game.is_check() and not game.generate_moves():
+                        best = 1
+                    elif score > 0 and score + 1 < best:
+                        best = score + 1
+                finally:
+                    game.unmake_move()
+            return best
+
+        best = -1
+        for move in game.generate_moves():
+            game.make_move(move)
+            try:
+                if game.halfmove_clock == 0:
+                    if wdl == -2:
+                        score = -1
+                    else:
+                        score = self.probe_ab(game, 1, 2)[0]
+                        score = 0 if score == 2 else -101
+                else:
+                    score = -self.probe_dtz(game) - 1
+            finally:
+                game.unmake_move()
+            best = min(best, score)
+        return best
+
+    def get_wdl(self, game) -> int | None:
+        """Same as probe_wdl, but gives None instead of raising if the position can't be probed."""
+        try:
+            return self.probe_wdl(game)
+        except ValueError:
+            return None
+
+    def get_dtz(self, game) -> int | None:
+        """Same as probe_dtz, but gives None instead of raising if the position can't be probed."""
+        try:
+            return self.probe_dtz(game)
+        except ValueError:
+            return None
+
+    def root_moves(self, game) -> list | None:
+        """Finds the moves that keep the best result, by DTZ. Winning moves that zero the counter soonest
+        (within the fifty-move rule) come first, so playing them always makes progress.
+        A search can be limited to these moves to play the ending perfectly.
+
+        Args:
+            game (Game): Position to probe (moves are made and taken back on it)
+
+        Returns:
+            list | None: The best legal moves (every move with the same rank), or None if the position can't be probed
+        """
+
+        if (
+            game.castling_rights
+            or popcount(game.occupancies[0] | game.occupancies[1]) > self.max_pieces
+        ):
+            return None
+
+        halfmove_clock = game.halfmove_clock
+        ranked = []
+        try:
+            for move in game.generate_moves():
+                game.make_move(move)
+                try:
+                    if game.halfmove_clock == 0:
+                        dtz = _dtz_before_zeroing(-self.probe_wdl(game))
+                    else:
+                        dtz = -self.probe_dtz(game)
+                        dtz = dtz + 1 if dtz > 0 else dtz - 1 if dtz < 0 else 0
+                    if dtz == 2 and game.is_check() and not game.generate_moves():
+                        dtz = 1
+                finally:
+                    game.unmake_move()
+
+                if dtz > 0:
+                    # Wins the fifty-move rule would turn into draws still beat draws
+                    rank = MAX_DTZ - dtz if dtz + halfmove_clock <= 99 else MAX_DTZ // 2 - dtz
+                elif dtz < 0:
+                    # Drag out losses, losses the fifty-move rule would save are better still
+                    rank = -MAX_DTZ - dtz if -2 * dtz + halfmove_clock < 100 else -MAX_DTZ // 2 - dtz
+                else:
+                    rank = 0
+                ranked.append((rank, move))
+        except ValueError:
+            return None
+
+        if not ranked:
+            return []
+        best = max(rank for rank, _ in ranked)
+        return [move for rank, move in ranked if rank == best]
+
+
+def _reopen(directories: list, cache_blocks: int) -> Tablebase:
+    """Opens the same directories again (see Tablebase.__reduce__)."""
+    tablebase = Tablebase(cache_blocks=cache_blocks)
+    for directory in directories:
+        tablebase.add_directory(directory)
+    return tablebase
@@ -1,6 +1,121 @@
+# Perft test suite
+# Runs the standard perft positions against their known node counts and reports the speed of move generation
+# Usage:
+#   python test.py                     Run the suite up to depth 4
+#   python test.py --depth 5           Run the suite up to depth 5
+#   python test.py --divide 3 [FEN]    Print the node count of each root move (start position by default)
+#   python test.py --workers 8         Split each count across 8 processes (see parallel.py)
+# Also see https://www.chessprogramming.org/Perft_Results
+
+import argparse
+import sys
+import time
+from game import Game, STARTING_FEN
+from parallel import parallel_divide, parallel_perft
+
+# (name, FEN, node counts for depth 1, 2, 3, ...)
+PERFT_POSITIONS = [
+    (
+        "Start",
+        STARTING_FEN,
+        [20, 400, 8902, 197281, 4865609, 119060324],
+    ),
+    (
+        "Kiwipete",
+        "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        [48, 2039, 97862, 4085603, 193690690],
+    ),
+    (
+        "Position 3",
+        "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+        [14, 191, 2812, 43238, 674624, 11030083],
+    ),
+    (
+        "Position 4",
+        "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+        [6, 264, 9467, 422333, 15833292],
+    ),
+    (
+        "Position 5",
+        "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+        [44, 1486, 62379, 2103487, 89941194],
+    ),
+    (
+        "Position 6",
+        "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+        [46, 2079, 89890, 3894594, 164075551],
+    ),
+]
+
+
+def run_suite(max_depth: int, workers: int = None) -> bool:
+    """Runs every perft position up to the given depth and prints the results.
+
+    Args:
+        max_depth (int): Deepest depth to run (positions with fewer known counts stop earlier)
+        workers (int, optional): Number of processes to split each count across. Defaults to None (no split).
+
+    Returns:
+        bool: Whether every count matched
+    """
+
+    passed = True
+    total_nodes = 0
+    total_time = 0.0
+
+    for name, fen, counts in PERFT_POSITIONS:
+        game = Game("fen", fen)
+        for depth, expected in enumerate(counts[:max_depth], start=1):
+            start = time.perf_counter()
+            nodes = parallel_perft(game, depth, workers) if workers else game.perft(depth)
+            elapsed = time.perf_counter() - start
+
+            total_nodes += nodes
+            total_time += elapsed
+            nps = nodes / elapsed if elapsed > 0 else 0
+
+            status = "ok" if nodes == expected else f"FAIL (expected {expected})"
+            passed = passed and nodes == expected
+            print(f"{name:<11} depth {depth}: {nodes:>10} nodes {elapsed:8.3f}s {nps:>10.0f} nps  {status}")
+
+    nps = total_nodes / total_time if total_time > 0 else 0
+    print(f"Total: {total_nodes} nodes in {total_time:.3f}s ({nps:.0f} nps)")
+
+    return passed
+
+
+def run_divide(depth: int, fen: str, workers: int = None):
+    """Prints the perft count of each root move.
+
+    Args:
+        depth (int): Depth to search (including the root move)
+        fen (str): Position to search
+        workers (int, optional): Number of processes to split the count across. Defaults to None (no split).
+    """
+
+    game = Game("fen", fen)
+    counts = parallel_divide(game, depth, workers) if workers else game.divide(depth)
+    for move in sorted(counts):
+        print(f"{move}: {counts[move]}")
+    print(f"\nMoves: {len(counts)}")
+    print(f"Nodes: {sum(counts.values())}")
+
 
 def __main__(*args):
-    print("NEEDS TO BE IMPLEMENTED") # TODO: implement
+    parser = argparse.ArgumentParser(description="Perft tests for ♞.eef's move generation.")
+    parser.add_argument("--depth", type=int, default=4, help="deepest depth to run the suite to")
+    parser.add_argument("--divide", type=int, metavar="DEPTH", help="print the node count of each root move")
+    parser.add_argument("--workers", type=int, help="number of processes to split each count across")
+    parser.add_argument("fen", nargs="*", help="position for --divide (defaults to the start position)")
+    options = parser.parse_args(args)
+
+    if options.divide is not None:
+        run_divide(options.divide, " ".join(options.fen) if options.fen else STARTING_FEN, options.workers)
+        return
+
+    if not run_suite(options.depth, options.workers):
+        sys.exit(1)
+
 
 if __name__ == "__main__":
-    __main__()
\ No newline at end of file
+    __main__(*sys.argv[1:])
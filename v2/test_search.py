@@ -0,0 +1,25 @@
+# Regression tests for the search
+#
+# Run with pytest from this directory. The perft checks of move generation are in test.py.
+
+from game import Game
+from search import MATE_SCORE, find_best_moves
+
+
+def test_search_after_moves():
+    """Searches a game a few moves in, which goes through the draw checks, the TT and move ordering."""
+    game = Game()
+    for move in ["e4", "e5", "Nf3", "Nc6"]:
+        assert game.move_str(move)
+
+    lines = find_best_moves(game, count=1, max_depth=3)
+    assert len(lines) == 1
+    assert lines[0]["move"] in game.generate_moves()
+
+
+def test_mate_on_fiftieth_move():
+    """A mate that ends the fifty moves is still a mate."""
+    game = Game("fen", "6k1/5ppp/8/8/8/8/8/R5K1 w - - 99 80")
+
+    lines = find_best_moves(game, count=1, max_depth=2)
+    assert lines[0]["score"] == MATE_SCORE - 1
@@ -0,0 +1,103 @@
+# Checks the Syzygy prober (syzygy.py) against known WDL and DTZ values
+#
+# The tables aren't part of the repository. The tests look for them in the directory in the SYZYGY_PATH
+# environment variable, or in syzygy/ next to this file (like main.py), and are skipped without them.
+# The expected values are from the endgame.epd test data of python-chess.
+
+import os
+import pytest
+from game import Game
+from syzygy import DTZ_SUFFIX, WDL_SUFFIX, Tablebase, material_key
+
+SYZYGY_PATH = os.environ.get("SYZYGY_PATH") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "syzygy")
+
+# (FEN, WDL, DTZ)
+POSITIONS = [
+    ("K2R4/8/8/8/2n5/8/8/6k1 w - - 0 1", 0, 0),
+    ("8/7r/8/1k4K1/8/8/8/3B4 w - - 0 1", 0, 0),
+    ("8/8/1n5B/8/8/8/6K1/2k5 b - - 0 1", 0, 0),
+    ("8/8/1k6/8/2R2R2/8/6K1/8 w - - 0 1", 2, 5),
+    ("3k4/3rq3/8/1K6/8/8/8/8 w - - 0 1", -2, -4),
+    ("8/8/3P1K1p/1k6/8/8/8/8 b - - 0 1", -2, -3),
+    ("8/8/1b6/8/8/8/1k4QK/8 b - - 0 1", -2, -18),
+    ("6r1/8/5K2/8/8/8/8/1k1n4 b - - 0 1", 2, 21),
+    ("1r6/5k2/1n6/8/8/K7/8/8 w - - 0 1", -2, -16),
+    ("8/3p4/5p2/2K5/8/8/8/2k5 b - - 0 1", 2, 1),
+]
+
+
+# Order of the pieces in a table name
+PIECE_ORDER = "KQRBNP"
+
+
+def required_tables(name: str) -> set:
+    """Lists the tables a probe of some material can read: its own and every one it can reach by
+    captures and promotions (the probe searches captures, see Tablebase.probe_ab).
+
+    Args:
+        name (str): Table name, e.g. KRPvKR
+
+    Returns:
+        set: Table names (KvK has no table and is left out)
+    """
+
+    found = set()
+    todo = [name]
+    while todo:
+        name = todo.pop()
+        if name in found:
+            continue
+        found.add(name)
+
+        sides = name.split("v")
+        for side, pieces in enumerate(sides):
+            for index, letter in enumerate(pieces):
+                if letter == "K":
+                    continue
+                rest = pieces[:index] + pieces[index + 1 :]
+                for replaced in [rest] + ([rest + promoted for promoted in "QRBN"] if letter == "P" else []):
+                    changed = list(sides)
+                    changed[side] = "".join(sorted(replaced, key=PIECE_ORDER.index))
+                    todo.append("v".join(changed))
+
+    found.discard("KvK")
+    return found
+
+
+def file_name(name: str) -> str:
+    """Orders a table name the way its file is named, with the side that has more (or stronger) pieces first."""
+
+    def strength(side: str) -> tuple:
+        return len(side), [-PIECE_ORDER.index(letter) for letter in side]
+
+    first, second = name.split("v")
+    return name if strength(first) >= strength(second) else f"{second}v{first}"
+
+
+@pytest.fixture(scope="module")
+def tablebase():
+    if not os.path.isdir(SYZYGY_PATH):
+        pytest.skip(f"No Syzygy tables in {SYZYGY_PATH}")
+    with Tablebase(SYZYGY_PATH) as tablebase:
+        yield tablebase
+
+
+@pytest.mark.parametrize("fen, wdl, dtz", POSITIONS)
+def test_probe(tablebase, fen, wdl, dtz):
+    game = Game("fen", fen)
+
+    # Only missing tables skip the test, any error from the prober itself fails it
+    missing = [
+        filename
+        for filename in sorted(
+            file_name(name) + suffix
+            for name in required_tables(material_key(game.bitboards))
+            for suffix in (WDL_SUFFIX, DTZ_SUFFIX)
+        )
+        if not os.path.isfile(os.path.join(SYZYGY_PATH, filename))
+    ]
+    if missing:
+        pytest.skip(f"Missing tables: {', '.join(missing)}")
+
+    assert tablebase.probe_wdl(game) == wdl
+    assert tablebase.probe_dtz(game) == dtz
@@ -0,0 +1,122 @@
+# Time management for games with a clock
+#
+# Decides how long to think about a move from the time left, the increment and the moves until the next
+# time control. There are two limits:
+#   optimum (soft): checked between iterations of the search. It is stretched when the best move keeps
+#                   changing or the score drops (a fail low, the position turned out worse than expected)
+#                   and cut short when the same best move has come back iteration after iteration.
+#   maximum (hard): checked inside the search (every CHECK_INTERVAL nodes, see search.py), which is stopped
+#                   even in the middle of an iteration. It keeps a single move from eating the whole clock.
+# A new iteration is only started if it is likely to finish before the soft limit, since the search
+# throws away an iteration that is stopped part way through.
+# Times are taken from time.monotonic, which every process on the machine shares (see lazy_smp.py).
+# Also see https://www.chessprogramming.org/Time_Management
+
+import time
+
+# Seconds kept in reserve for the GUI to receive the move
+MOVE_OVERHEAD = 0.05
+
+# Moves to plan for when the GUI doesn't say how many are left until the next time control
+DEFAULT_MOVES_TO_GO = 30
+
+# Most moves to spread the time over, even if the next time control is further away
+MAX_MOVES_TO_GO = 50
+
+# Share of the increment that is spent on the current move
+INCREMENT_SHARE = 0.75
+
+# Most the hard limit can be, as a multiple of the optimum and as a share of the time left
+MAX_STRETCH = 4.0
+MAX_SHARE = 0.5
+LAST_MOVE_SHARE = 0.9
+
+# Iterations in a row with the same best move before the soft limit is cut (and the cut)
+STABLE_ITERATIONS = 4
+STABLE_SCALE = 0.5
+
+# Score drop (centipawns) from the last iteration that counts as a fail low, and the drop that doubles the time
+FAIL_LOW_MARGIN = 20
+FAIL_LOW_DOUBLE = 200
+
+# Share of the soft limit after which a new iteration isn't started (an iteration takes a few times longer
+# than the one before it)
+NEXT_ITERATION_SHARE = 0.5
+
+
+class TimeManager:
+    """Keeps track of the time spent on a move and decides when the search should stop."""
+
+    def __init__(
+        self,
+        time_left: float,
+        increment: float = 0.0,
+        moves_to_go: int = None,
+        overhead: float = MOVE_OVERHEAD,
+    ):
+        """Starts the clock for a move.
+
+        Args:
+            time_left (float): Seconds left on the engine's clock
+            increment (float, optional): Seconds added to the clock after every move. Defaults to 0.
+            moves_to_go (int, optional): Moves until the next time control. Defaults to None (sudden death).
+            overhead (float, optional): Seconds kept in reserve for the GUI. Defaults to MOVE_OVERHEAD.
+        """
+
+        self.start_time = time.monotonic()
+
+        usable = max(0.0, time_left - overhead)
+        moves = min(moves_to_go or DEFAULT_MOVES_TO_GO, MAX_MOVES_TO_GO)
+
+        self.optimum = usable / moves + increment * INCREMENT_SHARE
+        self.maximum = min(self.optimum * MAX_STRETCH, usable * (LAST_MOVE_SHARE if moves == 1 else MAX_SHARE))
+        self.optimum = min(self.optimum, self.maximum)
+        self.soft_limit = self.optimum
+
+        self.best_move = None
+        self.best_score = None
+        self.stable_iterations = 0
+
+        # Number of recent best move changes, halved every iteration so old changes count less
+        self.best_move_changes = 0.0
+
+    def elapsed(self) -> float:
+        """Gets the seconds since the clock started."""
+        return time.monotonic() - self.start_time
+
+    def out_of_time(self) -> bool:
+        """Checks the hard limit. Cheap enough to call from inside the search."""
+        return time.monotonic() - self.start_time >= self.maximum
+
+    def update(self, move: int, score: int):
+        """Moves the soft limit after an iteration of the search.
+
+        Args:
+            move (int): Best move found by the iteration
+            score (int): Its score
+        """
+
+        self.best_move_changes /= 2
+        if move == self.best_move:
+            self.stable_iterations += 1
+        else:
+            if self.best_move is not None:
+                self.best_move_changes += 1
+            self.stable_iterations = 0
+
+        # More time when the best move keeps changing, less when it has settled
+        scale = 1.0 + self.best_move_changes
+        if self.stable_iterations >= STABLE_ITERATIONS:
+            scale *= STABLE_SCALE
+
+        # More time when the score dropped, to find a way out or to make sure of the best move
+        if self.best_score is not None and self.best_score - score > FAIL_LOW_MARGIN:
+            scale *= 1.0 + min(self.best_score - score, FAIL_LOW_DOUBLE) / FAIL_LOW_DOUBLE
+
+        self.soft_limit = min(self.optimum * scale, self.maximum)
+        self.best_move = move
+        self.best_score = score
+
+    def should_stop(self) -> bool:
+        """Checks between iterations whether the search should stop instead of starting the next one."""
+        return self.elapsed() >= self.soft_limit * NEXT_ITERATION_SHARE
@@ -0,0 +1,274 @@
+# Transposition table
+#
+# Remembers the result of searching a position (keyed by its Zobrist hash) so the search
+# doesn't have to search it again when it is reached through a different move order.
+# Also see https://www.chessprogramming.org/Transposition_Table
+#
+# The table is two preallocated arrays of 64 bit ints, so its memory is fixed no matter how long it is used:
+#   keys[i]: Zobrist hash of the position in entry i XORed with data[i] (0 if the entry is empty)
+#   data[i]: everything else about the entry packed into one int (never 0 for a used entry):
+#       bits 0-15:  best move (see move.py)
+#       bits 16-47: score + SCORE_OFFSET
+#       bits 48-55: depth
+#       bits 56-57: bound (see below)
+#       bits 58-63: generation (which search stored the entry)
+#
+# Entries are grouped in buckets of two. The first slot is depth-preferred (only replaced by a deeper search
+# of any position or by anything once it is from an old search), the second slot is always replaced.
+#
+# Storing the key XORed with the data means an entry only matches if both halves were written together.
+# SharedTranspositionTable keeps the arrays in shared memory for several processes to search with at once
+# (see lazy_smp.py). They write without locks, so one process can read an entry while another is half way
+# through writing it; the XOR makes that look like a miss instead of returning another position's data.
+# Also see https://www.chessprogramming.org/Shared_Hash_Table#Lock-less
+
+from array import array
+from multiprocessing import shared_memory
+
+# Bounds
+BOUND_NONE = 0
+BOUND_UPPER = 1  # The score is at most this (no move beat alpha)
+BOUND_LOWER = 2  # The score is at least this (a move beat beta)
+BOUND_EXACT = 3
+
+# Bytes per entry (key + data)
+ENTRY_SIZE = 16
+
+DEFAULT_SIZE_MB = 16
+
+SCORE_OFFSET = 1 << 31
+GENERATION_MASK = 0x3F
+
+
+class TranspositionTable:
+    """Fixed size hash table of search results."""
+
+    def __init__(self, size_mb: float = DEFAULT_SIZE_MB):
+        """Allocates the table.
+
+        Args:
+            size_mb (float, optional): Memory to use in megabytes. Defaults to DEFAULT_SIZE_MB.
+        """
+        self.generation = 0
+        self.resize(size_mb)
+
+    def resize(self, size_mb: float):
+        """Reallocates the table with a new size. All entries are lost.
+
+        Args:
+            size_mb (float): Memory to use in megabytes (rounded down to a power of two number of buckets)
+
+        Raises:
+            ValueError: If the size is too small to hold a bucket
+        """
+
+        buckets = int(size_mb * 1024 * 1024) // (ENTRY_SIZE * 2)
+        if buckets < 1:
+            raise ValueError("Transposition table size is too small")
+
+        # Round down to a power of two so a bucket can be found with a mask
+        buckets = 1 << (buckets.bit_length() - 1)
+
+        self.bucket_mask = buckets - 1
+        self.allocate(buckets * 2)
+
+    def allocate(self, entries: int):
+        """Allocates empty keys and data arrays.
+
+        Args:
+            entries (int): Number of entries
+        """
+        self.keys = array("Q", bytes(entries * 8))
+        self.data = array("Q", bytes(entries * 8))
+
+    def clear(self):
+        """Empties the table."""
+        self.resize(self.size_mb())
+        self.generation = 0
+
+    def size_mb(self) -> float:
+        """Gets the memory used by the table in megabytes."""
+        return len(self.keys) * ENTRY_SIZE / (1024 * 1024)
+
+    def new_search(self):
+        """Marks the start of a new search so entries from older searches are replaced first."""
+        self.generation = (self.generation + 1) & GENERATION_MASK
+
+    def probe(self, key: int) -> tuple | None:
+        """Looks up a position.
+
+        Args:
+            key (int): Zobrist hash of the position
+
+        Returns:
+            tuple | None: (move, score, depth, bound) or None if the position is not in the table
+        """
+
+        index = (key & self.bucket_mask) << 1
+        keys = self.keys
+
+        data = self.data[index]
+        if keys[index] ^ data != key or data == 0:
+            data = self.data[index + 1]
+            if keys[index + 1] ^ data != key or data == 0:
+                return None
+
+        return (
+            data & 0xFFFF,
+            ((data >> 16) & 0xFFFFFFFF) - SCORE_OFFSET,
+            (data >> 48) & 0xFF,
+            (data >> 56) & 3,
+        )
+
+    def store(self, key: int, move: int, score: int, depth: int, bound: int):
+        """Stores the result of searching a position.
+
+        Args:
+            key (int): Zobrist hash of the position
+            move (int): Best move found (0 if none)
+            score (int): Score of the position (mate scores should be relative to the position, not the root)
+            depth (int): Depth the position was searched to
+            bound (int): Whether the score is exact, a lower bound or an upper bound
+        """
+
+        index = (key & self.bucket_mask) << 1
+        keys = self.keys
+        data = self.data
+
+        old_key = keys[index]
+        old = data[index]
+        same_position = old != 0 and old_key ^ old == key
+        second = data[index + 1]
+        second_same_position = second != 0 and keys[index + 1] ^ second == key
+
+        # Keep the old best move if this search didn't find one
+        if move == 0:
+            if same_position:
+                move = old & 0xFFFF
+            elif second_same_position:
+                move = second & 0xFFFF
+
+        depth = max(0, min(depth, 0xFF))
+        packed = (
+            move
+            | ((score + SCORE_OFFSET) << 16)
+            | (depth << 48)
+            | (bound << 56)
+            | (self.generation << 58)
+        )
+
+        # Depth-preferred slot: take it if it's the same position, empty, from an older search or shallower.
+        # A different position pushed out of it moves down to the always-replace slot.
+        if same_position:
+            keys[index] = key ^ packed
+            data[index] = packed
+        elif old == 0 or (old >> 58) != self.generation or depth >= (old >> 48) & 0xFF:
+            if old != 0:
+                keys[index + 1] = old_key
+                data[index + 1] = old
+            elif second_same_position:
+                keys[index + 1] = 0
+                data[index + 1] = 0
+            keys[index] = key ^ packed
+            data[index] = packed
+        else:
+            keys[index + 1] = key ^ packed
+            data[index + 1] = packed
+
+    def hashfull(self) -> int:
+        """Estimates how full the table is from a sample of entries used by the current search.
+
+        Returns:
+            int: Permille of entries used (0-1000)
+        """
+        sample = min(1000, len(self.data))
+        used = sum(
+            1
+            for i in range(sample)
+            if self.data[i] != 0 and (self.data[i] >> 58) == self.generation
+        )
+        return used * 1000 // sample
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """Transposition table in shared memory that several processes can use at the same time.
+    One process creates it and the others attach to it by name (see attach).
+    """
+
+    def __init__(self, size_mb: float = DEFAULT_SIZE_MB, name: str = None, entries: int = None):
+        """Creates a new table in shared memory, or attaches to an existing one.
+
+        Args:
+            size_mb (float, optional): Memory to use in megabytes for a new table. Defaults to DEFAULT_SIZE_MB.
+            name (str, optional): Shared memory name of a table to attach to. Defaults to None (create one).
+            entries (int, optional): Number of entries of the table to attach to. Defaults to None.
+        """
+
+        self.generation = 0
+        self.shm = None
+        self.owner = name is None
+
+        if self.owner:
+            self.resize(size_mb)
+        else:
+            self.bucket_mask = entries // 2 - 1
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.map(entries)
+
+    @classmethod
+    def attach(cls, name: str, entries: int, generation: int = 0) -> "SharedTranspositionTable":
+        """Attaches to a table created by another process.
+
+        Args:
+            name (str): Shared memory name of the table (the creator's shm.name)
+            entries (int): Number of entries in the table (the creator's len(keys))
+            generation (int, optional): Generation the creator is at. Defaults to 0.
+
+        Returns:
+            SharedTranspositionTable: The table
+        """
+        table = cls(name=name, entries=entries)
+        table.generation = generation
+        return table
+
+    def allocate(self, entries: int):
+        if not self.owner:
+            raise ValueError("Only the process that created a shared table can resize it")
+
+        self.close()
+        if self.shm is not None:
+            self.shm.unlink()
+
+        # New shared memory is zero filled, which is an empty table
+        self.shm = shared_memory.SharedMemory(create=True, size=entries * ENTRY_SIZE)
+        self.map(entries)
+
+    def map(self, entries: int):
+        """Points the keys and data arrays at the shared memory (the keys first, then the data)."""
+        self.words = memoryview(self.shm.buf).cast("Q")
+        self.keys = self.words[:entries]
+        self.data = self.words[entries : entries * 2]
+
+    def clear(self):
+        """Empties the table."""
+        self.shm.buf[: len(self.keys) * ENTRY_SIZE] = bytes(len(self.keys) * ENTRY_SIZE)
+        self.generation = 0
+
+    def close(self):
+        """Stops using the shared memory in this process. The table can't be used afterwards."""
+        if self.shm is None:
+            return
+        # Every view of the buffer has to be released before it can be closed
+        self.keys.release()
+        self.data.release()
+        self.words.release()
+        self.keys = self.data = self.words = None
+        self.shm.close()
+
+    def unlink(self):
+        """Closes the table and frees the shared memory (only the creator should do this, once every process is done)."""
+        if self.shm is None:
+            return
+        self.close()
+        self.shm.unlink()
+        self.shm = None
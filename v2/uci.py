@@ -0,0 +1,390 @@
+# UCI (Universal Chess Interface) front end
+#
+# Lets chess GUIs and match runners (e.g. cutechess, Arena) play against the engine by talking the UCI
+# protocol over stdin/stdout: python uci.py
+# Commands are read on the main thread and every search runs on a worker thread, so "stop", "isready"
+# and "quit" are answered while the engine is thinking. After each finished iteration the search prints
+# an info line (depth, score, nodes, nps, time, pv) and it ends with "bestmove".
+# Supported commands: uci, isready, setoption (Hash, Threads, MultiPV, SyzygyPath), ucinewgame,
+# position (startpos/fen + moves), go (depth, movetime, wtime/btime/winc/binc/movestogo, nodes, infinite),
+# stop, quit and d (prints the board, not part of UCI).
+# Also see https://www.chessprogramming.org/UCI
+
+import multiprocessing
+import sys
+import threading
+import time
+from game import Game
+from lazy_smp import lazy_smp_search
+from move import NULL_MOVE, move_to_uci
+from search import MATE_SCORE, MATE_THRESHOLD, Search, pv_to_str
+from syzygy import Tablebase
+from timeman import MOVE_OVERHEAD, TimeManager
+from tt import DEFAULT_SIZE_MB, SharedTranspositionTable, TranspositionTable
+
+ENGINE_NAME = "Eef's Chess Engine"
+ENGINE_AUTHOR = "Quantumplatr"
+
+MAX_HASH_MB = 4096
+MAX_THREADS = 256
+MAX_MULTIPV = 64
+
+
+def score_to_uci(score: int) -> str:
+    """Formats a score for an info line.
+
+    Args:
+        score (int): Score in centipawns from the side to move's point of view (see search.py)
+
+    Returns:
+        str: "cp <centipawns>" or "mate <moves>" (negative when the side to move gets mated)
+    """
+    if score >= MATE_THRESHOLD:
+        return f"mate {(MATE_SCORE - score + 1) // 2}"
+    if score <= -MATE_THRESHOLD:
+        return f"mate -{(MATE_SCORE + score) // 2}"
+    return f"cp {score}"
+
+
+class UciSearch(Search):
+    """Search that reports every finished iteration as UCI info lines and can stop after a number of nodes."""
+
+    def __init__(self, game, send, node_limit: int = None, **kwargs):
+        """Sets up a search.
+
+        Args:
+            game (Game): Game to search
+            send (callable): Writes a line to the GUI
+            node_limit (int, optional): Nodes to stop after. Defaults to None (no limit).
+            **kwargs: Passed on to Search
+        """
+        super().__init__(game, **kwargs)
+        self.send = send
+        self.node_limit = node_limit
+
+    def check_stop(self):
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            self.stopped = True
+        super().check_stop()
+
+    def search_root(self, depth: int, root_moves: list) -> list:
+        lines = super().search_root(depth, root_moves)
+        for number, line in enumerate(lines, start=1):
+            self.send(info_line(line, number, self.nodes, self.elapsed(), self.tb_hits))
+        return lines
+
+
+def info_line(line: dict, number: int, nodes: int, elapsed: float, tb_hits: int = 0) -> str:
+    """Formats a line found by the search as a UCI info line.
+
+    Args:
+        line (dict): Line from Search.run
+        number (int): MultiPV number of the line (1 is the best)
+        nodes (int): Nodes searched so far
+        elapsed (float): Seconds searched so far
+        tb_hits (int, optional): Tablebase probes that found a result. Defaults to 0.
+
+    Returns:
+        str: Info line
+    """
+    milliseconds = int(elapsed * 1000)
+    nps = int(nodes / elapsed) if elapsed > 0 else 0
+    info = (
+        f"info depth {line['depth']} multipv {number} score {score_to_uci(line['score'])} "
+        f"nodes {nodes} nps {nps} time {milliseconds}"
+    )
+    if tb_hits:
+        info += f" tbhits {tb_hits}"
+    return f"{info} pv {pv_to_str(line['pv'])}"
+
+
+class UciEngine:
+    """Handles the UCI commands sent by a GUI."""
+
+    def __init__(self, output=sys.stdout):
+        """Sets up the engine in the starting position.
+
+        Args:
+            output (file, optional): Where to write responses. Defaults to stdout.
+        """
+        self.output = output
+        self.output_lock = threading.Lock()
+
+        self.game = Game()
+        self.hash_mb = DEFAULT_SIZE_MB
+        self.threads = 1
+        self.multipv = 1
+        self.tt = TranspositionTable(self.hash_mb)
+
+        # Table for searches with several processes, created the first time it's needed
+        self.shared_tt = None
+        self.tablebase = None
+
+        # Current search and the thread running it
+        self.search = None
+        self.stop_event = None
+        self.thread = None
+
+        # "go infinite" has to wait for "stop" before sending bestmove, even if the search finished
+        self.stop_requested = threading.Event()
+
+    def send(self, line: str):
+        """Writes a line to the GUI."""
+        with self.output_lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    def handle(self, command: str) -> bool:
+        """Handles one command.
+
+        Args:
+            command (str): Line received from the GUI
+
+        Returns:
+            bool: False once the engine should quit
+        """
+
+        tokens = command.split()
+        if not tokens:
+            return True
+        name, args = tokens[0], tokens[1:]
+
+        if name == "uci":
+            self.send(f"id name {ENGINE_NAME}")
+            self.send(f"id author {ENGINE_AUTHOR}")
+            self.send(f"option name Hash type spin default {DEFAULT_SIZE_MB} min 1 max {MAX_HASH_MB}")
+            self.send(f"option name Threads type spin default 1 min 1 max {MAX_THREADS}")
+            self.send(f"option name MultiPV type spin default 1 min 1 max {MAX_MULTIPV}")
+            self.send("option name SyzygyPath type string default <empty>")
+            self.send("uciok")
+        elif name == "isready":
+            self.send("readyok")
+        elif name == "setoption":
+            self.wait()
+            self.set_option(args)
+        elif name == "ucinewgame":
+            self.wait()
+            self.tt.clear()
+            if self.shared_tt is not None:
+                self.shared_tt.clear()
+        elif name == "position":
+            self.wait()
+            self.set_position(args)
+        elif name == "go":
+            self.wait()
+            self.go(args)
+        elif name == "stop":
+            self.stop()
+        elif name == "quit":
+            self.stop()
+            self.wait()
+            self.close()
+            return False
+        elif name == "d":
+            self.send(str(self.game))
+            self.send(f"Fen: {self.game.to_fen()}")
+        else:
+            self.send(f"info string Unknown command: {command.strip()}")
+
+        return True
+
+    def set_option(self, args: list):
+        """Handles "setoption name <name> value <value>"."""
+
+        if "name" not in args:
+            return
+        name_end = args.index("value") if "value" in args else len(args)
+        name = " ".join(args[args.index("name") + 1 : name_end]).lower()
+        value = " ".join(args[name_end + 1 :])
+
+        try:
+            if name == "hash":
+                self.hash_mb = max(1, min(int(value), MAX_HASH_MB))
+                self.tt.resize(self.hash_mb)
+                if self.shared_tt is not None:
+                    self.shared_tt.unlink()
+                    self.shared_tt = None
+            elif name == "threads":
+                self.threads = max(1, min(int(value), MAX_THREADS))
+            elif name == "multipv":
+                self.multipv = max(1, min(int(value), MAX_MULTIPV))
+            elif name == "syzygypath":
+                if self.tablebase is not None:
+                    self.tablebase.close()
+                self.tablebase = None
+                if value and value != "<empty>":
+                    self.tablebase = Tablebase(value)
+                    self.send(f"info string Found {self.tablebase.max_pieces} piece tablebases")
+            else:
+                self.send(f"info string Unknown option: {name}")
+        except ValueError as error:
+            self.send(f"info string Invalid value for {name}: {error}")
+
+    def set_position(self, args: list):
+        """Handles "position [startpos | fen <fen>] [moves <move> ...]"."""
+
+        moves_index = args.index("moves") if "moves" in args else len(args)
+        try:
+            if args and args[0] == "fen":
+                game = Game("fen", " ".join(args[1:moves_index]))
+            else:
+                game = Game()
+            for uci in args[moves_index + 1 :]:
+                move = game.parse_uci(uci)
+                game.make_move(move)
+                game.moves.append(move)
+        except ValueError as error:
+            self.send(f"info string Invalid position: {error}")
+            return
+        self.game = game
+
+    def go(self, args: list):
+        """Handles "go" by starting a search on a worker thread."""
+
+        options = {}
+        for key in ("depth", "movetime", "wtime", "btime", "winc", "binc", "movestogo", "nodes"):
+            if key in args:
+                index = args.index(key)
+                try:
+                    options[key] = int(args[index + 1])
+                except (IndexError, ValueError):
+                    self.send(f"info string Invalid value for {key}")
+                    return
+
+        infinite = "infinite" in args
+        max_depth = options.get("depth", 64)
+        time_limit = None
+        time_manager = None
+        if "movetime" in options:
+            time_limit = max(0.01, options["movetime"] / 1000 - MOVE_OVERHEAD)
+        elif not infinite:
+            clock, increment = ("wtime", "winc") if self.game.isWhiteTurn else ("btime", "binc")
+            if clock in options:
+                time_manager = TimeManager(
+                    options[clock] / 1000, options.get(increment, 0) / 1000, options.get("movestogo")
+                )
+
+        # The search is set up here rather than on the worker thread so "stop" can't arrive before it exists
+        self.stop_requested.clear()
+        game = Game(self.game)
+        node_limit = options.get("nodes")
+        # Node limits are only kept by the single process search
+        if self.threads > 1 and node_limit is None:
+            if self.shared_tt is None:
+                self.shared_tt = SharedTranspositionTable(self.hash_mb)
+            self.stop_event = multiprocessing.Event()
+        else:
+            self.search = UciSearch(
+                game,
+                self.send,
+                node_limit=node_limit,
+                max_depth=max_depth,
+                time_limit=time_limit,
+                multipv=self.multipv,
+                tt=self.tt,
+                tablebase=self.tablebase,
+                time_manager=time_manager,
+            )
+
+        self.thread = threading.Thread(
+            target=self.run_search, args=(game, max_depth, time_limit, time_manager, infinite), daemon=True
+        )
+        self.thread.start()
+
+    def run_search(self, game: Game, max_depth: int, time_limit: float, time_manager: TimeManager, infinite: bool):
+        """Runs the search set up by go and sends the best move (runs on the worker thread)."""
+
+        if self.search is not None:
+            lines = self.search.run()
+        else:
+            start = time.perf_counter()
+            reported = []
+
+            # The main search sends back every iteration it finishes, like UciSearch.search_root
+            def on_iteration(lines: list, nodes: int, tb_hits: int):
+                elapsed = time.perf_counter() - start
+                for number, line in enumerate(lines, start=1):
+                    self.send(info_line(line, number, nodes, elapsed, tb_hits))
+                reported[:] = lines
+
+            lines, nodes = lazy_smp_search(
+                game,
+                count=self.multipv,
+                max_depth=max_depth,
+                time_limit=time_limit,
+                processes=self.threads,
+                tt=self.shared_tt,
+                tablebase=self.tablebase,
+                stop_event=self.stop_event,
+                time_manager=time_manager,
+                on_iteration=on_iteration,
+            )
+
+            # A helper can end up deeper than the last iteration the main search reported
+            if lines != reported:
+                elapsed = time.perf_counter() - start
+                for number, line in enumerate(lines, start=1):
+                    self.send(info_line(line, number, nodes, elapsed))
+
+        if infinite:
+            self.stop_requested.wait()
+
+        if not lines:
+            self.send(f"bestmove {move_to_uci(NULL_MOVE)}")
+        elif len(lines[0]["pv"]) > 1:
+            self.send(f"bestmove {move_to_uci(lines[0]['move'])} ponder {move_to_uci(lines[0]['pv'][1])}")
+        else:
+            self.send(f"bestmove {move_to_uci(lines[0]['move'])}")
+
+    def stop(self):
+        """Stops the current search, which then sends its best move."""
+        self.stop_requested.set()
+        if self.search is not None:
+            self.search.stop()
+        if self.stop_event is not None:
+            self.stop_event.set()
+
+    def wait(self):
+        """Waits for the current search to finish."""
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+            self.search = None
+            self.stop_event = None
+
+    def close(self):
+        """Frees the shared table and closes the tablebase."""
+        if self.shared_tt is not None:
+            self.shared_tt.unlink()
+            self.shared_tt = None
+        if self.tablebase is not None:
+            self.tablebase.close()
+            self.tablebase = None
+
+
+def main(input=None, output=sys.stdout):
+    """Reads UCI commands until "quit" or the end of the input.
+
+    Args:
+        input (file, optional): Where to read commands from. Defaults to stdin.
+        output (file, optional): Where to write responses. Defaults to stdout.
+    """
+
+    # Forked search processes close sys.stdin when they start, which blocks while this thread is waiting
+    # on it for the next command. Reading through another file object on the same descriptor avoids that.
+    if input is None:
+        input = open(sys.stdin.fileno(), closefd=False)
+
+    engine = UciEngine(output)
+    for command in input:
+        if not engine.handle(command):
+            return
+
+    # The GUI closed the input without sending quit
+    engine.stop()
+    engine.wait()
+    engine.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+# Zobrist keys for hashing positions.
+#
+# A position's hash is the XOR of one random 64 bit key per (piece, square) on the board,
+# plus keys for the side to move, the castling rights and the en passant file.
+# Since XOR is its own inverse the hash can be updated as pieces move instead of being recomputed.
+# Also see https://www.chessprogramming.org/Zobrist_Hashing
+
+import random
+
+# The keys are generated from a fixed seed so hashes are the same in every process
+_rng = random.Random(0x5EEF)
+
+# PIECE_KEYS[piece][square]
+PIECE_KEYS = [[_rng.getrandbits(64) for _ in range(64)] for _ in range(12)]
+
+# XORed in when it is black's turn
+SIDE_KEY = _rng.getrandbits(64)
+
+# CASTLING_KEYS[castling rights mask], 0 for no rights so the key can always be XORed in
+CASTLING_KEYS = [0] + [_rng.getrandbits(64) for _ in range(15)]
+
+# EN_PASSANT_KEYS[file], only XORed in when the side to move can actually capture en passant
+EN_PASSANT_KEYS = [_rng.getrandbits(64) for _ in range(8)]
+
+del _rng